@@ -1,3 +1,6 @@
+import time
+_run_started = time.perf_counter()
+
 import streamlit as st
 from ui.layout import init_layout
 from ui.upload_section import upload_section
@@ -7,10 +10,17 @@ from ui.comparison_section import comparison_section
 from ui.summarization_section import summarization_section
 import logging
 from utils.logging_utils import configure_logging
+from utils.diagnostics import STARTUP_BUDGET_S
 
 configure_logging()
 logger = logging.getLogger(__name__)
 
+from core.config import METRICS_PORT
+if METRICS_PORT:
+    from core.tracing import start_metrics_server
+
+    start_metrics_server(METRICS_PORT)
+
 st.set_page_config(page_title="AI Research Assistant (Phase 2)", layout="wide")
 init_layout()
 
@@ -19,8 +29,6 @@ if "processed_files_names" not in st.session_state:
     st.session_state.processed_files_names = []
 if "uploaded_files" not in st.session_state:
     st.session_state.uploaded_files = []
-if "docs" not in st.session_state:
-    st.session_state.docs = []
 if "current_file" not in st.session_state:
     st.session_state.current_file = None
 if "use_streaming" not in st.session_state:
@@ -48,3 +56,9 @@ with tab2:
 with tab3:
     summarization_section()
 st.session_state.tools_active = False
+
+# Time-to-first-render for this session (includes cold imports on the first run in a process)
+if "first_render_s" not in st.session_state:
+    st.session_state.first_render_s = time.perf_counter() - _run_started
+    level = logging.WARNING if st.session_state.first_render_s > STARTUP_BUDGET_S else logging.INFO
+    logger.log(level, f"First render took {st.session_state.first_render_s:.2f}s (budget {STARTUP_BUDGET_S:.2f}s)")
@@ -0,0 +1,195 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from core.state import ResearchState
+from core.tracing import annotate, cache_event
+from core.config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_S, ANSWER_CACHE_SIMILARITY
+
+logger = logging.getLogger(__name__)
+
+EmbedQueryFn = Callable[[str], List[float]]
+
+# Multi-paper answers are cached under the sorted source names joined by this separator.
+SCOPE_SEP = "\x1f"
+
+
+def scope_key(sources: List[str]) -> str:
+    return SCOPE_SEP.join(sorted(set(sources)))
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split()).rstrip("?.! ")
+
+
+class _Entry:
+    __slots__ = ("source", "version", "query", "vector", "value", "created_at")
+
+    def __init__(self, source: str, version: int, query: str, vector: Optional[np.ndarray], value: Dict[str, Any]):
+        self.source = source
+        self.version = version
+        self.query = query
+        self.vector = vector
+        self.value = value
+        self.created_at = time.time()
+
+
+class AnswerCache:
+    """Process-wide Q&A answer cache with exact and embedding-similarity lookup.
+
+    Entries are scoped to (source, corpus version); re-indexing a source bumps its
+    version, which makes older answers unreachable and drops them.
+    """
+
+    def __init__(
+        self,
+        embed_query: Optional[EmbedQueryFn] = None,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_s: float = ANSWER_CACHE_TTL_S,
+        similarity: float = ANSWER_CACHE_SIMILARITY,
+    ):
+        self._embed_query = embed_query
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.similarity = similarity
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        try:
+            if self._embed_query is None:
+                from core.vectorstore import get_embeddings
+
+                self._embed_query = get_embeddings().embed_query
+            vec = np.asarray(self._embed_query(query), dtype=np.float32)
+            return vec / max(float(np.linalg.norm(vec)), 1e-12)
+        except Exception as e:
+            logger.warning(f"Answer cache could not embed query: {e}")
+            return None
+
+    def _key(self, source: str, version: int, query: str) -> str:
+        return hashlib.sha1(f"{source}\x00{version}\x00{query}".encode("utf-8")).hexdigest()
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl_s > 0 and now - entry.created_at > self.ttl_s
+
+    def version(self, source: str) -> int:
+        # Versions only grow, so the sum changes whenever any paper in a scope is re-indexed.
+        return sum(self._versions.get(s, 0) for s in source.split(SCOPE_SEP))
+
+    def lookup(self, source: str, query: str) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+        """Return (cached value or None, query embedding if one was computed)."""
+        normalized = _normalize_query(query)
+        now = time.time()
+        with self._lock:
+            version = self.version(source)
+            key = self._key(source, version, normalized)
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry, now):
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.value, None
+
+        vector = self._embed(query)
+        if vector is not None:
+            with self._lock:
+                best_key, best_score = None, self.similarity
+                candidates = [
+                    (k, e) for k, e in self._entries.items()
+                    if e.source == source and e.version == version and e.vector is not None and not self._expired(e, now)
+                ]
+                if candidates:
+                    scores = np.stack([e.vector for _, e in candidates]) @ vector
+                    i = int(np.argmax(scores))
+                    if scores[i] >= best_score:
+                        best_key, best_score = candidates[i][0], float(scores[i])
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.semantic_hits += 1
+                    logger.info(f"Answer cache semantic hit (similarity {best_score:.3f})")
+                    return self._entries[best_key].value, vector
+        with self._lock:
+            self.misses += 1
+        return None, vector
+
+    def store(self, source: str, query: str, value: Dict[str, Any], vector: Optional[np.ndarray] = None) -> None:
+        normalized = _normalize_query(query)
+        if vector is None:
+            vector = self._embed(query)
+        with self._lock:
+            version = self.version(source)
+            key = self._key(source, version, normalized)
+            self._entries[key] = _Entry(source, version, normalized, vector, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, source: str) -> None:
+        with self._lock:
+            self._versions[source] = self._versions.get(source, 0) + 1
+            stale = [k for k, e in self._entries.items() if source in e.source.split(SCOPE_SEP)]
+            for k in stale:
+                del self._entries[k]
+        if stale:
+            logger.info(f"Answer cache: dropped {len(stale)} answer(s) for re-indexed {source}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+
+_cache: Optional[AnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
+
+
+def _scope(state: ResearchState) -> Optional[str]:
+    sources = state.get("sources") or []
+    if len(sources) > 1:
+        return scope_key(sources)
+    return state.get("current_file")
+
+
+def lookup_answer(state: ResearchState) -> ResearchState:
+    state["cache_hit"] = False
+    mode = state.get("research_params", {}).get("mode", "standard_qa")
+    scope = _scope(state)
+    if mode != "standard_qa" or not scope or not state.get("query"):
+        return state
+    value, _ = get_answer_cache().lookup(scope, state["query"])
+    cache_event("answer", value is not None)
+    annotate(cache_hit=value is not None)
+    if value is not None:
+        state.update(value)
+        state["cache_hit"] = True
+    return state
+
+
+def store_answer(state: ResearchState) -> ResearchState:
+    scope = _scope(state)
+    if state.get("answer") and not state.get("error") and not state.get("cache_hit") and scope:
+        get_answer_cache().store(
+            scope, state["query"], {"answer": state["answer"], "docs": state.get("docs", [])}
+        )
+    return state
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from langchain_core.documents import Document
+from core.state import ResearchState
+from core import tracing
+
+logger = logging.getLogger(__name__)
+
+MODES = {
+    "qa": "standard_qa",
+    "standard_qa": "standard_qa",
+    "summary": "literature_review",
+    "literature_review": "literature_review",
+    "compare": "comparative_analysis",
+    "comparative_analysis": "comparative_analysis",
+    "citations": "Generate Citations",
+    "Generate Citations": "Generate Citations",
+}
+_OUTPUT_KEYS = ("answer", "summary", "comparison", "citation_output", "error", "indexing_note", "cache_hit")
+
+
+@dataclass
+class BatchJob:
+    id: str
+    query: str
+    sources: List[str]
+    mode: str = "standard_qa"
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BatchReport:
+    total: int = 0
+    skipped: int = 0
+    completed: int = 0
+    failed: int = 0
+    elapsed_s: float = 0.0
+    latencies_s: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def throughput_qps(self) -> float:
+        return self.completed / self.elapsed_s if self.elapsed_s else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies_s)
+
+        def pct(q: float) -> Optional[float]:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1) if ordered else None
+
+        out = {k: v for k, v in asdict(self).items() if k != "latencies_s"}
+        out.update(elapsed_s=round(self.elapsed_s, 3), throughput_qps=round(self.throughput_qps, 2),
+                   p50_ms=pct(0.5), p95_ms=pct(0.95), p99_ms=pct(0.99))
+        return out
+
+
+def load_jobs(path: str) -> List[BatchJob]:
+    """Read jobs from JSONL: ``{"query", "sources" | "source", "mode"?, "id"?, ...params}``."""
+    jobs = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            raw = json.loads(line)
+            sources = raw.pop("sources", None) or ([raw.pop("source")] if raw.get("source") else [])
+            mode = raw.pop("mode", "standard_qa")
+            if mode not in MODES:
+                raise ValueError(f"{path}:{line_no}: unknown mode {mode!r} (expected one of {sorted(MODES)})")
+            jobs.append(BatchJob(
+                id=str(raw.pop("id", line_no)),
+                query=raw.pop("query", ""),
+                sources=list(sources),
+                mode=MODES[mode],
+                params=raw,
+            ))
+    return jobs
+
+
+def completed_ids(output_path: str, retry_failed: bool = False) -> Set[str]:
+    """Ids already written to ``output_path``, compacted to one final record per id.
+
+    A line cut short by a crash is dropped; with ``retry_failed`` so are failed records,
+    since their jobs are about to be re-run and appended again.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "rb") as f:
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end < len(data):
+        logger.warning(f"Dropping a partial record at the end of {output_path}")
+    lines = data[:end].splitlines()
+    latest: Dict[str, Tuple[bytes, bool]] = {}
+    for line in lines:
+        record = json.loads(line)
+        latest[str(record["id"])] = (line, bool(record.get("error")))
+    kept = {job_id: line for job_id, (line, failed) in latest.items() if not (retry_failed and failed)}
+    if end < len(data) or len(kept) < len(lines):
+        tmp = output_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.writelines(line + b"\n" for line in kept.values())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, output_path)
+    return set(kept)
+
+
+def _source_documents(sources: List[str]) -> List[Document]:
+    # Headless runs have no uploads in memory; fall back to the persisted BM25 index texts.
+    from core.chunk_store import get_chunk_store
+    from core.sparse_index import get_sparse_index
+
+    docs = []
+    for source in sources:
+        stored = get_chunk_store().source_documents([source])
+        if not stored:
+            index = get_sparse_index().get(source)
+            stored = index.documents() if index is not None else []
+        if not stored:
+            raise ValueError(f"No indexed chunks for {source}")
+        docs.extend(stored)
+    return docs
+
+
+def prepare(job: BatchJob) -> Tuple[Any, ResearchState]:
+    """The compiled graph to run for ``job`` and its initial state."""
+    from core.graph import get_app, get_task_app
+
+    state: ResearchState = {
+        "query": job.query,
+        "sources": job.sources,
+        "current_file": job.sources[0] if job.sources else None,
+        "research_params": {"mode": job.mode, **job.params},
+    }
+    # Summaries and comparisons cover whole papers, as in the UI, rather than retrieved chunks.
+    if job.mode == "literature_review":
+        state["docs"] = _source_documents(job.sources)
+        return get_task_app("summarize"), state
+    if job.mode == "comparative_analysis":
+        state["docs"] = _source_documents(job.sources)
+        return get_task_app("compare"), state
+    if job.mode == "Generate Citations":
+        from core.bibliography import get_metadata_index
+
+        # Citations come from the metadata index; chunks are only needed for papers missing from it.
+        missing = [s for s in job.sources if get_metadata_index().get(s) is None]
+        state["docs"] = _source_documents(missing) if missing else []
+        return get_task_app("citations"), state
+    return get_app(), state
+
+
+def _record(job: BatchJob, result: Optional[ResearchState], elapsed_s: float, trace, error: Optional[str] = None) -> Dict[str, Any]:
+    record: Dict[str, Any] = {"id": job.id, "query": job.query, "sources": job.sources, "mode": job.mode}
+    for key in _OUTPUT_KEYS:
+        if result and result.get(key) is not None:
+            record[key] = result[key]
+    if error:
+        record["error"] = error
+    if result and result.get("docs"):
+        record["retrieved"] = [
+            {"source": d.metadata.get("source"), "page": d.metadata.get("page")} for d in result["docs"][:10]
+        ]
+    record["latency_s"] = round(elapsed_s, 4)
+    if trace is not None:
+        record["timings_ms"] = {s["span"]: s["ms"] for s in trace.breakdown() if s["depth"] == 0}
+    return record
+
+
+def run_job(job: BatchJob) -> Dict[str, Any]:
+    start = time.perf_counter()
+    with tracing.request() as trace:
+        try:
+            app, state = prepare(job)
+            result, error = app.invoke(state), None
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+    return _record(job, result, time.perf_counter() - start, trace, error)
+
+
+async def arun_job(job: BatchJob) -> Dict[str, Any]:
+    start = time.perf_counter()
+    with tracing.request() as trace:
+        try:
+            app, state = await asyncio.to_thread(prepare, job)
+            result, error = await app.ainvoke(state), None
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+    return _record(job, result, time.perf_counter() - start, trace, error)
+
+
+class _Writer:
+    """Appends records to the output JSONL as they finish; each line is flushed to disk."""
+
+    def __init__(self, path: str, report: BatchReport, progress: Optional[Callable[[BatchReport], None]], started: float):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+        self.report = report
+        self.progress = progress
+        self.started = started
+
+    def write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, default=str) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.report.completed += 1
+            self.report.failed += bool(record.get("error"))
+            self.report.latencies_s.append(record["latency_s"])
+            self.report.elapsed_s = time.perf_counter() - self.started
+            if self.progress is not None:
+                self.progress(self.report)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def run_batch(
+    jobs: Iterable[BatchJob],
+    output_path: str,
+    concurrency: int = 8,
+    backend: str = "thread",
+    retry_failed: bool = False,
+    progress: Optional[Callable[[BatchReport], None]] = None,
+) -> BatchReport:
+    """Run ``jobs`` through the graph without Streamlit, streaming results to ``output_path``.
+
+    The output file doubles as the checkpoint: jobs whose id is already in it are skipped,
+    so a crashed or interrupted run is resumed by running the same command again.
+    ``backend`` is ``"thread"`` (a pool of ``concurrency`` workers calling ``invoke``) or
+    ``"asyncio"`` (``ainvoke`` with at most ``concurrency`` jobs in flight).
+    """
+    jobs = list(jobs)
+    done = completed_ids(output_path, retry_failed)
+    todo = [j for j in jobs if j.id not in done]
+    report = BatchReport(total=len(jobs), skipped=len(jobs) - len(todo))
+    if report.skipped:
+        logger.info(f"Resuming: {report.skipped} of {len(jobs)} job(s) already in {output_path}")
+    started = time.perf_counter()
+    writer = _Writer(output_path, report, progress, started)
+    try:
+        if backend == "asyncio":
+            asyncio.run(_run_async(todo, concurrency, writer))
+        elif backend == "thread":
+            with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as pool:
+                for future in as_completed([pool.submit(run_job, job) for job in todo]):
+                    writer.write(future.result())
+        else:
+            raise ValueError(f"Unknown backend {backend!r} (expected 'thread' or 'asyncio')")
+    finally:
+        writer.close()
+        report.elapsed_s = time.perf_counter() - started
+    logger.info(f"Batch finished: {report.to_dict()}")
+    return report
+
+
+async def _run_async(jobs: List[BatchJob], concurrency: int, writer: _Writer) -> None:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(job: BatchJob) -> None:
+        async with semaphore:
+            record = await arun_job(job)
+        writer.write(record)
+
+    await asyncio.gather(*(one(job) for job in jobs))
@@ -0,0 +1,431 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from core.config import METADATA_INDEX_PATH
+
+logger = logging.getLogger(__name__)
+
+STYLES = ("APA", "IEEE", "MLA", "Chicago", "BibTeX")
+
+# Bump when the extraction heuristics change so stale records are re-extracted.
+_EXTRACT_VERSION = "1"
+
+_DOI_RE = re.compile(r"\b(10\.\d{4,9}/[^\s\"<>]+)", re.IGNORECASE)
+_ARXIV_RE = re.compile(r"arXiv:\s?(\d{2})(\d{2})\.(\d{4,5})(v\d+)?", re.IGNORECASE)
+_YEAR_RE = re.compile(r"\b(19[5-9]\d|20\d\d)\b")
+_DATE_RE = re.compile(r"^D?:?(\d{4})")
+_VENUE_RE = re.compile(
+    r"\b(Proceedings|Journal|Transactions|Letters|Conference|Symposium|Workshop|Review|Annals|Bulletin)\b", re.IGNORECASE
+)
+_VENUE_PREFIX_RE = re.compile(r"^(published|appeared|to appear|accepted) (in|at):?\s*", re.IGNORECASE)
+_VENUE_TAIL_RE = re.compile(r",\s*(?:vol|no\.|pp|pages|\d)|\s\d+\s*\(|\s\(?(?:19|20)\d\d\b", re.IGNORECASE)
+_PUBLISHED_RE = re.compile(r"(©|\(c\)|copyright|published|accepted|received)", re.IGNORECASE)
+_JUNK_LINE_RE = re.compile(
+    r"(arxiv|doi|https?://|www\.|@|©|copyright|preprint|received|accepted|published|licen[cs]e|vol\.|volume|issn|isbn|page \d)",
+    re.IGNORECASE,
+)
+_JUNK_TITLE_RE = re.compile(r"^(untitled|microsoft word|title|document\d*|slide \d+)\b|\.(dvi|docx?|tex|pdf|ps)$", re.IGNORECASE)
+_AUTHOR_SPLIT_RE = re.compile(r"\s*(?:;|,\s*and\s+|\band\b|&|,)\s*")
+_MARKS_RE = re.compile(r"[\d*†‡§¶∗⋆#]+")
+_CONNECTIVES = {"a", "an", "the", "of", "for", "from", "with", "without", "and", "or", "to", "in", "on", "via", "by", "at", "as", "into", "towards", "through", "under", "using", ":", "-"}
+_PARTICLES = {"van", "von", "der", "den", "de", "del", "della", "di", "da", "du", "le", "la", "bin", "al", "ter"}
+
+
+def _split_name(name: str) -> Tuple[str, str]:
+    """``"Jane Q. van Doe"`` or ``"van Doe, Jane Q."`` -> ``("van Doe", "Jane Q.")``."""
+    if "," in name:
+        family, given = (part.strip() for part in name.split(",", 1))
+        return family, given
+    words = name.split()
+    if len(words) < 2:
+        return name.strip(), ""
+    start = len(words) - 1
+    while start > 1 and words[start - 1].lower() in _PARTICLES:
+        start -= 1
+    return " ".join(words[start:]), " ".join(words[:start])
+
+
+def _initials(given: str) -> str:
+    parts = []
+    for word in given.replace(".", " ").split():
+        parts.append("-".join(f"{piece[0]}." for piece in word.split("-") if piece))
+    return " ".join(parts)
+
+
+@dataclass
+class PaperMetadata:
+    source: str
+    content_hash: str
+    title: str
+    authors: List[str] = field(default_factory=list)
+    year: Optional[str] = None
+    doi: Optional[str] = None
+    venue: Optional[str] = None
+    version: str = _EXTRACT_VERSION
+    # (family, given, initials) per author, parsed once so formatting is plain string assembly.
+    names: List[Tuple[str, str, str]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.names = [(family, given, _initials(given)) for family, given in map(_split_name, self.authors)]
+
+    def to_json(self) -> str:
+        record = asdict(self)
+        record.pop("names")
+        return json.dumps(record)
+
+    @classmethod
+    def from_json(cls, data: str) -> "PaperMetadata":
+        return cls(**json.loads(data))
+
+
+def _authors_from_line(line: str) -> List[str]:
+    parts = [" ".join(_MARKS_RE.sub(" ", p).split()) for p in _AUTHOR_SPLIT_RE.split(line)]
+    return [p for p in parts if p]
+
+
+def _looks_like_authors(line: str) -> bool:
+    names = _authors_from_line(line)
+    if not names or _JUNK_LINE_RE.search(line) or _VENUE_RE.search(line):
+        return False
+    for name in names:
+        words = name.split()
+        if not 2 <= len(words) <= 4 or not all(w[0].isupper() or w.lower() in _PARTICLES for w in words):
+            return False
+    return True
+
+
+def _title_candidate(line: str) -> bool:
+    words = line.split()
+    if not 2 <= len(words) <= 30 or _JUNK_LINE_RE.search(line) or _VENUE_RE.search(line):
+        return False
+    return sum(c.isdigit() for c in line) < 0.2 * len(line)
+
+
+def _continues_title(title: str, rest: List[str]) -> bool:
+    # A title-case second line looks like one author's name; it still belongs to the title
+    # when the first line ends mid-phrase or the real author list follows it.
+    if title.split()[-1].lower() in _CONNECTIVES:
+        return True
+    if not _looks_like_authors(rest[0]):
+        return len(title.split()) >= 4
+    return len(_authors_from_line(rest[0])) == 1 and len(rest) > 1 and _looks_like_authors(rest[1])
+
+
+def _from_first_page(lines: List[str]) -> Tuple[Optional[str], List[str]]:
+    """Title (first plausible line, plus a continuation line) and the author line after it."""
+    for i, line in enumerate(lines[:15]):
+        if not _title_candidate(line):
+            continue
+        title, rest = line, lines[i + 1:i + 6]
+        if rest and len(title) < 90 and _title_candidate(rest[0]) and _continues_title(title, rest):
+            title, rest = f"{title} {rest[0]}", rest[1:]
+        authors = next((_authors_from_line(l) for l in rest[:3] if _looks_like_authors(l)), [])
+        return title, authors
+    return None, []
+
+
+def _year(info: Dict[str, str], lines: List[str], arxiv: Optional[re.Match]) -> Optional[str]:
+    this_year = time.gmtime().tm_year
+    for line in lines[:40]:
+        if _VENUE_RE.search(line) or _PUBLISHED_RE.search(line):
+            years = [y for y in _YEAR_RE.findall(line) if int(y) <= this_year + 1]
+            if years:
+                return years[-1]
+    if arxiv:
+        return f"20{arxiv.group(1)}"
+    for key in ("year", "creationdate", "moddate"):
+        match = _DATE_RE.match(str(info.get(key) or ""))
+        if match:
+            return match.group(1)
+    years = [y for y in _YEAR_RE.findall(" ".join(lines[:40])) if int(y) <= this_year + 1]
+    return years[0] if years else None
+
+
+def _venue(info: Dict[str, str], lines: List[str], arxiv: Optional[re.Match]) -> Optional[str]:
+    explicit = info.get("journal") or info.get("journaltitle") or info.get("booktitle")
+    if explicit:
+        return str(explicit).strip()
+    subject = str(info.get("subject") or "")
+    if _VENUE_RE.search(subject):
+        return re.split(r",|\s\d|\bdoi\b", subject, 1)[0].strip(" .;")
+    for line in lines[:40]:
+        if _VENUE_RE.search(line) and len(line) < 160:
+            line = _VENUE_PREFIX_RE.sub("", line)
+            return _VENUE_TAIL_RE.split(line, 1)[0].strip(" .;,")
+    if arxiv:
+        return f"arXiv preprint arXiv:{arxiv.group(1)}{arxiv.group(2)}.{arxiv.group(3)}"
+    return None
+
+
+def parse_metadata(info: Dict[str, str], first_page: str, source: str, content_hash: str) -> PaperMetadata:
+    """Bibliographic fields from PDF document info, falling back to first-page text."""
+    info = {str(k).lstrip("/").lower(): v for k, v in (info or {}).items() if v}
+    lines = [" ".join(l.split()) for l in first_page.splitlines() if l.strip()]
+    text = " ".join(lines[:60])
+    page_title, page_authors = _from_first_page(lines)
+
+    title = str(info.get("title") or "").strip()
+    if not title or _JUNK_TITLE_RE.search(title) or len(title.split()) < 2:
+        title = page_title or os.path.splitext(source)[0]
+    author_field = str(info.get("author") or "").strip()
+    authors = _authors_from_line(author_field) if author_field and not _JUNK_TITLE_RE.search(author_field) else page_authors
+    if author_field and ";" in author_field:
+        authors = [a.strip() for a in author_field.split(";") if a.strip()]  # "Family, Given; Family, Given"
+
+    doi_match = _DOI_RE.search(str(info.get("doi") or "")) or _DOI_RE.search(str(info.get("subject") or "")) or _DOI_RE.search(text)
+    arxiv = _ARXIV_RE.search(text)
+    return PaperMetadata(
+        source=source,
+        content_hash=content_hash,
+        title=title.rstrip(" ."),
+        authors=authors,
+        year=_year(info, lines, arxiv),
+        doi=doi_match.group(1).rstrip(".,;)") if doi_match else None,
+        venue=_venue(info, lines, arxiv),
+    )
+
+
+def extract_metadata(path: str, source: str, content_hash: str) -> PaperMetadata:
+    """Read only the document info and the first page of ``path``."""
+    import pypdf
+
+    try:
+        reader = pypdf.PdfReader(path)
+        info = dict(reader.metadata or {})
+        first_page = (reader.pages[0].extract_text() or "") if reader.pages else ""
+    except Exception as e:
+        logger.warning(f"Could not read metadata from {source}: {e}")
+        info, first_page = {}, ""
+    return parse_metadata(info, first_page, source, content_hash)
+
+
+def metadata_from_docs(source: str, docs: Sequence[Document]) -> PaperMetadata:
+    """Fallback for papers missing from the index: loader metadata plus the first page's chunks."""
+    docs = [d for d in docs if d.metadata.get("source") == source]
+    meta = docs[0].metadata if docs else {}
+    first_page = min((d.metadata.get("page", 0) for d in docs), default=0)
+    text = "\n".join(d.page_content for d in docs if d.metadata.get("page", 0) == first_page)
+    return parse_metadata(meta, text, source, meta.get("content_hash") or "")
+
+
+class MetadataIndex:
+    """Per-paper bibliographic metadata, persisted in SQLite and mirrored in memory.
+
+    Records are extracted once per file at ingestion and keyed by (source, content hash);
+    a file already seen under another name reuses its record instead of re-parsing.
+    """
+
+    def __init__(self, path: str = METADATA_INDEX_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS papers (source TEXT NOT NULL, content_hash TEXT NOT NULL, "
+            "record TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (source, content_hash))"
+        )
+        self._conn.commit()
+        self._records: Dict[Tuple[str, str], PaperMetadata] = {}
+        self._by_hash: Dict[str, PaperMetadata] = {}
+        self._latest: Dict[str, PaperMetadata] = {}
+        for record, in self._conn.execute("SELECT record FROM papers ORDER BY created_at"):
+            meta = PaperMetadata.from_json(record)
+            if meta.version == _EXTRACT_VERSION:
+                self._remember(meta)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _remember(self, meta: PaperMetadata) -> None:
+        self._records[(meta.source, meta.content_hash)] = meta
+        self._by_hash.setdefault(meta.content_hash, meta)
+        self._latest[meta.source] = meta  # the same name can be re-uploaded with new content
+
+    def get(self, source: str, content_hash: Optional[str] = None) -> Optional[PaperMetadata]:
+        return self._records.get((source, content_hash)) if content_hash else self._latest.get(source)
+
+    def add_pdf(self, path: str, source: str, content_hash: str) -> PaperMetadata:
+        meta = self._records.get((source, content_hash))
+        if meta is not None:
+            return meta
+        known = self._by_hash.get(content_hash)
+        if known is not None:
+            meta = PaperMetadata.from_json(known.to_json())
+            meta.source = source
+        else:
+            meta = extract_metadata(path, source, content_hash)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO papers (source, content_hash, record, created_at) VALUES (?, ?, ?, ?)",
+                (source, content_hash, meta.to_json(), time.time()),
+            )
+            self._conn.commit()
+            self._remember(meta)
+        return meta
+
+    def backfill(self, papers: Iterable[Tuple[str, str, str]]) -> int:
+        """Index ``(source, path, content_hash)`` papers ingested before the index existed."""
+        added = 0
+        for source, path, content_hash in papers:
+            if (source, content_hash) not in self._records and os.path.exists(path):
+                self.add_pdf(path, source, content_hash)
+                added += 1
+        if added:
+            logger.info(f"Backfilled bibliographic metadata for {added} paper(s)")
+        return added
+
+    def entries(self, sources: Optional[Iterable[str]] = None) -> List[PaperMetadata]:
+        """Indexed papers (all, or the latest version of each of ``sources``), one per file."""
+        if sources is None:
+            records = list(self._records.values())
+        else:
+            records = [m for m in (self.get(s) for s in dict.fromkeys(sources)) if m is not None]
+        seen, unique = set(), []
+        for meta in records:
+            if meta.content_hash not in seen:
+                seen.add(meta.content_hash)
+                unique.append(meta)
+        return unique
+
+
+def _join(parts: Sequence[str]) -> str:
+    """``A``, ``A and B``, ``A, B, and C``."""
+    if len(parts) <= 2:
+        return " and ".join(parts)
+    return ", ".join(parts[:-1]) + ", and " + parts[-1]
+
+
+def _inverted(family: str, given: str) -> str:
+    return f"{family}, {given}" if given else family
+
+
+def _apa(m: PaperMetadata, n: int) -> str:
+    names = [_inverted(family, initials) for family, _, initials in m.names]
+    if len(names) > 20:
+        names = names[:19] + ["... " + names[-1]]
+    if len(names) > 1:
+        authors = ", ".join(names[:-1]) + ", & " + names[-1]
+    else:
+        authors = "".join(names)
+    year = f"({m.year or 'n.d.'})."
+    head = f"{authors} {year} {m.title}." if authors else f"{m.title}. {year}"
+    venue = f" *{m.venue}*." if m.venue else ""
+    doi = f" https://doi.org/{m.doi}" if m.doi else ""
+    return head + venue + doi
+
+
+def _ieee(m: PaperMetadata, n: int) -> str:
+    names = [f"{initials} {family}".strip() for family, _, initials in m.names]
+    authors = f"{names[0]} et al." if len(names) > 6 else _join(names)
+    parts = [f'[{n}] {authors}, "{m.title},"' if authors else f'[{n}] "{m.title},"']
+    if m.venue:
+        parts.append(f"*{m.venue}*,")
+    parts.append(f"{m.year or 'n.d.'}" + (f", doi: {m.doi}." if m.doi else "."))
+    return " ".join(parts)
+
+
+def _mla(m: PaperMetadata, n: int) -> str:
+    names = m.names
+    if not names:
+        authors = ""
+    elif len(names) == 1:
+        authors = _inverted(names[0][0], names[0][1])
+    elif len(names) == 2:
+        authors = f"{_inverted(names[0][0], names[0][1])}, and {names[1][1]} {names[1][0]}".replace("and  ", "and ")
+    else:
+        authors = f"{_inverted(names[0][0], names[0][1])}, et al."
+    parts = [f"{authors.rstrip('.')}." if authors else "", f'"{m.title}."']
+    tail = [f"*{m.venue}*"] if m.venue else []
+    tail.append(m.year or "n.d.")
+    if m.doi:
+        tail.append(f"https://doi.org/{m.doi}")
+    parts.append(", ".join(tail) + ".")
+    return " ".join(p for p in parts if p)
+
+
+def _chicago(m: PaperMetadata, n: int) -> str:
+    names = [_inverted(family, given) if i == 0 else f"{given} {family}".strip() for i, (family, given, _) in enumerate(m.names)]
+    if len(names) > 10:
+        names = names[:7] + ["et al"]
+    authors = f"{names[0]}, and {names[1]}" if len(names) == 2 else _join(names)
+    parts = [f"{authors.rstrip('.')}." if authors else "", f'"{m.title}."']
+    parts.append(f"*{m.venue}* ({m.year or 'n.d.'})." if m.venue else f"{m.year or 'n.d.'}.")
+    if m.doi:
+        parts.append(f"https://doi.org/{m.doi}.")
+    return " ".join(p for p in parts if p)
+
+
+_BIBTEX_ESCAPES = str.maketrans({"&": r"\&", "%": r"\%", "$": r"\$", "#": r"\#", "_": r"\_", "{": r"\{", "}": r"\}"})
+
+
+def _bibtex_key(m: PaperMetadata, used: Dict[str, int]) -> str:
+    family = m.names[0][0].split()[-1] if m.names else os.path.splitext(m.source)[0]
+    word = next((w for w in re.findall(r"[A-Za-z]+", m.title) if len(w) > 3), "")
+    base = unicodedata.normalize("NFKD", f"{family}{m.year or ''}{word}").encode("ascii", "ignore").decode()
+    base = re.sub(r"[^A-Za-z0-9]", "", base).lower() or "paper"
+    count = used.get(base, 0)
+    used[base] = count + 1
+    return base if count == 0 else f"{base}{chr(ord('a') + count) if count < 26 else count}"
+
+
+def _bibtex(m: PaperMetadata, key: str) -> str:
+    venue = m.venue or ""
+    if re.search(r"proceedings|conference|symposium|workshop", venue, re.IGNORECASE):
+        kind, venue_field = "inproceedings", "booktitle"
+    elif venue and not venue.lower().startswith("arxiv"):
+        kind, venue_field = "article", "journal"
+    else:
+        kind, venue_field = "misc", "howpublished"
+    fields = [("title", "{" + m.title.translate(_BIBTEX_ESCAPES) + "}")]
+    if m.names:
+        fields.append(("author", " and ".join(_inverted(family, given) for family, given, _ in m.names).translate(_BIBTEX_ESCAPES)))
+    if venue:
+        fields.append((venue_field, venue.translate(_BIBTEX_ESCAPES)))
+    if m.year:
+        fields.append(("year", m.year))
+    if m.doi:
+        fields.append(("doi", m.doi))
+    body = ",\n".join(f"  {name} = {{{value}}}" for name, value in fields)
+    return f"@{kind}{{{key},\n{body}\n}}"
+
+
+_FORMATTERS = {"APA": _apa, "IEEE": _ieee, "MLA": _mla, "Chicago": _chicago}
+
+
+def _sort_key(m: PaperMetadata) -> Tuple[str, str, str]:
+    first = m.names[0][0] if m.names else m.title
+    return first.lower(), m.year or "", m.title.lower()
+
+
+def format_bibliography(entries: Sequence[PaperMetadata], style: str = "APA") -> str:
+    """The whole reference list in one pass: IEEE keeps input order, other styles sort by author."""
+    if style == "BibTeX":
+        used: Dict[str, int] = {}
+        return "\n\n".join(_bibtex(m, _bibtex_key(m, used)) for m in entries)
+    fmt = _FORMATTERS.get(style, _apa)
+    ordered = entries if style == "IEEE" else sorted(entries, key=_sort_key)
+    return "\n".join(" ".join(fmt(m, i).split()) for i, m in enumerate(ordered, start=1))
+
+
+_index: Optional[MetadataIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_metadata_index() -> MetadataIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MetadataIndex()
+    return _index
@@ -0,0 +1,195 @@
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from array import array
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from langchain_core.documents import Document
+from core.config import CHUNK_STORE_MMAP, CHUNK_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Per-chunk metadata kept in integer columns; everything else is interned per distinct dict
+# (for PDF chunks that is one entry per page, shared by all its chunks).
+_COLUMN_KEYS = ("start_index", "chunk_index")
+_MISSING = -1
+
+
+class _TextBuffer:
+    """Append-only UTF-8 buffer, in memory or in a memory-mapped temp file."""
+
+    def __init__(self, use_mmap: bool = False, directory: Optional[str] = None):
+        self._data = bytearray()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._size = 0
+        self._lock = threading.Lock()
+        if use_mmap:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = tempfile.TemporaryFile(dir=directory or None)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, data: bytes) -> int:
+        with self._lock:
+            offset = self._size
+            if self._file is None:
+                self._data += data
+            else:
+                self._file.seek(offset)
+                self._file.write(data)
+                self._file.flush()
+                if self._map is not None:
+                    self._map.close()
+                    self._map = None
+            self._size += len(data)
+            return offset
+
+    def read(self, offset: int, length: int) -> bytes:
+        with self._lock:
+            if self._file is None:
+                return bytes(self._data[offset:offset + length])
+            if self._map is None:
+                self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+            return self._map[offset:offset + length]
+
+
+class ChunkStore:
+    """Process-wide chunk store shared by all sessions.
+
+    Chunk text lives in one contiguous buffer; offsets, lengths and per-chunk integers are
+    ``array`` columns, remaining metadata is interned. Each paper is a list of id ranges
+    keyed by (source, content hash), so re-uploading a known paper from any session reuses
+    the stored chunks and sessions only keep the key. Papers indexed progressively grow
+    one range per window until marked complete.
+    """
+
+    def __init__(self, use_mmap: bool = CHUNK_STORE_MMAP, directory: str = CHUNK_STORE_DIR):
+        self._text = _TextBuffer(use_mmap, directory)
+        self._offsets = array("q")
+        self._lengths = array("l")
+        self._meta_ids = array("l")
+        self._columns: Dict[str, array] = {key: array("q") for key in _COLUMN_KEYS}
+        self._meta: List[dict] = []
+        self._meta_index: Dict[str, int] = {}
+        self._papers: Dict[Tuple[str, Optional[str]], List[range]] = {}
+        self._complete: Set[Tuple[str, Optional[str]]] = set()
+        self._sources: Dict[str, List[range]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _intern(self, metadata: dict) -> int:
+        key = json.dumps(metadata, sort_keys=True, default=str)
+        meta_id = self._meta_index.get(key)
+        if meta_id is None:
+            meta_id = self._meta_index[key] = len(self._meta)
+            self._meta.append(metadata)
+        return meta_id
+
+    def lookup(self, source: str, content_hash: Optional[str]) -> Optional[List[range]]:
+        """Id ranges of a fully stored paper, or None if it is unknown or still being added."""
+        key = (source, content_hash)
+        return self._papers.get(key) if content_hash and key in self._complete else None
+
+    def paper_ids(self, source: str, content_hash: Optional[str]) -> List[range]:
+        return self._papers.get((source, content_hash), [])
+
+    def add_paper(self, source: str, docs: Sequence[Document], content_hash: Optional[str] = None) -> List[range]:
+        """Store one paper's chunks (in order) and return their id ranges; known papers are not re-added."""
+        content_hash = content_hash or (docs[0].metadata.get("content_hash") if docs else None)
+        with self._lock:
+            existing = self.lookup(source, content_hash)
+            if existing is not None:
+                self._sources[source] = existing
+                return existing
+            self._papers.pop((source, content_hash), None)
+            ids = self.append(source, docs, content_hash)
+            self.mark_complete(source, content_hash)
+            return ids
+
+    def append(self, source: str, docs: Sequence[Document], content_hash: Optional[str] = None) -> List[range]:
+        """Add a window of a paper that is still being ingested."""
+        with self._lock:
+            start = len(self._offsets)
+            for d in docs:
+                data = d.page_content.encode("utf-8")
+                self._offsets.append(self._text.append(data))
+                self._lengths.append(len(data))
+                meta = {k: v for k, v in d.metadata.items() if k not in _COLUMN_KEYS}
+                self._meta_ids.append(self._intern(meta))
+                for key, column in self._columns.items():
+                    value = d.metadata.get(key)
+                    column.append(value if isinstance(value, int) else _MISSING)
+            ranges = self._papers.setdefault((source, content_hash), [])
+            if ranges and ranges[-1].stop == start:
+                ranges[-1] = range(ranges[-1].start, len(self._offsets))
+            else:
+                ranges.append(range(start, len(self._offsets)))
+            self._sources[source] = ranges
+        logger.debug(f"Chunk store: +{len(docs)} chunks for {source} ({len(self)} total, {len(self._text) / 1e6:.1f} MB text)")
+        return ranges
+
+    def discard(self, source: str, content_hash: Optional[str]) -> None:
+        """Forget a paper's ranges (e.g. before re-ingesting it); the text stays in the buffer."""
+        with self._lock:
+            self._papers.pop((source, content_hash), None)
+            self._complete.discard((source, content_hash))
+
+    def mark_complete(self, source: str, content_hash: Optional[str]) -> None:
+        with self._lock:
+            self._papers.setdefault((source, content_hash), [])
+            self._complete.add((source, content_hash))
+
+    def source_ids(self, source: str) -> List[range]:
+        return self._sources.get(source, [])
+
+    def get(self, chunk_id: int) -> Document:
+        text = self._text.read(self._offsets[chunk_id], self._lengths[chunk_id]).decode("utf-8")
+        metadata = dict(self._meta[self._meta_ids[chunk_id]])
+        for key, column in self._columns.items():
+            if column[chunk_id] != _MISSING:
+                metadata[key] = column[chunk_id]
+        return Document(page_content=text, metadata=metadata)
+
+    def documents(self, ids: Iterable[int], limit: Optional[int] = None) -> List[Document]:
+        out = []
+        for chunk_id in ids:
+            if limit is not None and len(out) >= limit:
+                break
+            out.append(self.get(chunk_id))
+        return out
+
+    def source_documents(self, sources: Iterable[str], limit: Optional[int] = None) -> List[Document]:
+        docs: List[Document] = []
+        for source in sources:
+            ids = chain.from_iterable(self.source_ids(source))
+            docs.extend(self.documents(ids, None if limit is None else limit - len(docs)))
+        return docs
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "sources": len(self._sources),
+            "chunks": len(self),
+            "text_mb": round(len(self._text) / 1e6, 2),
+            "distinct_metadata": len(self._meta),
+        }
+
+
+_store: Optional[ChunkStore] = None
+_store_lock = threading.Lock()
+
+
+def get_chunk_store() -> ChunkStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ChunkStore()
+    return _store
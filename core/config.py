@@ -10,6 +10,115 @@ OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 QDRANT_URL: Optional[str] = os.getenv("QDRANT_URL")
 QDRANT_API_KEY: Optional[str] = os.getenv("QDRANT_API_KEY")
 QDRANT_COLLECTION: str = os.getenv("QDRANT_COLLECTION", "research_papers")
+QDRANT_PREFER_GRPC: bool = os.getenv("QDRANT_PREFER_GRPC", "false").lower() in ("1", "true", "yes")
+QDRANT_TIMEOUT: int = int(os.getenv("QDRANT_TIMEOUT", "10"))
+
+# Vector backend: "qdrant" (remote) or "local" (embedded, memory-mapped)
+VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "qdrant").lower()
+LOCAL_VECTOR_DIR: str = os.getenv("LOCAL_VECTOR_DIR", os.path.join("data", "vectors"))
+LOCAL_VECTOR_DTYPE: str = os.getenv("LOCAL_VECTOR_DTYPE", "float32")  # float32 | float16 | int8
+LOCAL_ANN_MIN_VECTORS: int = int(os.getenv("LOCAL_ANN_MIN_VECTORS", "50000"))
+LOCAL_IVF_NLIST: int = int(os.getenv("LOCAL_IVF_NLIST", "256"))
+LOCAL_IVF_NPROBE: int = int(os.getenv("LOCAL_IVF_NPROBE", "16"))
+QDRANT_QUANTIZATION: str = os.getenv("QDRANT_QUANTIZATION", "none").lower()  # none | int8
+
+# Embedding model: "openai" (API) or "local" (sentence-transformers on CPU)
+EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+OPENAI_EMBEDDING_MODEL: str = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+LOCAL_EMBEDDING_MODEL: str = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_BATCH_SIZE: int = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_DIM: int = int(os.getenv("EMBEDDING_DIM", "0"))  # Matryoshka truncation, 0 = model's full size
+
+# Reranker service
+RERANKER_MODEL: str = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANKER_BACKEND: str = os.getenv("RERANKER_BACKEND", "torch")  # torch | onnx | openvino
+RERANKER_ONNX_FILE: Optional[str] = os.getenv("RERANKER_ONNX_FILE")  # e.g. onnx/model_qint8_avx2.onnx
+RERANKER_BATCH_SIZE: int = int(os.getenv("RERANKER_BATCH_SIZE", "32"))
+RERANKER_MAX_WAIT_MS: float = float(os.getenv("RERANKER_MAX_WAIT_MS", "5"))
+RERANK_MIN_DEPTH: int = int(os.getenv("RERANK_MIN_DEPTH", "0"))  # candidates always cross-encoded, 0 = half of them
+RERANK_STEP: int = int(os.getenv("RERANK_STEP", "0"))  # 0 = an eighth of the candidates
+RERANK_BUDGET_MS: float = float(os.getenv("RERANK_BUDGET_MS", "250"))
+RERANK_CACHE_SIZE: int = int(os.getenv("RERANK_CACHE_SIZE", "50000"))
+
+# Sparse (BM25) index
+SPARSE_INDEX_DIR: str = os.getenv("SPARSE_INDEX_DIR", os.path.join("data", "sparse_index"))
+BM25_K1: float = float(os.getenv("BM25_K1", "1.5"))
+BM25_B: float = float(os.getenv("BM25_B", "0.75"))
+
+# Multi-paper retrieval
+RETRIEVAL_FANOUT_WORKERS: int = int(os.getenv("RETRIEVAL_FANOUT_WORKERS", "8"))
+MULTI_SOURCE_TOP_K: int = int(os.getenv("MULTI_SOURCE_TOP_K", "8"))
+MULTI_SOURCE_MAX_PER_SOURCE: int = int(os.getenv("MULTI_SOURCE_MAX_PER_SOURCE", "2"))
+
+# Tracing and metrics
+TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_PORT: int = int(os.getenv("METRICS_PORT", "0"))  # 0 disables the /metrics endpoint
+METRICS_HOST: str = os.getenv("METRICS_HOST", "127.0.0.1")  # 0.0.0.0 to let a remote Prometheus scrape
+
+# Shared chunk store
+CHUNK_STORE_MMAP: bool = os.getenv("CHUNK_STORE_MMAP", "false").lower() in ("1", "true", "yes")
+CHUNK_STORE_DIR: str = os.getenv("CHUNK_STORE_DIR", "data")
+
+# Near-duplicate chunk filter (MinHash/LSH)
+DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+DEDUP_INDEX_PATH: str = os.getenv("DEDUP_INDEX_PATH", os.path.join("data", "dedup_index.pkl"))
+DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM: int = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_BANDS: int = int(os.getenv("DEDUP_BANDS", "16"))
+
+# LLM gateway (shared client, limits, retries, response cache)
+LLM_BASE_URL: Optional[str] = os.getenv("LLM_BASE_URL")  # e.g. http://localhost:8089/v1 for the offline stub
+LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_RPM: float = float(os.getenv("LLM_RPM", "0"))  # requests per minute, 0 = unlimited
+LLM_TPM: float = float(os.getenv("LLM_TPM", "0"))  # tokens per minute, 0 = unlimited
+LLM_EXPECTED_OUTPUT_TOKENS: int = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "512"))
+LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_S: float = float(os.getenv("LLM_BACKOFF_BASE_S", "0.5"))
+LLM_BACKOFF_MAX_S: float = float(os.getenv("LLM_BACKOFF_MAX_S", "30"))
+LLM_TIMEOUT_S: float = float(os.getenv("LLM_TIMEOUT_S", "120"))
+LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Embedding cache
+EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("data", "embedding_cache.sqlite"))
+EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Ingestion pipeline
+INGEST_QUEUE_PATH: str = os.getenv("INGEST_QUEUE_PATH", os.path.join("data", "ingest_queue.sqlite"))
+INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))  # files ingested concurrently
+INGEST_JOB_ATTEMPTS: int = int(os.getenv("INGEST_JOB_ATTEMPTS", "3"))
+INGEST_JOB_BACKOFF_S: float = float(os.getenv("INGEST_JOB_BACKOFF_S", "30"))  # first retry delay, doubled per attempt
+INGEST_JOB_BACKOFF_MAX_S: float = float(os.getenv("INGEST_JOB_BACKOFF_MAX_S", "900"))
+INGEST_STATUS_POLL_S: float = float(os.getenv("INGEST_STATUS_POLL_S", "2"))
+INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_CONCURRENCY: int = int(os.getenv("INGEST_CONCURRENCY", "4"))
+INGEST_MAX_PENDING: int = int(os.getenv("INGEST_MAX_PENDING", "8"))
+INGEST_MAX_RETRIES: int = int(os.getenv("INGEST_MAX_RETRIES", "3"))
+
+# Bibliographic metadata index
+METADATA_INDEX_PATH: str = os.getenv("METADATA_INDEX_PATH", os.path.join("data", "metadata_index.sqlite"))
+
+# Answer cache
+ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_S: float = float(os.getenv("ANSWER_CACHE_TTL_S", "86400"))
+ANSWER_CACHE_SIMILARITY: float = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# Prompt context budgets (tokens)
+CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+COMPARE_TOKEN_BUDGET: int = int(os.getenv("COMPARE_TOKEN_BUDGET", "4000"))
+
+# Summarization and shared text cache
+SUMMARY_GROUP_CHARS: int = int(os.getenv("SUMMARY_GROUP_CHARS", "12000"))
+SUMMARY_MAX_CONCURRENCY: int = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "8"))
+TEXT_CACHE_PATH: str = os.getenv("TEXT_CACHE_PATH", os.path.join("data", "text_cache.sqlite"))
+TEXT_CACHE_MAX_ENTRIES: int = int(os.getenv("TEXT_CACHE_MAX_ENTRIES", "50000"))
+
+# PDF parsing
+PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", "50"))
+PDF_WORKER_MAX_MEMORY_MB: int = int(os.getenv("PDF_WORKER_MAX_MEMORY_MB", "2048"))
+PDF_WORKER_MAX_TASKS: int = int(os.getenv("PDF_WORKER_MAX_TASKS", "20"))
+PDF_STREAM_MIN_PAGES: int = int(os.getenv("PDF_STREAM_MIN_PAGES", "200"))
+PDF_STREAM_WINDOW_PAGES: int = int(os.getenv("PDF_STREAM_WINDOW_PAGES", "16"))
 
 if OPENAI_API_KEY is None:
     print("⚠️ WARNING: OPENAI API KEY not set in environment (API calls will fail).")
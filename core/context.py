@@ -0,0 +1,121 @@
+import logging
+import re
+from functools import lru_cache
+from typing import List
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base" if model.startswith(("gpt-4o", "o1", "o3", "gpt-4.1")) else "cl100k_base")
+    except Exception as e:
+        logger.warning(f"No tokenizer for {model} ({e}); estimating 4 characters per token.")
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    enc = _encoding(model)
+    return len(enc.encode(text, disallowed_special=())) if enc else len(text) // 4 + 1
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str) -> str:
+    enc = _encoding(model)
+    if enc is None:
+        return text[: max_tokens * 4]
+    return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _merge_adjacent(docs: List[Document]) -> List[Document]:
+    # Chunks from the same page whose character ranges overlap or touch (the splitter
+    # uses a 50-char overlap) are stitched back together into one passage.
+    merged: List[Document] = []
+    positioned = {}
+    for rank, d in enumerate(docs):
+        start = d.metadata.get("start_index")
+        if start is None:
+            merged.append(_passage(d, d.page_content, rank))
+            continue
+        positioned.setdefault((d.metadata.get("source"), d.metadata.get("page")), []).append((start, rank, d))
+
+    for group in positioned.values():
+        group.sort(key=lambda x: x[0])
+        cur_start, cur_rank, cur = group[0]
+        text = cur.page_content
+        for start, rank, d in group[1:]:
+            end = cur_start + len(text)
+            if start <= end:
+                text += d.page_content[end - start:]
+                cur_rank = min(cur_rank, rank)
+                continue
+            merged.append(_passage(cur, text, cur_rank))
+            cur_start, cur_rank, cur, text = start, rank, d, d.page_content
+        merged.append(_passage(cur, text, cur_rank))
+
+    merged.sort(key=lambda d: d.metadata["_rank"])
+    for d in merged:
+        del d.metadata["_rank"]
+    return merged
+
+
+def _passage(doc: Document, text: str, rank: int) -> Document:
+    return Document(page_content=text, metadata={**doc.metadata, "_rank": rank})
+
+
+def _shingles(text: str, n: int = 3) -> set:
+    words = _WORD_RE.findall(text.lower())
+    return {" ".join(words[i:i + n]) for i in range(max(len(words) - n + 1, 1))}
+
+
+def _drop_near_duplicates(docs: List[Document], threshold: float) -> List[Document]:
+    kept: List[Document] = []
+    kept_shingles: List[set] = []
+    for d in docs:
+        sh = _shingles(d.page_content)
+        if any(len(sh & other) / max(len(sh | other), 1) >= threshold for other in kept_shingles):
+            continue
+        kept.append(d)
+        kept_shingles.append(sh)
+    return kept
+
+
+def pack_context(
+    docs: List[Document],
+    budget_tokens: int,
+    model: str,
+    dedup_threshold: float = 0.9,
+    min_tail_tokens: int = 64,
+) -> List[Document]:
+    """Select passages that fit ``budget_tokens``, most relevant first.
+
+    ``docs`` are expected in priority order (e.g. reranked). Adjacent chunks are merged
+    and near-duplicates dropped before filling the budget; a passage that does not fit
+    is truncated if at least ``min_tail_tokens`` remain.
+    """
+    passages = _drop_near_duplicates(_merge_adjacent(list(docs)), dedup_threshold)
+    packed: List[Document] = []
+    used = 0
+    for d in passages:
+        tokens = count_tokens(d.page_content, model)
+        if used + tokens <= budget_tokens:
+            packed.append(d)
+            used += tokens
+            continue
+        remaining = budget_tokens - used
+        if remaining >= min_tail_tokens:
+            text = truncate_tokens(d.page_content, remaining, model)
+            packed.append(Document(page_content=text + " …", metadata={**d.metadata, "truncated": True}))
+            used += remaining
+        break
+    logger.debug(f"Packed {len(packed)}/{len(docs)} chunk(s) into {used}/{budget_tokens} tokens")
+    return packed
+
@@ -0,0 +1,278 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from langchain.schema import Document
+from core.config import DEDUP_ENABLED, DEDUP_INDEX_PATH, DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_BANDS
+from core.sparse_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+_PRIME = (1 << 31) - 1
+_SHINGLE = 5
+MAX_ORIGINS = 50
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    words = tokenize(text)
+    grams = {" ".join(words[i:i + _SHINGLE]) for i in range(max(len(words) - _SHINGLE + 1, 1))}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little") % _PRIME for g in grams),
+        dtype=np.int64,
+        count=len(grams),
+    )
+
+
+@dataclass
+class DedupReport:
+    chunks: int = 0
+    kept: int = 0
+    within_source: int = 0
+    cross_source: int = 0
+    chars_saved: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.within_source + self.cross_source
+
+    @property
+    def fraction_saved(self) -> float:
+        return self.skipped / self.chunks if self.chunks else 0.0
+
+
+@dataclass
+class _Entry:
+    point_id: str
+    signature: np.ndarray
+    origins: List[Tuple[str, Optional[int]]] = field(default_factory=list)
+
+
+@dataclass
+class PendingDedup:
+    """Entries and origins found by ``filter`` that ``commit`` adds to the index."""
+
+    report: DedupReport
+    entries: List[_Entry] = field(default_factory=list)
+    origins: Dict[str, List[Tuple[str, Optional[int]]]] = field(default_factory=dict)
+
+
+class NearDuplicateIndex:
+    """MinHash signatures with LSH banding over every embedded chunk, shared across sources.
+
+    A chunk whose estimated Jaccard similarity (word 5-gram shingles) to an indexed chunk
+    reaches the threshold is not embedded again; its (source, page) is recorded as another
+    origin of the indexed chunk instead.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEDUP_INDEX_PATH,
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = DEDUP_NUM_PERM,
+        bands: int = DEDUP_BANDS,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError(f"DEDUP_NUM_PERM ({num_perm}) must be a multiple of DEDUP_BANDS ({bands})")
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+        self._entries: List[_Entry] = []
+        self._by_point: Dict[str, int] = {}
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self.totals = DedupReport()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            if state["bands"] != self.bands or len(state["a"]) != len(self._a):
+                logger.warning("Near-duplicate index was built with other LSH parameters; starting empty")
+                return
+            self._a, self._b = state["a"], state["b"]
+            self._entries, self._buckets = state["entries"], state["buckets"]
+            self._by_point = {e.point_id: i for i, e in enumerate(self._entries)}
+        except Exception as e:
+            logger.warning(f"Could not load near-duplicate index: {e}")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            state = {"bands": self.bands, "a": self._a, "b": self._b, "entries": self._entries, "buckets": self._buckets}
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = _shingle_hashes(text)
+        # (a * x + b) mod p for every permutation and shingle; a, x < 2^31 so int64 cannot overflow.
+        return ((np.outer(self._a, shingles) + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _match(self, signature: np.ndarray, keys: List[bytes], entries: List[_Entry], buckets: List[Dict[bytes, List[int]]]) -> Optional[int]:
+        candidates = {i for band, key in enumerate(keys) for i in buckets[band].get(key, ())}
+        best, best_sim = None, self.threshold
+        for i in candidates:
+            sim = float(np.mean(entries[i].signature == signature))
+            if sim >= best_sim:
+                best, best_sim = i, sim
+        return best
+
+    def filter(
+        self, docs: List[Document], point_id_fn: Callable[[Document], str]
+    ) -> Tuple[List[Document], Dict[str, List[str]], DedupReport, "PendingDedup"]:
+        """Split ``docs`` into chunks to embed and duplicates of already indexed chunks.
+
+        Returns (chunks to embed, {existing point id: all its sources} for points that gained
+        a source, report, pending changes). Nothing is recorded until ``commit(pending)`` is
+        called once the kept chunks are stored, so a failed ingestion leaves the index as it
+        was. Kept chunks get a ``dedup_key`` metadata entry for ``origins``.
+        """
+        report = DedupReport(chunks=len(docs))
+        pending = PendingDedup(report)
+        keep: List[Document] = []
+        new_sources: Dict[str, List[str]] = {}
+        local_buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        local_ids: Dict[str, int] = {}
+
+        def add_origin(origins: List[Tuple[str, Optional[int]]], origin: Tuple[str, Optional[int]]) -> None:
+            if origin not in origins and len(origins) < MAX_ORIGINS:
+                origins.append(origin)
+
+        with self._lock:
+            for doc in docs:
+                source, page = doc.metadata.get("source"), doc.metadata.get("page")
+                pid = point_id_fn(doc)
+                signature = None
+                if pid not in local_ids:
+                    signature = self.signature(doc.page_content)
+                    keys = self._band_keys(signature)
+                    match = self._match(signature, keys, pending.entries, local_buckets)
+                    if match is not None:
+                        pid = pending.entries[match].point_id
+                if pid in local_ids:
+                    # Repeated within this batch (running headers, footers, near-identical text).
+                    entry = pending.entries[local_ids[pid]]
+                    known = {s for s, _ in entry.origins} | set(new_sources.get(pid, ()))
+                    if source in known:
+                        report.within_source += 1
+                    else:
+                        report.cross_source += 1
+                        new_sources[pid] = sorted(known | {source})
+                    add_origin(entry.origins, (source, page))
+                    report.chars_saved += len(doc.page_content)
+                    continue
+                match = self._match(signature, keys, self._entries, self._buckets)
+                if match is not None and self._entries[match].point_id != pid:
+                    entry = self._entries[match]
+                    extra = pending.origins.setdefault(entry.point_id, [])
+                    known = {s for s, _ in entry.origins} | {s for s, _ in extra}
+                    if source in known:
+                        report.within_source += 1
+                    else:
+                        report.cross_source += 1
+                        new_sources[entry.point_id] = sorted(known | {source})
+                    add_origin(extra, (source, page))
+                    report.chars_saved += len(doc.page_content)
+                    continue
+                existing = self._by_point.get(pid)
+                if existing is not None:
+                    # Re-ingested chunk: the upsert resets its payload, so restore its other sources.
+                    known = {s for s, _ in self._entries[existing].origins}
+                    if known - {source}:
+                        new_sources[pid] = sorted(known | {source})
+                    add_origin(pending.origins.setdefault(pid, []), (source, page))
+                local_ids[pid] = len(pending.entries)
+                pending.entries.append(_Entry(pid, signature, [(source, page)]))
+                for band, key in enumerate(keys):
+                    local_buckets[band].setdefault(key, []).append(local_ids[pid])
+                doc.metadata["dedup_key"] = pid
+                keep.append(doc)
+        report.kept = len(keep)
+        if report.skipped:
+            logger.info(
+                f"Near-duplicate filter: skipped {report.skipped}/{report.chunks} chunks "
+                f"({report.within_source} within source, {report.cross_source} across sources)"
+            )
+        return keep, new_sources, report, pending
+
+    def commit(self, pending: "PendingDedup") -> None:
+        """Record a filtered batch once its kept chunks have been embedded and stored."""
+        with self._lock:
+            for new in pending.entries:
+                i = self._by_point.get(new.point_id)
+                if i is None:
+                    self._by_point[new.point_id] = len(self._entries)
+                    self._entries.append(new)
+                    for band, key in enumerate(self._band_keys(new.signature)):
+                        self._buckets[band].setdefault(key, []).append(self._by_point[new.point_id])
+                else:
+                    pending.origins.setdefault(new.point_id, []).extend(new.origins)
+            for pid, origins in pending.origins.items():
+                i = self._by_point.get(pid)
+                if i is None:
+                    continue
+                for origin in origins:
+                    if origin not in self._entries[i].origins and len(self._entries[i].origins) < MAX_ORIGINS:
+                        self._entries[i].origins.append(origin)
+            for name in ("chunks", "kept", "within_source", "cross_source", "chars_saved"):
+                setattr(self.totals, name, getattr(self.totals, name) + getattr(pending.report, name))
+            self._save()
+
+    def reset(self) -> None:
+        """Forget every entry, e.g. when the vector store it describes turns out to be empty."""
+        with self._lock:
+            self._entries, self._by_point = [], {}
+            self._buckets = [{} for _ in range(self.bands)]
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def origins(self, dedup_key: Optional[str]) -> List[Tuple[str, Optional[int]]]:
+        i = self._by_point.get(dedup_key) if dedup_key else None
+        return list(self._entries[i].origins) if i is not None else []
+
+
+_indexes: Dict[str, NearDuplicateIndex] = {}
+_index_lock = threading.Lock()
+
+
+def index_path(scope: str, path: str = DEDUP_INDEX_PATH) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.{hashlib.sha256(scope.encode('utf-8')).hexdigest()[:16]}{ext or '.pkl'}"
+
+
+def get_dedup_index(scope: str) -> Optional[NearDuplicateIndex]:
+    """The index for one vector store (backend, collection, embedding model and dimension).
+
+    Point ids only exist in the store they were written to, so each store has its own
+    index; a new collection or embedding model starts empty instead of skipping chunks.
+    """
+    if not DEDUP_ENABLED:
+        return None
+    index = _indexes.get(scope)
+    if index is None:
+        with _index_lock:
+            index = _indexes.get(scope)
+            if index is None:
+                index = _indexes[scope] = NearDuplicateIndex(index_path(scope))
+    return index
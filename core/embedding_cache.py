@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from core.config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+from core.tracing import cache_event, span
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def point_id(key: str, source: Optional[str] = None) -> str:
+    # Qdrant point IDs must be UUIDs or integers. Chunks with identical text in
+    # different papers keep separate points so source filtering still works.
+    base = uuid.UUID(key[:32])
+    return str(uuid.uuid5(base, source) if source else base)
+
+
+class EmbeddingCache:
+    """Disk-backed (SQLite) vector cache with least-recently-used eviction."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key, _ in rows]
+                    )
+            self._conn.commit()
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, Sequence[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, np.asarray(vec, dtype=np.float32).tobytes(), now) for key, vec in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+                logger.info(f"Embedding cache evicted {count - self.max_entries} entries")
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the underlying model."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache: Optional["EmbeddingCache"] = None,
+        model_name: Optional[str] = None,
+        dimension: Optional[int] = None,
+    ):
+        self.embeddings = embeddings
+        self.cache = cache or get_embedding_cache()
+        self.model_name = model_name or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self._dimension = dimension
+        # Small in-memory LRU so the answer cache and dense retrieval share one query embedding.
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._queries_lock = threading.Lock()
+
+    @property
+    def dimension(self) -> int:
+        """Vector size, from the model when it reports one, else from a probe query."""
+        if self._dimension is None:
+            self._dimension = getattr(self.embeddings, "dimension", None) or len(self.embed_query("dimension probe"))
+        return self._dimension
+
+    def key(self, text: str) -> str:
+        return content_key(self.model_name, text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.key(t) for t in texts]
+        cached = self.cache.get_many(keys)
+        missing = {k: t for k, t in zip(keys, texts) if k not in cached}
+        cache_event("embedding", True, len(texts) - len(missing))
+        cache_event("embedding", False, len(missing))
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(fresh)
+            cached.update(fresh)
+        logger.info(f"Embedded {len(missing)} new chunk(s); {len(texts) - len(missing)} served from cache")
+        return [cached[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._queries_lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+        cache_event("query_embedding", vector is not None)
+        if vector is not None:
+            return vector
+        with span("embed_query"):
+            vector = self.embeddings.embed_query(text)
+        with self._queries_lock:
+            self._queries[text] = vector
+            if len(self._queries) > 1024:
+                self._queries.popitem(last=False)
+        return vector
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
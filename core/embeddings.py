@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from core.config import (
+    EMBEDDING_PROVIDER,
+    EMBEDDING_DIM,
+    OPENAI_EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_BATCH_SIZE,
+)
+from core.embedding_cache import CachedEmbeddings
+
+logger = logging.getLogger(__name__)
+
+_OPENAI_DIMENSIONS = {"text-embedding-ada-002": 1536, "text-embedding-3-small": 1536, "text-embedding-3-large": 3072}
+
+
+def truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """Matryoshka-style truncation: keep the first ``dim`` components and re-normalise."""
+    if dim and dim < vectors.shape[-1]:
+        vectors = vectors[..., :dim]
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class LocalEmbeddings(Embeddings):
+    """sentence-transformers model on CPU, loaded once per process and run in batches.
+
+    Inference is serialised: torch already spreads one batch over all cores, so concurrent
+    ingestion batches would only oversubscribe them.
+    """
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL, batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE, dim: int = EMBEDDING_DIM):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.dim = max(0, dim)
+        self.model = f"{model_name}@{self.dim}" if self.dim else model_name
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self.load_time_s: Optional[float] = None
+
+    def _load_model(self):
+        if self._model is not None:
+            return self._model
+        with self._load_lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+
+                start = time.perf_counter()
+                self._model = SentenceTransformer(self.model_name, device="cpu")
+                self.load_time_s = time.perf_counter() - start
+                logger.info(f"Loaded embedding model {self.model_name} ({self.dimension} dims) in {self.load_time_s:.2f}s")
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        full = self._load_model().get_sentence_embedding_dimension()
+        return min(self.dim, full) if self.dim else full
+
+    def _encode(self, texts: List[str], query: bool) -> List[List[float]]:
+        if not texts:
+            return []
+        model = self._load_model()
+        # encode_query / encode_document apply the model's retrieval prompts, if it defines any.
+        encode = model.encode_query if query else model.encode_document
+        with self._encode_lock:
+            vectors = encode(texts, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False)
+        return truncate(np.asarray(vectors, dtype=np.float32), self.dim).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(list(texts), query=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text], query=True)[0]
+
+
+def create_embeddings(provider: str = EMBEDDING_PROVIDER) -> CachedEmbeddings:
+    """The configured embedding model behind the disk cache.
+
+    Cache keys (and so point ids) include the model name and any truncated dimension, so
+    switching models never mixes vectors from different spaces.
+    """
+    if provider == "local":
+        model = LocalEmbeddings()
+        return CachedEmbeddings(model, model_name=model.model)
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        if EMBEDDING_DIM:
+            # text-embedding-3 models shorten their vectors server-side.
+            model = OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL, dimensions=EMBEDDING_DIM)
+            return CachedEmbeddings(model, model_name=f"{OPENAI_EMBEDDING_MODEL}@{EMBEDDING_DIM}", dimension=EMBEDDING_DIM)
+        model = OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL)
+        return CachedEmbeddings(model, model_name=OPENAI_EMBEDDING_MODEL, dimension=_OPENAI_DIMENSIONS.get(OPENAI_EMBEDDING_MODEL))
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER {provider!r} (expected 'openai' or 'local')")
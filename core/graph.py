@@ -1,18 +1,11 @@
-from langgraph.graph import StateGraph, START, END
+import threading
 from core.state import ResearchState
-from functools import partial
-from core.retrieval import hybrid_retrieve
-from core.processing import generate_answer, summarize_docs, compare_papers, generate_bibliographic_citation
-from core.vectorstore import load_vectorstore
 
-db = load_vectorstore()
-
-graph = StateGraph(ResearchState)
-graph.add_node("retrieve", partial(hybrid_retrieve))
-graph.add_node("generate_answer", generate_answer)
-graph.add_node("summarize", summarize_docs)
-graph.add_node("compare", compare_papers)
-graph.add_node("generate_citations", generate_bibliographic_citation)
+# The compiled graph (and with it langgraph, the retrievers and the vectorstore
+# client) is built on first use rather than at import, so the UI can render first.
+_app = None
+_task_apps = {}
+_app_lock = threading.Lock()
 
 def route_task(state: ResearchState) -> str:
     mode = state.get("research_params", {}).get("mode", "standard_qa")
@@ -25,16 +18,74 @@ def route_task(state: ResearchState) -> str:
     else:
         return "generate_answer"
 
-graph.add_edge(START, "retrieve")
-graph.add_conditional_edges("retrieve", route_task, {
-    "generate_answer": "generate_answer",
-    "summarize": "summarize",
-    "compare": "compare",
-    "generate_citations": "generate_citations",
-})
-graph.add_edge("generate_answer", END)
-graph.add_edge("summarize", END)
-graph.add_edge("compare", END)
-graph.add_edge("generate_citations", END)
-
-app = graph.compile()
+def route_cache(state: ResearchState) -> str:
+    return "hit" if state.get("cache_hit") else "miss"
+
+def build_graph():
+    from langgraph.graph import StateGraph, START, END
+    from functools import partial
+    from core.retrieval import hybrid_retrieve
+    from core.processing import generate_answer, summarize_docs, compare_papers, generate_bibliographic_citation
+    from core.answer_cache import lookup_answer, store_answer
+    from core.tracing import traced_node
+
+    nodes = {
+        "cache_lookup": lookup_answer,
+        "retrieve": partial(hybrid_retrieve),
+        "generate_answer": generate_answer,
+        "summarize": summarize_docs,
+        "compare": compare_papers,
+        "generate_citations": generate_bibliographic_citation,
+        "cache_store": store_answer,
+    }
+    graph = StateGraph(ResearchState)
+    for name, fn in nodes.items():
+        graph.add_node(name, traced_node(name, fn))
+
+    graph.add_edge(START, "cache_lookup")
+    graph.add_conditional_edges("cache_lookup", route_cache, {"hit": END, "miss": "retrieve"})
+    graph.add_conditional_edges("retrieve", route_task, {
+        "generate_answer": "generate_answer",
+        "summarize": "summarize",
+        "compare": "compare",
+        "generate_citations": "generate_citations",
+    })
+    graph.add_edge("generate_answer", "cache_store")
+    graph.add_edge("cache_store", END)
+    graph.add_edge("summarize", END)
+    graph.add_edge("compare", END)
+    graph.add_edge("generate_citations", END)
+    return graph
+
+def get_app():
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = build_graph().compile()
+    return _app
+
+def get_task_app(task: str):
+    # Single-node graphs for tools that bring their own docs (summary, comparison) or need
+    # none (citations come from the metadata index), so they can run through the graph's
+    # streaming API without the retrieval step.
+    if task not in _task_apps:
+        with _app_lock:
+            if task not in _task_apps:
+                from langgraph.graph import StateGraph, START, END
+                from core.processing import summarize_docs, compare_papers, generate_bibliographic_citation
+                from core.tracing import traced_node
+
+                nodes = {"summarize": summarize_docs, "compare": compare_papers, "citations": generate_bibliographic_citation}
+                graph = StateGraph(ResearchState)
+                graph.add_node(task, traced_node(task, nodes[task]))
+                graph.add_edge(START, task)
+                graph.add_edge(task, END)
+                _task_apps[task] = graph.compile()
+    return _task_apps[task]
+
+def __getattr__(name: str):
+    # Backwards compatible `from core.graph import app`.
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
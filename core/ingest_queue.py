@@ -0,0 +1,292 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+from core.config import (
+    INGEST_QUEUE_PATH, INGEST_WORKERS, INGEST_JOB_ATTEMPTS, INGEST_JOB_BACKOFF_S, INGEST_JOB_BACKOFF_MAX_S,
+    PDF_STREAM_MIN_PAGES,
+)
+from core.text_cache import text_key
+
+logger = logging.getLogger(__name__)
+
+QUEUED, PARSING, EMBEDDING, INDEXED, FAILED = "queued", "parsing", "embedding", "indexed", "failed"
+ACTIVE = (QUEUED, PARSING, EMBEDDING)
+
+
+@dataclass
+class IngestJob:
+    id: str
+    source: str
+    path: str
+    content_hash: str
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
+    total_pages: int = 0
+    pages_done: int = 0
+    chunks: int = 0
+    chunks_done: int = 0
+    duplicates_skipped: int = 0
+    updated_at: float = 0.0
+    not_before: float = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    def describe(self) -> str:
+        if self.status == EMBEDDING and self.total_pages and self.pages_done < self.total_pages:
+            return f"embedding, {self.pages_done}/{self.total_pages} pages indexed"
+        if self.status == EMBEDDING and self.chunks:
+            return f"embedding {self.chunks_done}/{self.chunks} chunks"
+        if self.status == INDEXED:
+            dup = f", {self.duplicates_skipped} near-duplicates skipped" if self.duplicates_skipped else ""
+            return f"indexed, {self.chunks} chunks{dup}"
+        if self.status == FAILED:
+            return f"failed after {self.attempts} attempt(s): {self.error}"
+        if self.status == QUEUED and self.attempts:
+            wait = self.not_before - time.time()
+            due = f", next attempt in {wait:.0f}s" if wait > 1 else ""
+            return f"queued for retry ({self.attempts} failed attempt(s){due})"
+        return self.status
+
+
+_COLUMNS = [
+    "id", "source", "path", "content_hash", "status", "attempts", "error", "total_pages",
+    "pages_done", "chunks", "chunks_done", "duplicates_skipped", "updated_at", "not_before",
+]
+
+
+def _select_jobs(conn: sqlite3.Connection, statuses=None) -> List[IngestJob]:
+    query = f"SELECT {', '.join(_COLUMNS)} FROM jobs"
+    args: tuple = ()
+    if statuses:
+        query += f" WHERE status IN ({', '.join('?' for _ in statuses)})"
+        args = tuple(statuses)
+    return [IngestJob(*row) for row in conn.execute(query + " ORDER BY created_at", args).fetchall()]
+
+
+def read_jobs(statuses=None, path: str = INGEST_QUEUE_PATH) -> List[IngestJob]:
+    """Jobs in the queue database, read-only.
+
+    Unlike ``get_ingest_queue().jobs()`` this neither re-queues interrupted jobs nor
+    starts workers, so tools that only need the list of indexed papers can use it while
+    the app is running.
+    """
+    if not os.path.exists(path):
+        return []
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return _select_jobs(conn, statuses)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Could not read ingestion jobs from {path}: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+class IngestQueue:
+    """Persistent (SQLite) ingestion queue shared by every session, drained by worker threads.
+
+    A job is keyed by (source, content hash), so the same file uploaded from several
+    sessions is processed once. Jobs left mid-flight by a crash are re-queued on start-up;
+    failures are retried up to INGEST_JOB_ATTEMPTS times, with exponential backoff. Every step is idempotent
+    (content-derived point ids, BM25 and chunk-store replacement), so a retry simply
+    redoes the job.
+    """
+
+    def __init__(
+        self,
+        path: str = INGEST_QUEUE_PATH,
+        workers: int = INGEST_WORKERS,
+        max_attempts: int = INGEST_JOB_ATTEMPTS,
+        backoff_s: float = INGEST_JOB_BACKOFF_S,
+        backoff_max_s: float = INGEST_JOB_BACKOFF_MAX_S,
+    ):
+        self.path = path
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_s = backoff_s
+        self.backoff_max_s = backoff_max_s
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, source TEXT NOT NULL, path TEXT NOT NULL, content_hash TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, error TEXT, "
+            "total_pages INTEGER NOT NULL DEFAULT 0, pages_done INTEGER NOT NULL DEFAULT 0, "
+            "chunks INTEGER NOT NULL DEFAULT 0, chunks_done INTEGER NOT NULL DEFAULT 0, "
+            "duplicates_skipped INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, not_before REAL NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "not_before" not in columns:  # queue created by an earlier release
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN not_before REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        resumed = self._conn.execute(
+            "UPDATE jobs SET status = ? WHERE status IN (?, ?)", (QUEUED, PARSING, EMBEDDING)
+        ).rowcount
+        self._conn.commit()
+        if resumed:
+            logger.info(f"Re-queued {resumed} ingestion job(s) interrupted by a restart")
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"ingest-{i}", daemon=True) for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @staticmethod
+    def job_id(source: str, content_hash: str) -> str:
+        return text_key(source, content_hash)
+
+    def _row(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return IngestJob(*row) if row else None
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def submit(self, source: str, path: str, content_hash: str) -> IngestJob:
+        """Queue a file unless an identical one is queued, running or already indexed."""
+        from core.chunk_store import get_chunk_store
+
+        job_id = self.job_id(source, content_hash)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, source, path, content_hash, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, source, path, content_hash, QUEUED, now, now),
+            )
+            self._conn.commit()
+        job = self._row(job_id)
+        # Indexed in an earlier process: vectors and BM25 are on disk, but the in-memory
+        # chunk store is empty, so redo the job (embeddings come from the cache).
+        stale = job.status == INDEXED and get_chunk_store().lookup(source, content_hash) is None
+        if job.status == FAILED or stale:
+            job = self.retry(job_id, path=path, attempts=0)
+        self._notify()
+        return job
+
+    def retry(self, job_id: str, **fields) -> IngestJob:
+        self._update(job_id, status=QUEUED, error=None, pages_done=0, chunks_done=0, not_before=0.0, **fields)
+        self._notify()
+        return self._row(job_id)
+
+    def status(self, source: str, content_hash: Optional[str]) -> Optional[IngestJob]:
+        return self._row(self.job_id(source, content_hash)) if content_hash else None
+
+    def jobs(self, statuses=None) -> List[IngestJob]:
+        with self._lock:
+            return _select_jobs(self._conn, statuses)
+
+    def _notify(self) -> None:
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _claim(self) -> Optional[IngestJob]:
+        with self._lock:
+            # Jobs waiting out a retry backoff are skipped until due.
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? AND not_before <= ? ORDER BY created_at LIMIT 1", (QUEUED, time.time())
+            ).fetchone()
+            if row is None:
+                return None
+            # Conditional update, so two workers (or processes) never claim the same job.
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (PARSING, time.time(), row[0], QUEUED),
+            ).rowcount
+            self._conn.commit()
+        return self._row(row[0]) if claimed else None
+
+    def _work(self) -> None:
+        while True:
+            job = self._claim()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=5.0)
+                continue
+            try:
+                self._run(job)
+            except Exception as e:
+                attempts = job.attempts + 1
+                status = QUEUED if attempts < self.max_attempts else FAILED
+                delay = min(self.backoff_max_s, self.backoff_s * 2 ** (attempts - 1))
+                self._update(job.id, status=status, attempts=attempts, error=str(e), not_before=time.time() + delay)
+                retry = f"; retrying in {delay:.0f}s" if status == QUEUED else ""
+                logger.error(f"Ingestion of {job.source} failed (attempt {attempts}/{self.max_attempts}): {e}{retry}")
+
+    def _run(self, job: IngestJob) -> None:
+        from core.loader import page_count
+        from core.bibliography import get_metadata_index
+
+        total_pages = page_count(job.path)
+        self._update(job.id, total_pages=total_pages)
+        # Title, authors, year, DOI and venue from the document info and first page, once per file.
+        get_metadata_index().add_pdf(job.path, job.source, job.content_hash)
+        if total_pages >= PDF_STREAM_MIN_PAGES:
+            self._run_progressive(job)
+        else:
+            self._run_whole(job)
+        logger.info(f"Ingestion of {job.source} finished")
+
+    def _run_whole(self, job: IngestJob) -> None:
+        from core.loader import get_pdf_pool, load_and_split_pdfs
+        from core.vectorstore import build_vectorstore
+        from core.sparse_index import get_sparse_index
+        from core.chunk_store import get_chunk_store
+        from core.answer_cache import get_answer_cache
+
+        chunks = load_and_split_pdfs([job.path], pool=get_pdf_pool())[job.path]
+        self._update(job.id, status=EMBEDDING, chunks=len(chunks))
+        dedup = []
+        build_vectorstore(
+            chunks,
+            progress=lambda stats: self._update(job.id, chunks_done=stats.chunks_upserted),
+            on_dedup=dedup.append,
+        )
+        get_sparse_index().replace_source(job.source, chunks)
+        get_chunk_store().add_paper(job.source, chunks, job.content_hash)
+        get_answer_cache().invalidate(job.source)
+        skipped = dedup[0].skipped if dedup else 0
+        self._update(job.id, status=INDEXED, chunks_done=len(chunks), duplicates_skipped=skipped, error=None)
+
+    def _run_progressive(self, job: IngestJob) -> None:
+        from core.progressive_ingest import ingest_pdf_progressively
+
+        # Long PDFs become queryable window by window while they are indexed.
+        self._update(job.id, status=EMBEDDING)
+        progress = ingest_pdf_progressively(
+            job.path,
+            on_window=lambda p: self._update(job.id, pages_done=p.pages_indexed, chunks=p.chunks_indexed, chunks_done=p.chunks_indexed),
+        )
+        if progress.error:
+            raise RuntimeError(progress.error)
+        self._update(job.id, status=INDEXED, pages_done=progress.pages_indexed, chunks=progress.chunks_indexed, error=None)
+
+
+_queue: Optional[IngestQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_ingest_queue() -> IngestQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = IngestQueue()
+    return _queue
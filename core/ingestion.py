@@ -0,0 +1,138 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+from langchain.schema import Document
+from core.config import INGEST_BATCH_SIZE, INGEST_CONCURRENCY, INGEST_MAX_PENDING, INGEST_MAX_RETRIES
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+UpsertFn = Callable[[List[Document], List[List[float]]], None]
+
+
+@dataclass
+class IngestionStats:
+    total_chunks: Optional[int] = None
+    batches: int = 0
+    chunks_upserted: int = 0
+    retries: int = 0
+    failed_batches: int = 0
+    errors: List[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.perf_counter)
+    elapsed_s: float = 0.0
+
+    @property
+    def chunks_per_s(self) -> float:
+        return self.chunks_upserted / self.elapsed_s if self.elapsed_s else 0.0
+
+    @property
+    def fraction_done(self) -> Optional[float]:
+        if not self.total_chunks:
+            return None
+        return min(1.0, self.chunks_upserted / self.total_chunks)
+
+
+def _batched(docs: Iterable[Document], size: int) -> Iterator[List[Document]]:
+    it = iter(docs)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _with_retries(fn, *args, max_retries: int, stats: IngestionStats, backoff_s: float = 0.5):
+    attempt = 0
+    while True:
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff_s * (2 ** attempt)
+            attempt += 1
+            stats.retries += 1
+            logger.warning(f"{getattr(fn, '__name__', 'call')} failed ({e}); retry {attempt}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def run_ingestion(
+    docs: Iterable[Document],
+    embed_fn: EmbedFn,
+    upsert_fn: UpsertFn,
+    batch_size: int = INGEST_BATCH_SIZE,
+    max_concurrency: int = INGEST_CONCURRENCY,
+    max_pending: int = INGEST_MAX_PENDING,
+    max_retries: int = INGEST_MAX_RETRIES,
+    progress: Optional[Callable[[IngestionStats], None]] = None,
+) -> IngestionStats:
+    """Embed chunks in fixed-size batches on a thread pool and upsert them as they complete.
+
+    Upserts and progress callbacks run on the calling thread (safe for Streamlit
+    widgets). At most ``max_concurrency + max_pending`` batches are embedded but not
+    yet upserted; beyond that the producer blocks, so memory stays bounded.
+    """
+    stats = IngestionStats(total_chunks=len(docs) if isinstance(docs, Sequence) else None)
+    slots = threading.Semaphore(max_concurrency + max_pending)
+    results: "queue.Queue" = queue.Queue()
+    done = object()
+
+    def embed_batch(batch: List[Document]):
+        try:
+            vectors = _with_retries(embed_fn, [d.page_content for d in batch], max_retries=max_retries, stats=stats)
+            results.put((batch, vectors, None))
+        except Exception as e:
+            results.put((batch, None, e))
+
+    def produce(pool: ThreadPoolExecutor):
+        try:
+            futures = []
+            for batch in _batched(docs, batch_size):
+                slots.acquire()
+                futures.append(pool.submit(embed_batch, batch))
+            for f in futures:
+                f.result()
+            results.put(done)
+        except Exception as e:
+            results.put(e)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embed") as pool:
+        producer = threading.Thread(target=produce, args=(pool,), name="ingest-producer", daemon=True)
+        producer.start()
+        while True:
+            item = results.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                stats.errors.append(f"Chunk producer failed: {item}")
+                break
+            batch, vectors, error = item
+            if error is None:
+                try:
+                    _with_retries(upsert_fn, batch, vectors, max_retries=max_retries, stats=stats)
+                    stats.chunks_upserted += len(batch)
+                except Exception as e:
+                    error = e
+            if error is not None:
+                stats.failed_batches += 1
+                stats.errors.append(str(error))
+                logger.error(f"Ingestion batch of {len(batch)} chunks failed: {error}")
+            stats.batches += 1
+            stats.elapsed_s = time.perf_counter() - stats.started_at
+            slots.release()
+            if progress:
+                progress(stats)
+        producer.join()
+
+    stats.elapsed_s = time.perf_counter() - stats.started_at
+    logger.info(
+        f"Ingested {stats.chunks_upserted} chunks in {stats.batches} batches "
+        f"({stats.elapsed_s:.2f}s, {stats.chunks_per_s:.1f} chunks/s, {stats.retries} retries)"
+    )
+    return stats
+
@@ -0,0 +1,346 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import warnings
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence
+import httpx
+import openai
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+from core.config import (
+    OPENAI_MODEL,
+    LLM_BASE_URL,
+    LLM_MAX_CONCURRENCY,
+    LLM_RPM,
+    LLM_TPM,
+    LLM_EXPECTED_OUTPUT_TOKENS,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_S,
+    LLM_BACKOFF_MAX_S,
+    LLM_TIMEOUT_S,
+    LLM_CACHE_ENABLED,
+)
+from core.context import count_tokens
+from core.text_cache import get_text_cache, text_key
+from core.tracing import llm_callbacks, metrics
+
+logger = logging.getLogger(__name__)
+
+_RETRYABLE = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError, openai.APITimeoutError)
+
+
+class LeaderAbandoned(RuntimeError):
+    """The caller leading a coalesced request went away before it finished; followers retry it."""
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units per minute up to one minute's worth; 0 disables the limit."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self._tokens = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until ``amount`` units are available; returns the time spent waiting."""
+        if self.capacity <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.capacity / 60.0)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) * 60.0 / self.capacity
+            time.sleep(delay)
+            waited += delay
+
+
+class LLMGateway:
+    """Process-wide coordination of LLM calls across sessions.
+
+    Every upstream request takes a concurrency slot and request/token budget, identical
+    in-flight prompts are coalesced into one request (single-flight), and 429/5xx/connection
+    errors are retried with exponential backoff. A 429 pauses all callers until its delay
+    has passed, so sessions back off together instead of hammering the provider.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rpm: float = LLM_RPM,
+        tpm: float = LLM_TPM,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base_s: float = LLM_BACKOFF_BASE_S,
+        backoff_max_s: float = LLM_BACKOFF_MAX_S,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            timeout=LLM_TIMEOUT_S,
+        )
+        self.counts: Dict[str, float] = {"upstream": 0, "coalesced": 0, "retries": 0, "errors": 0, "queue_wait_s": 0.0}
+
+    def _count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counts[name] += value
+        metrics.inc("llm_gateway", value, event=name)
+
+    @contextmanager
+    def slot(self, estimated_tokens: int) -> Iterator[None]:
+        start = time.perf_counter()
+        self._slots.acquire()
+        try:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+            self._requests.acquire(1)
+            self._tokens.acquire(estimated_tokens)
+            waited = time.perf_counter() - start
+            self._count("queue_wait_s", waited)
+            metrics.observe("llm_queue", waited)
+            self._count("upstream")
+            yield
+        finally:
+            self._slots.release()
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        delay = retry_after or min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if isinstance(error, openai.RateLimitError):
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._count("retries")
+        logger.warning(f"LLM call failed ({type(error).__name__}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def call(self, key: str, estimated_tokens: int, fn: Callable[[], ChatResult]) -> ChatResult:
+        """Run ``fn`` under the limits, sharing the result with identical concurrent calls.
+
+        Followers get their own deep copy: callers set ids and metadata on the messages.
+        """
+        while True:
+            with self._lock:
+                leader = self._inflight.get(key)
+                if leader is None:
+                    future = self._inflight[key] = Future()
+                    break
+            self._count("coalesced")
+            try:
+                return leader.result().model_copy(deep=True)
+            except LeaderAbandoned:
+                continue  # take the request over
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with self.slot(estimated_tokens):
+                        result = fn()
+                    break
+                except _RETRYABLE as e:
+                    if attempt == self.max_retries:
+                        raise
+                    time.sleep(self.backoff(attempt, e))
+            future.set_result(result.model_copy(deep=True))
+            return result
+        except Exception as e:
+            self._count("errors")
+            future.set_exception(e)
+            raise
+        except BaseException:
+            # An interrupt or cancellation of this caller is not an upstream failure.
+            future.set_exception(LeaderAbandoned(key))
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def follow(self, key: str) -> Optional[Future]:
+        """Register as leader for ``key`` (returns None) or get the in-flight leader's future."""
+        with self._lock:
+            leader = self._inflight.get(key)
+            if leader is None:
+                self._inflight[key] = Future()
+                return None
+        self._count("coalesced")
+        return leader
+
+    def finish(self, key: str, result: Optional[ChatResult] = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None:
+            future.set_exception(error) if error is not None else future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        counts["queue_wait_s"] = round(counts["queue_wait_s"], 3)
+        return {"max_concurrency": self.max_concurrency, **counts}
+
+
+class TextCacheLLMCache(BaseCache):
+    """Exact-prompt response cache on the shared SQLite text cache (namespace ``llm_response``)."""
+
+    namespace = "llm_response"
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence]:
+        value = get_text_cache().get(self.namespace, text_key(llm_string, prompt))
+        if value is None:
+            return None
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # ``loads`` is marked beta
+                return loads(value, allowed_objects="core")
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cached LLM response: {e}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence) -> None:
+        get_text_cache().put(self.namespace, text_key(llm_string, prompt), dumps(list(return_val)))
+
+    def clear(self, **kwargs: Any) -> None:
+        pass
+
+
+class GatewayChatOpenAI(ChatOpenAI):
+    """``ChatOpenAI`` whose upstream calls (plain and streamed) go through the ``LLMGateway``.
+
+    The gateway is thread-based, so the async methods run the sync calls in worker threads
+    instead of using ChatOpenAI's async client, which would bypass its limits.
+    """
+
+    def _estimate_tokens(self, messages: List[BaseMessage]) -> int:
+        text = "\n".join(m.content if isinstance(m.content, str) else str(m.content) for m in messages)
+        return count_tokens(text, self.model_name) + LLM_EXPECTED_OUTPUT_TOKENS
+
+    def _request_key(self, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> str:
+        return text_key(self._get_llm_string(stop=stop, **kwargs), dumps(messages))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = self._request_key(messages, stop, **kwargs)
+        return get_llm_gateway().call(
+            key,
+            self._estimate_tokens(messages),
+            lambda: ChatOpenAI._generate(self, messages, stop=stop, run_manager=run_manager, **kwargs),
+        )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        gateway = get_llm_gateway()
+        key = self._request_key(messages, stop, **kwargs)
+        while True:
+            leader = gateway.follow(key)
+            if leader is None:
+                break
+            # An identical prompt is already streaming for another session: reuse its answer.
+            try:
+                message = leader.result().generations[0].message
+            except LeaderAbandoned:
+                continue  # its reader went away mid-stream: take the request over
+            yield ChatGenerationChunk(message=AIMessageChunk(content=message.content))
+            return
+        chunks: List[ChatGenerationChunk] = []
+        try:
+            for attempt in range(gateway.max_retries + 1):
+                try:
+                    with gateway.slot(self._estimate_tokens(messages)):
+                        for chunk in ChatOpenAI._stream(self, messages, stop=stop, run_manager=run_manager, **kwargs):
+                            chunks.append(chunk)
+                            yield chunk
+                    break
+                except _RETRYABLE as e:
+                    # Only retry before anything reached the caller.
+                    if chunks or attempt == gateway.max_retries:
+                        raise
+                    time.sleep(gateway.backoff(attempt, e))
+        except Exception as e:
+            gateway._count("errors")
+            gateway.finish(key, error=e)
+            raise
+        except BaseException:
+            # GeneratorExit when the caller drops the stream (e.g. a Streamlit rerun), or an
+            # interrupt: followers must not fail with it, and the upstream call did not fail.
+            gateway.finish(key, error=LeaderAbandoned(key))
+            raise
+        message = chunks[0].message if chunks else AIMessageChunk(content="")
+        for chunk in chunks[1:]:
+            message = message + chunk.message
+        gateway.finish(key, result=ChatResult(generations=[ChatGenerationChunk(message=message)]))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # Token callbacks are fired by BaseChatModel from the returned result.
+        return await asyncio.to_thread(self._generate, messages, stop, None, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        chunks = self._stream(messages, stop=stop, **kwargs)
+        end = object()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, end)
+                if chunk is end:
+                    return
+                yield chunk
+        finally:
+            chunks.close()
+
+
+_gateway: Optional[LLMGateway] = None
+_models: Dict[str, GatewayChatOpenAI] = {}
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
+
+
+def get_llm(model: Optional[str] = None) -> GatewayChatOpenAI:
+    """Shared chat model for ``model``: one pooled HTTP client, gateway limits, response cache."""
+    model = model or os.getenv("OPENAI_MODEL", OPENAI_MODEL)
+    llm = _models.get(model)
+    if llm is None:
+        gateway = get_llm_gateway()
+        with _gateway_lock:
+            llm = _models.get(model)
+            if llm is None:
+                llm = _models[model] = GatewayChatOpenAI(
+                    model=model,
+                    temperature=0,
+                    base_url=LLM_BASE_URL,
+                    http_client=gateway.http_client,
+                    max_retries=0,  # retries and backoff are handled by the gateway
+                    timeout=LLM_TIMEOUT_S,
+                    cache=TextCacheLLMCache() if LLM_CACHE_ENABLED else False,
+                    callbacks=llm_callbacks(),
+                )
+    return llm
@@ -1,19 +1,38 @@
 import os
+import hashlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from typing import List
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from langchain.schema import Document
+from core.config import PDF_WORKERS, PDF_PAGES_PER_TASK, PDF_WORKER_MAX_MEMORY_MB, PDF_WORKER_MAX_TASKS, PDF_STREAM_WINDOW_PAGES
 
-def load_and_split_pdf(file_path: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[Document]:
-    loader = PyPDFLoader(file_path)
-    documents = loader.load()
-    file_name = os.path.basename(file_path)
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
 
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _split(documents: List[Document], file_name: str, chunk_size: int, chunk_overlap: int) -> List[Document]:
     for doc in documents:
         doc.metadata = doc.metadata or {}
         doc.metadata["source"] = file_name
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    # add_start_index records each chunk's character offset within its page.
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
     chunks = splitter.split_documents(documents)
 
     for c in chunks:
@@ -21,3 +40,212 @@ def load_and_split_pdf(file_path: str, chunk_size: int = 500, chunk_overlap: int
         c.metadata["source"] = file_name
 
     return chunks
+
+def load_and_split_pdf(file_path: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[Document]:
+    loader = PyPDFLoader(file_path)
+    documents = loader.load()
+    chunks = _split(documents, os.path.basename(file_path), chunk_size, chunk_overlap)
+    content_hash = file_sha256(file_path)
+    for c in chunks:
+        c.metadata["content_hash"] = content_hash
+    return chunks
+
+def _document_metadata(reader, file_path: str) -> dict:
+    # Same keys and values as PyPDFLoader's page metadata: lower-case info keys without
+    # the leading "/", stripped strings and ISO dates.
+    metadata = {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+    for key, value in (reader.metadata or {}).items():
+        key = key.lstrip("/").lower()
+        value = value if type(value) in (str, int) else str(value)
+        if key in ("creationdate", "moddate"):
+            try:
+                value = datetime.strptime(value.replace("'", ""), "D:%Y%m%d%H%M%S%z").isoformat("T")
+            except ValueError:
+                pass
+        elif isinstance(value, str):
+            value = value.strip()
+        metadata[key] = value
+    metadata.update(source=file_path, total_pages=len(reader.pages))
+    return metadata
+
+def _load_page_range(file_path: str, start: int, end: int) -> List[Document]:
+    # Mirrors PyPDFLoader's page documents, restricted to pages [start, end).
+    import pypdf
+
+    reader = pypdf.PdfReader(file_path)
+    base = _document_metadata(reader, file_path)
+    documents = []
+    for page_number in range(start, min(end, len(reader.pages))):
+        text = reader.pages[page_number].extract_text() or ""
+        metadata = dict(base, page=page_number, page_label=reader.page_labels[page_number])
+        documents.append(Document(page_content=text.strip(), metadata=metadata))
+    return documents
+
+def _split_task(task: Tuple[str, int, int, int, int]) -> List[Document]:
+    file_path, start, end, chunk_size, chunk_overlap = task
+    documents = _load_page_range(file_path, start, end)
+    return _split(documents, os.path.basename(file_path), chunk_size, chunk_overlap)
+
+def _limit_worker_memory(max_memory_mb: int) -> None:
+    if resource is None or not max_memory_mb:
+        return
+    limit = max_memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Could not cap PDF worker memory: {e}")
+
+def _new_pool(max_workers: int) -> ProcessPoolExecutor:
+    # spawn: forking a process that already runs reranker/ingestion threads is unsafe.
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_limit_worker_memory,
+        initargs=(PDF_WORKER_MAX_MEMORY_MB,),
+        max_tasks_per_child=PDF_WORKER_MAX_TASKS or None,
+    )
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Long-lived parsing pool shared by the ingestion workers.
+
+    Every queued job submits its page ranges here, so concurrent jobs and the pages of
+    one long file all fan out over the same PDF_WORKERS processes, and workers are not
+    respawned per file.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _new_pool(PDF_WORKERS or os.cpu_count() or 1)
+    return _pool
+
+def _discard_pool(pool: Executor) -> None:
+    # A worker killed mid-task (e.g. by the memory cap) breaks the whole executor: drop
+    # it so the next get_pdf_pool() starts a fresh one.
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+            logger.warning("PDF parsing pool broken; a new one will be started")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def page_count(file_path: str) -> int:
+    import pypdf
+
+    return len(pypdf.PdfReader(file_path).pages)
+
+def load_and_split_pdfs(
+    file_paths: Sequence[str],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    max_workers: Optional[int] = PDF_WORKERS,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+    return_exceptions: bool = False,
+    pool: Optional[Executor] = None,
+) -> Dict[str, Union[List[Document], Exception]]:
+    """Parse and chunk many PDFs on a process pool.
+
+    Large files are split into page ranges so one long thesis does not serialize the
+    batch. Tasks go to ``pool`` when given (see ``get_pdf_pool``), otherwise to a pool
+    created for this call. Results are keyed by path in input order (a repeated path is
+    parsed once); each file's chunks are in page order and carry ``source``, ``page``, ``start_index``, ``chunk_index`` and
+    ``content_hash`` (sha256 of the file) metadata.
+    """
+    file_paths = list(dict.fromkeys(file_paths))
+    tasks: List[Tuple[str, int, int, int, int]] = []
+    owners: List[str] = []
+    results: Dict[str, Union[List[Document], Exception]] = {path: [] for path in file_paths}
+    for path in file_paths:
+        try:
+            n_pages = page_count(path)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results[path] = e
+            continue
+        for start in range(0, max(n_pages, 1), pages_per_task):
+            tasks.append((path, start, start + pages_per_task, chunk_size, chunk_overlap))
+            owners.append(path)
+
+    def collect(executor: Executor) -> list:
+        try:
+            futures = [executor.submit(_split_task, task) for task in tasks]
+        except BrokenProcessPool as e:
+            _discard_pool(executor)
+            return [e] * len(tasks)
+        outputs = []
+        for future in futures:
+            try:
+                outputs.append(future.result())
+            except BrokenProcessPool as e:
+                _discard_pool(executor)
+                outputs.append(e)
+            except Exception as e:
+                outputs.append(e)
+        return outputs
+
+    # The memory cap only holds inside worker processes, so even a single task goes to a
+    # pool unless the cap is off (or unsupported on this platform).
+    capped = bool(PDF_WORKER_MAX_MEMORY_MB) and resource is not None
+    if not tasks:
+        outputs = []
+    elif pool is not None:
+        outputs = collect(pool)
+    elif (len(tasks) == 1 or max_workers == 1) and not capped:
+        outputs = []
+        for task in tasks:
+            try:
+                outputs.append(_split_task(task))
+            except Exception as e:
+                outputs.append(e)
+    else:
+        with _new_pool(min(max_workers or os.cpu_count() or 1, len(tasks))) as executor:
+            outputs = collect(executor)
+
+    for path, output in zip(owners, outputs):
+        if isinstance(results[path], Exception):
+            continue
+        if isinstance(output, Exception):
+            if not return_exceptions:
+                raise output
+            logger.error(f"Failed to parse {path}: {output}")
+            results[path] = output
+            continue
+        results[path].extend(output)
+
+    for path, chunks in results.items():
+        if isinstance(chunks, list):
+            content_hash = file_sha256(path)
+            for i, c in enumerate(chunks):
+                c.metadata["chunk_index"] = i
+                c.metadata["content_hash"] = content_hash
+    logger.info(f"Parsed {len(file_paths)} PDF(s) as {len(tasks)} task(s)")
+    return results
+
+def iter_pdf_windows(
+    file_path: str,
+    window_pages: int = PDF_STREAM_WINDOW_PAGES,
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+) -> Iterator[Tuple[int, int, List[Document]]]:
+    """Yield ``(first_page, end_page, chunks)`` for consecutive page windows of a PDF.
+
+    Only one window of pages is held at a time (the reader is reopened per window so its
+    object cache does not grow with the file); chunks carry the same metadata as
+    ``load_and_split_pdfs``, with ``chunk_index`` running across windows.
+    """
+    n_pages = page_count(file_path)
+    content_hash = file_sha256(file_path)
+    file_name = os.path.basename(file_path)
+    next_index = 0
+    for start in range(0, n_pages, window_pages):
+        end = min(start + window_pages, n_pages)
+        chunks = _split(_load_page_range(file_path, start, end), file_name, chunk_size, chunk_overlap)
+        for c in chunks:
+            c.metadata["chunk_index"] = next_index
+            c.metadata["content_hash"] = content_hash
+            next_index += 1
+        yield start, end, chunks
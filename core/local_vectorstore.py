@@ -0,0 +1,308 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from core.config import LOCAL_VECTOR_DTYPE, LOCAL_ANN_MIN_VECTORS, LOCAL_IVF_NLIST, LOCAL_IVF_NPROBE
+
+logger = logging.getLogger(__name__)
+
+_BLOCK = 65536
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _source_values(filter: Any) -> Optional[set]:
+    """Translate the filters dense_retrieve builds into a set of allowed sources.
+
+    Accepts a Qdrant ``Filter`` with ``FieldCondition(key="source", match=MatchValue|MatchAny)``
+    in ``must``/``should``, or a plain ``{"source": value | [values]}`` dict.
+    """
+    if filter is None:
+        return None
+    if isinstance(filter, dict):
+        value = filter.get("source")
+        if value is None:
+            return None
+        return set(value) if isinstance(value, (list, tuple, set)) else {value}
+    allowed: Optional[set] = None
+    for group in ("must", "should"):
+        for cond in getattr(filter, group, None) or []:
+            if getattr(cond, "key", None) not in ("source", "metadata.source"):
+                raise ValueError(f"Local vector backend only filters on 'source', got {cond!r}")
+            match = cond.match
+            values = set(match.any) if hasattr(match, "any") else {match.value}
+            if group == "must":
+                allowed = values if allowed is None else allowed & values
+            else:
+                allowed = values if allowed is None else allowed | values
+    return allowed
+
+
+def _as_list(source: Any) -> list:
+    return list(source) if isinstance(source, (list, tuple)) else [source]
+
+
+def _grow_memmap(path: str, dtype: np.dtype, shape: Tuple[int, ...]) -> np.memmap:
+    needed = int(np.prod(shape)) * dtype.itemsize
+    mode = "r+" if os.path.exists(path) else "w+"
+    if mode == "r+" and os.path.getsize(path) < needed:
+        with open(path, "ab") as f:
+            f.truncate(needed)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+
+class _IVFIndex:
+    """Inverted-file index: k-means centroids plus per-centroid row lists."""
+
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray):
+        self.centroids = centroids
+        self.lists = [np.flatnonzero(assignments == c) for c in range(len(centroids))]
+        self.size = len(assignments)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> "_IVFIndex":
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), size=min(len(vectors), nlist * 64), replace=False)]
+        sample = _normalize(sample.astype(np.float32))  # int8 rows carry a per-row scale
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        assignments = np.concatenate([
+            np.argmax(vectors[i:i + _BLOCK].astype(np.float32) @ centroids.T, axis=1)
+            for i in range(0, len(vectors), _BLOCK)
+        ])
+        return cls(centroids, assignments)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nearest = np.argsort(-(self.centroids @ query))[:nprobe]
+        return np.concatenate([self.lists[c] for c in nearest])
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector backend: memory-mapped matrix, exact NumPy cosine search and optional IVF.
+
+    Rows are append-only; upserting an existing id overwrites its row in place. Payloads
+    are kept in a JSON-lines log that is replayed on open. With ``dtype="int8"`` rows are
+    scalar-quantized with a per-row scale kept in a float32 side file (about 4x smaller).
+    """
+
+    def __init__(self, path: str, embeddings: Embeddings, dtype: str = LOCAL_VECTOR_DTYPE):
+        self.path = path
+        self._embedding = embeddings
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()
+        self._ids: Dict[str, int] = {}
+        self._payloads: List[dict] = []
+        self._by_source: Dict[str, List[int]] = {}
+        self._dim: Optional[int] = None
+        self._matrix: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self._ivf: Optional[_IVFIndex] = None
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.bin")
+
+    @property
+    def _scales_path(self) -> str:
+        return os.path.join(self.path, "scales.bin")
+
+    @property
+    def quantized(self) -> bool:
+        return self.dtype == np.int8
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.path, "payloads.jsonl")
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def _load(self) -> None:
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self._dim = meta["dim"]
+            self.dtype = np.dtype(meta["dtype"])
+        if os.path.exists(self._log_path):
+            with open(self._log_path) as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._set_payload(record["id"], record["row"], record["payload"])
+        if self._dim and self._payloads:
+            self._open_matrix(len(self._payloads))
+            logger.info(f"Opened local vector store at {self.path} ({len(self)} vectors, dim={self._dim})")
+
+    def _set_payload(self, point_id: str, row: int, payload: dict) -> None:
+        # "source" is a list for chunks shared by several papers (near-duplicate collapse).
+        sources = _as_list(payload.get("source"))
+        if row == len(self._payloads):
+            self._payloads.append(payload)
+        else:
+            old_sources = _as_list(self._payloads[row].get("source"))
+            self._payloads[row] = payload
+            for s in old_sources:
+                if s not in sources:
+                    self._by_source[s].remove(row)
+            sources = [s for s in sources if s not in old_sources]
+        for s in sources:
+            self._by_source.setdefault(s, []).append(row)
+        self._ids[point_id] = row
+
+    def set_sources(self, point_id: str, sources: List[str]) -> None:
+        with self._lock:
+            row = self._ids.get(point_id)
+            if row is None:
+                return
+            payload = dict(self._payloads[row], source=list(sources))
+            self._set_payload(point_id, row, payload)
+            with open(self._log_path, "a") as log:
+                log.write(json.dumps({"id": point_id, "row": row, "payload": payload}) + "\n")
+
+    def source_documents(self, source: str) -> List[Document]:
+        """Stored chunks of ``source`` (including collapsed duplicates it shares), in row order."""
+        with self._lock:
+            rows = sorted(self._by_source.get(source, []))
+            return [Document(page_content=self._payloads[r]["page_content"], metadata=dict(self._payloads[r]["metadata"])) for r in rows]
+
+    def _open_matrix(self, rows: int) -> None:
+        capacity = max(rows, 1024)
+        if self._matrix is not None and self._matrix.shape[0] >= rows:
+            return
+        if self._matrix is not None:
+            capacity = max(rows, self._matrix.shape[0] * 2)
+            self._matrix.flush()
+        self._matrix = _grow_memmap(self._vectors_path, self.dtype, (capacity, self._dim))
+        if self.quantized:
+            if self._scales is not None:
+                self._scales.flush()
+            self._scales = _grow_memmap(self._scales_path, np.dtype(np.float32), (capacity,))
+
+    def _write_rows(self, rows: List[int], matrix: np.ndarray) -> None:
+        if not self.quantized:
+            self._matrix[rows] = matrix.astype(self.dtype)
+            return
+        scales = np.maximum(np.abs(matrix).max(axis=1), 1e-12) / 127.0
+        self._matrix[rows] = np.rint(matrix / scales[:, None]).astype(np.int8)
+        self._scales[rows] = scales
+        self._scales.flush()
+
+    def _scores(self, rows: Any, query: np.ndarray) -> np.ndarray:
+        scores = self._matrix[rows].astype(np.float32) @ query
+        return scores * self._scales[rows] if self.quantized else scores
+
+    def upsert_vectors(self, ids: Sequence[str], vectors: Sequence[Sequence[float]], documents: Sequence[Document]) -> None:
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            if self._dim is None:
+                self._dim = matrix.shape[1]
+                with open(os.path.join(self.path, "meta.json"), "w") as f:
+                    json.dump({"dim": self._dim, "dtype": self.dtype.name}, f)
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(f"Vector dimension {matrix.shape[1]} does not match store dimension {self._dim}")
+            rows = []
+            assigned: Dict[str, int] = {}
+            next_row = len(self._payloads)
+            for point_id in ids:
+                row = self._ids.get(point_id, assigned.get(point_id))
+                if row is None:
+                    row = assigned[point_id] = next_row
+                    next_row += 1
+                rows.append(row)
+            self._open_matrix(next_row)
+            self._write_rows(rows, matrix)
+            self._matrix.flush()
+            with open(self._log_path, "a") as log:
+                for point_id, row, doc in zip(ids, rows, documents):
+                    payload = {"page_content": doc.page_content, "metadata": doc.metadata, "source": doc.metadata.get("source")}
+                    self._set_payload(point_id, row, payload)
+                    log.write(json.dumps({"id": point_id, "row": row, "payload": payload}) + "\n")
+            if self._ivf is not None and len(self) > self._ivf.size * 1.2:
+                self._ivf = None  # retrain lazily once the corpus has grown noticeably
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = self.embeddings.embed_documents(texts)
+        docs = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        self.upsert_vectors(ids, vectors, docs)
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, path: str = "", **kwargs: Any) -> "LocalVectorStore":
+        store = cls(path=path, embeddings=embedding)
+        store.add_texts(texts, metadatas, ids=kwargs.get("ids"))
+        return store
+
+    def _candidate_rows(self, query: np.ndarray, allowed_sources: Optional[set]) -> Optional[np.ndarray]:
+        rows = None
+        if allowed_sources is not None:
+            rows = np.unique(np.asarray([r for s in allowed_sources for r in self._by_source.get(s, [])], dtype=np.int64))
+        n = len(self)
+        if n >= LOCAL_ANN_MIN_VECTORS and (rows is None or len(rows) >= LOCAL_ANN_MIN_VECTORS):
+            if self._ivf is None:
+                self._ivf = _IVFIndex.train(self._matrix[:n], min(LOCAL_IVF_NLIST, n))
+                logger.info(f"Trained IVF index with {len(self._ivf.centroids)} lists over {n} vectors")
+            # Rows appended since training are in no list yet: scan them exactly.
+            probe = np.concatenate([self._ivf.candidates(query, LOCAL_IVF_NPROBE), np.arange(self._ivf.size, n)])
+            rows = probe if rows is None else np.intersect1d(rows, probe, assume_unique=True)
+        return rows
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4, filter: Any = None) -> List[Tuple[Document, float]]:
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            n = len(self)
+            if n == 0 or self._matrix is None:
+                return []
+            if len(query) != self._dim:
+                raise ValueError(f"Query dimension {len(query)} does not match store dimension {self._dim}; was the embedding model changed?")
+            rows = self._candidate_rows(query, _source_values(filter))
+            if rows is None:
+                scores = np.concatenate([self._scores(slice(i, min(i + _BLOCK, n)), query) for i in range(0, n, _BLOCK)])
+                rows = np.arange(n)
+            else:
+                if len(rows) == 0:
+                    return []
+                scores = self._scores(rows, query)
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            results = []
+            for i in top:
+                payload = self._payloads[rows[i]]
+                results.append((Document(page_content=payload["page_content"], metadata=dict(payload["metadata"])), float(scores[i])))
+            return results
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Any = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embeddings.embed_query(query), k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Any = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Any = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1) / 2
@@ -1,15 +1,33 @@
-import os
 import logging
-from typing import Dict
+from typing import Dict, List
 from core.state import ResearchState
-from langchain_openai import ChatOpenAI
-from core.config import OPENAI_MODEL
-from langchain.schema import Document
+from core.config import OPENAI_MODEL, SUMMARY_GROUP_CHARS, SUMMARY_MAX_CONCURRENCY, CONTEXT_TOKEN_BUDGET
+from core.context import pack_context
+from core.text_cache import get_text_cache, text_key
+from core.tracing import span
+from langchain_core.documents import Document
 
 logger = logging.getLogger(__name__)
 
 def _get_llm():
-    return ChatOpenAI(model=os.getenv("OPENAI_MODEL", OPENAI_MODEL), temperature=0)
+    from core.llm_gateway import get_llm
+
+    return get_llm()
+
+def _cite(doc: Document) -> str:
+    from core.vectorstore import dedup_index
+
+    source = doc.metadata.get("source", "unknown")
+    dedup = dedup_index()
+    if dedup is None:
+        return source
+    # Chunks collapsed by the near-duplicate filter are cited with every paper they appear in.
+    seen, others = {source}, []
+    for other, page in dedup.origins(doc.metadata.get("dedup_key")):
+        if other not in seen:
+            seen.add(other)
+            others.append(other if page is None else f"{other} p.{page + 1}")
+    return f"{source} (also in {', '.join(others)})" if others else source
 
 def generate_answer(state: ResearchState) -> ResearchState:
     llm = _get_llm()
@@ -18,8 +36,13 @@ def generate_answer(state: ResearchState) -> ResearchState:
         state["error"] = "No documents provided for answering"
         return state
 
-    context = "\n\n".join([d.page_content for d in docs])
-    citations = [f"[{i+1}] Source: {d.metadata.get('source','unknown')}" for i, d in enumerate(docs)]
+    # Merge overlapping chunks, drop near-duplicates and fill the token budget by rank;
+    # passages are numbered so inline [n] citations match the Sources list.
+    with span("pack_context", chunks=len(docs)):
+        docs = pack_context(docs, CONTEXT_TOKEN_BUDGET, getattr(llm, "model_name", OPENAI_MODEL))
+    state["docs"] = docs
+    context = "\n\n".join([f"[{i+1}] {d.page_content}" for i, d in enumerate(docs)])
+    citations = [f"[{i+1}] Source: {_cite(d)}" for i, d in enumerate(docs)]
 
     prompt = f"""
     You are a research assistant. Answer the question using only the provided context.
@@ -39,6 +62,57 @@ def generate_answer(state: ResearchState) -> ResearchState:
         logger.error(state["error"])
     return state
 
+_MAP_PROMPT = (
+    "Summarize this section of a research paper for a later synthesis. Keep the research question, methods, "
+    "datasets, quantitative results, limitations and claims it contains; do not add information.\n\nSection:\n{text}"
+)
+_COMBINE_PROMPT = (
+    "Merge these partial summaries of consecutive sections of one research paper into a single faithful summary, "
+    "keeping all key methods, results and limitations.\n\nPartial summaries:\n{text}"
+)
+
+def _group_texts(texts: List[str], max_chars: int) -> List[str]:
+    groups, current, size = [], [], 0
+    for t in texts:
+        if current and size + len(t) > max_chars:
+            groups.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(t)
+        size += len(t) + 2
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+def _map_summaries(llm, texts: List[str], prompt: str, focus: str) -> List[str]:
+    # Section summaries are cached by content hash, so re-summarizing a paper in another
+    # style (or after a restart) only pays for the final reduce call.
+    cache = get_text_cache()
+    model = getattr(llm, "model_name", OPENAI_MODEL)
+    keys = [text_key(model, prompt, focus, t) for t in texts]
+    results = [cache.get("summary_section", k) for k in keys]
+    todo = [i for i, r in enumerate(results) if r is None]
+    if todo:
+        suffix = f"\n\nPay attention to: {focus}" if focus else ""
+        prompts = [prompt.replace("{text}", texts[i]) + suffix for i in todo]
+        # "nostream" keeps section summaries out of the token stream; only the final summary streams.
+        responses = llm.batch(prompts, config={"max_concurrency": SUMMARY_MAX_CONCURRENCY, "tags": ["nostream"]})
+        for i, res in zip(todo, responses):
+            results[i] = res.content
+            cache.put("summary_section", keys[i], res.content)
+    logger.info(f"Summarized {len(texts)} section(s), {len(texts) - len(todo)} from cache")
+    return results
+
+def _map_reduce_text(llm, texts: List[str], focus: str) -> str:
+    summaries = _map_summaries(llm, _group_texts(texts, SUMMARY_GROUP_CHARS), _MAP_PROMPT, focus)
+    while len(summaries) > 1 and sum(len(s) for s in summaries) > SUMMARY_GROUP_CHARS:
+        groups = _group_texts(summaries, SUMMARY_GROUP_CHARS)
+        if len(groups) == len(summaries):
+            # Summaries longer than half the budget never share a group: merge them pairwise
+            # anyway, so every round at least halves the list and the loop terminates.
+            groups = ["\n\n".join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+        summaries = _map_summaries(llm, groups, _COMBINE_PROMPT, focus)
+    return "\n\n".join(summaries)
+
 def summarize_docs(state: ResearchState) -> ResearchState:
     llm = _get_llm()
     docs = state.get("docs", [])
@@ -56,15 +130,16 @@ def summarize_docs(state: ResearchState) -> ResearchState:
     }
     template = templates.get(mode, templates["abstract"])
 
-    text = "\n\n".join([d.page_content for d in docs])
-    if len(text) > 8000:
-        text = text[:4000] + "\n\n...[middle content omitted]...\n\n" + text[-4000:]
-        state["truncation_note"] = "Document truncated for summarization."
-
     if research_focus:
         template += f"\n\nPay attention to: {research_focus}"
 
     try:
+        # Long documents are summarized section by section in parallel (map), then the
+        # section summaries are merged (reduce) so the whole paper is covered.
+        texts = [d.page_content for d in docs]
+        text = "\n\n".join(texts)
+        if len(text) > SUMMARY_GROUP_CHARS:
+            text = _map_reduce_text(llm, texts, research_focus)
         res = llm.invoke(template.replace("{text}", text))
         state["summary"] = res.content
     except Exception as e:
@@ -79,48 +154,43 @@ def compare_papers(state: ResearchState) -> ResearchState:
         state["comparison"] = "⚠️ No documents provided for comparison."
         return state
 
-    sources = list({d.metadata.get("source", "unknown") for d in docs})
+    sources = list(dict.fromkeys(d.metadata.get("source", "unknown") for d in docs))
     if len(sources) < 2:
         state["comparison"] = "⚠️ Need at least two distinct PDFs to compare."
         return state
 
-    grouped = {src: [d for d in docs if d.metadata.get("source") == src] for src in sources[:2]}
-    p1, p2 = sources[:2]
-    def join(chunks, limit=6000):
-        text = "\n".join(d.page_content for d in chunks)
-        return text[:limit] + ("\n...[truncated]..." if len(text) > limit else "")
-
-    text1, text2 = join(grouped[p1]), join(grouped[p2])
-    title1 = grouped[p1][0].metadata.get("title", p1)
-    title2 = grouped[p2][0].metadata.get("title", p2)
-    year1 = grouped[p1][0].metadata.get("year", "Unknown")
-    year2 = grouped[p2][0].metadata.get("year", "Unknown")
-    focus = state.get("research_params", {}).get("focus_area", "")
+    from core.profiles import get_profiles, format_profile
 
+    grouped = {src: [d for d in docs if d.metadata.get("source", "unknown") == src] for src in sources}
     llm = _get_llm()
-    prompt = f"""
-    You are an expert research analyst. Compare two papers.
+    focus = state.get("research_params", {}).get("focus_area", "")
 
-    FOCUS AREA: {focus or 'General comparison'}
+    try:
+        # Each paper is reduced once to a cached structured profile; only papers not seen
+        # before cost LLM calls, and the comparison prompt stays small for N papers.
+        profiles = get_profiles(llm, grouped)
+        sections = "\n\n".join(
+            f"PAPER {i}: {p['title']} ({p['year']})\n{format_profile(p)}"
+            for i, p in enumerate(profiles.values(), start=1)
+        )
+        prompt = f"""
+    You are an expert research analyst. Compare these {len(profiles)} papers using their structured profiles.
 
-    PAPER 1: {title1} ({year1})
-    {text1}
+    FOCUS AREA: {focus or 'General comparison'}
 
-    PAPER 2: {title2} ({year2})
-    {text2}
+    {sections}
 
     Provide structured markdown: Executive Summary, Methodology Comparison, Key Findings, Strengths/Limitations, Contributions, Conclusion.
     """
-    try:
         res = llm.invoke(prompt)
         state["comparison"] = res.content
         state["comparison_metadata"] = {
-            "papers_compared": 2,
+            "papers_compared": len(profiles),
             "focus_area": focus,
             "paper_details": [
-                {"title": title1, "year": year1, "source": p1},
-                {"title": title2, "year": year2, "source": p2},
-            ]
+                {"title": p["title"], "year": p["year"], "source": src} for src, p in profiles.items()
+            ],
+            "profiles": profiles,
         }
     except Exception as e:
         state["comparison"] = f"❌ Comparison failed: {e}"
@@ -128,39 +198,18 @@ def compare_papers(state: ResearchState) -> ResearchState:
     return state
 
 def generate_bibliographic_citation(state: ResearchState) -> ResearchState:
+    from core.bibliography import format_bibliography, get_metadata_index, metadata_from_docs
+
     docs = state.get("docs", [])
     style = state.get("research_params", {}).get("citation_style", "APA")
-    if not docs:
+    sources = state.get("sources") or list(dict.fromkeys(d.metadata.get("source") for d in docs if d.metadata.get("source")))
+    if not sources:
         state["citation_output"] = "⚠️ No documents found for citation generation."
         return state
 
-    doc = docs[0]
-    metadata = getattr(doc, "metadata", {}) or {}
-    author = metadata.get("author", "Unknown Author")
-    title = metadata.get("title", "Untitled")
-    journal = metadata.get("journal") or metadata.get("journaltitle", "Unknown Journal")
-    year = metadata.get("year") or metadata.get("creationdate", "n.d.")
-    volume = metadata.get("volume", "")
-    issue = metadata.get("issue", "")
-    pages = metadata.get("pages", "")
-    doi = metadata.get("doi", "")
-    url = metadata.get("url", "")
-
-    vol_issue = f"{volume}({issue})" if volume and issue else volume or issue
-    pages_str = f", pp. {pages}" if pages else ""
-    doi_str = f" https://doi.org/{doi}" if doi and not doi.startswith("http") else f" {doi}" if doi else ""
-    url_str = f" {url}" if url and not doi else ""
-
-    if style == "APA":
-        citation = f"{author} ({year}). *{title}*. *{journal}*, {vol_issue}{pages_str}.{doi_str}{url_str}"
-    elif style == "IEEE":
-        citation = f"{author}, \"{title},\" *{journal}*, vol. {volume}, no. {issue}, pp. {pages}, {year}.{doi_str}{url_str}"
-    elif style == "MLA":
-        citation = f"{author}. \"{title}.\" *{journal}*, vol. {volume}, no. {issue}, {year}, pp. {pages}.{doi_str}{url_str}"
-    elif style == "Chicago":
-        citation = f"{author}. \"{title}.\" *{journal}* {volume}, no. {issue} ({year}): {pages}.{doi_str}{url_str}"
-    else:
-        citation = f"{author} ({year}). {title}. {journal}.{doi_str}{url_str}"
-
-    state["citation_output"] = " ".join(citation.split()).strip()
+    # One entry per paper from the metadata index; papers indexed before it existed fall
+    # back to their chunks' PDF metadata and first-page text.
+    index = get_metadata_index()
+    entries = [index.get(source) or metadata_from_docs(source, docs) for source in sources]
+    state["citation_output"] = format_bibliography(entries, style)
     return state
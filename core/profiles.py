@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from langchain_core.documents import Document
+from core.config import OPENAI_MODEL, SUMMARY_GROUP_CHARS, SUMMARY_MAX_CONCURRENCY, COMPARE_TOKEN_BUDGET
+from core.context import truncate_tokens
+from core.text_cache import get_text_cache, text_key
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = ("title", "authors", "year", "research_question", "methodology", "datasets", "findings", "limitations", "contributions")
+
+# Bump when the prompt or fields change so stale profiles are not reused.
+_PROFILE_VERSION = "1"
+_PROFILE_PROMPT = (
+    "Extract a structured profile of this research paper. Respond with a single JSON object with the keys "
+    + ", ".join(PROFILE_FIELDS)
+    + ". Use short factual strings (lists of strings for findings, limitations and contributions) and "
+    "\"Unknown\" when the text does not say.\n\nPaper:\n{text}"
+)
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def content_hash(docs: List[Document]) -> str:
+    """File hash recorded by the loader, or a hash of the chunk texts for older chunks."""
+    recorded = docs[0].metadata.get("content_hash") if docs else None
+    if recorded:
+        return recorded
+    ordered = sorted(docs, key=lambda d: (d.metadata.get("page", 0), d.metadata.get("start_index", 0)))
+    return hashlib.sha256("\x00".join(d.page_content for d in ordered).encode("utf-8")).hexdigest()
+
+
+def _parse_profile(text: str, docs: List[Document]) -> Dict[str, Any]:
+    match = _JSON_RE.search(text)
+    try:
+        profile = json.loads(match.group(0)) if match else {}
+    except json.JSONDecodeError:
+        profile = {}
+    if not isinstance(profile, dict) or not profile:
+        profile = {"findings": [text.strip()]}
+    meta = docs[0].metadata if docs else {}
+    for field in PROFILE_FIELDS:
+        profile.setdefault(field, "Unknown")
+    if profile["title"] in ("", "Unknown"):
+        profile["title"] = meta.get("title") or meta.get("source", "Untitled")
+    if profile["year"] in ("", "Unknown"):
+        profile["year"] = meta.get("year", "Unknown")
+    return profile
+
+
+def _extract_profile(llm, docs: List[Document]) -> Dict[str, Any]:
+    from core.processing import _map_reduce_text
+
+    ordered = sorted(docs, key=lambda d: (d.metadata.get("page", 0), d.metadata.get("start_index", 0)))
+    texts = [d.page_content for d in ordered]
+    text = "\n\n".join(texts)
+    if len(text) > SUMMARY_GROUP_CHARS:
+        text = _map_reduce_text(llm, texts, "")
+    text = truncate_tokens(text, COMPARE_TOKEN_BUDGET, getattr(llm, "model_name", OPENAI_MODEL))
+    res = llm.invoke(_PROFILE_PROMPT.replace("{text}", text), config={"tags": ["nostream"]})
+    return _parse_profile(res.content, docs)
+
+
+def get_profiles(llm, docs_by_source: Dict[str, List[Document]]) -> Dict[str, Dict[str, Any]]:
+    """Profile every paper in ``docs_by_source``, reusing cached profiles by content hash.
+
+    Papers without a cached profile are extracted concurrently; results keep input order.
+    """
+    cache = get_text_cache()
+    model = getattr(llm, "model_name", OPENAI_MODEL)
+    keys = {src: text_key(model, _PROFILE_VERSION, content_hash(docs)) for src, docs in docs_by_source.items()}
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for src, key in keys.items():
+        cached = cache.get("paper_profile", key)
+        if cached is not None:
+            profiles[src] = json.loads(cached)
+
+    todo = [src for src in docs_by_source if src not in profiles]
+    if todo:
+        with ThreadPoolExecutor(max_workers=min(len(todo), SUMMARY_MAX_CONCURRENCY)) as pool:
+            extracted = list(pool.map(lambda src: _extract_profile(llm, docs_by_source[src]), todo))
+        for src, profile in zip(todo, extracted):
+            cache.put("paper_profile", keys[src], json.dumps(profile))
+            profiles[src] = profile
+    logger.info(f"Profiled {len(docs_by_source)} paper(s), {len(docs_by_source) - len(todo)} from cache")
+    return {src: {**profiles[src], "source": src} for src in docs_by_source}
+
+
+def format_profile(profile: Dict[str, Any]) -> str:
+    lines = []
+    for field in PROFILE_FIELDS:
+        value = profile.get(field, "Unknown")
+        if isinstance(value, list):
+            value = "; ".join(str(v) for v in value)
+        lines.append(f"- {field.replace('_', ' ').title()}: {value}")
+    return "\n".join(lines)
@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+from core.config import QDRANT_COLLECTION, PDF_STREAM_WINDOW_PAGES
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IndexingProgress:
+    source: str
+    content_hash: Optional[str] = None
+    total_pages: int = 0
+    pages_indexed: int = 0
+    chunks_indexed: int = 0
+    done: bool = False
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.perf_counter)
+    elapsed_s: float = 0.0
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    @property
+    def fraction_done(self) -> float:
+        return self.pages_indexed / self.total_pages if self.total_pages else 0.0
+
+    def describe(self) -> str:
+        if self.error:
+            return f"{self.source}: indexing failed after {self.pages_indexed}/{self.total_pages} pages ({self.error})"
+        if not self.total_pages:
+            return f"{self.source}: queued for indexing"
+        return f"{self.source}: {self.pages_indexed}/{self.total_pages} pages indexed"
+
+
+_progress: Dict[str, IndexingProgress] = {}
+_progress_lock = threading.Lock()
+
+
+def indexing_status(source: str) -> Optional[IndexingProgress]:
+    return _progress.get(source)
+
+
+def partially_indexed(sources: Iterable[str]) -> List[IndexingProgress]:
+    """Sources whose progressive indexing has not completed: still running, or failed part way."""
+    return [p for p in (_progress.get(s) for s in sources) if p is not None and not p.done]
+
+
+def ingest_pdf_progressively(
+    file_path: str,
+    window_pages: int = PDF_STREAM_WINDOW_PAGES,
+    collection_name: str = QDRANT_COLLECTION,
+    on_window: Optional[Callable[[IndexingProgress], None]] = None,
+) -> IndexingProgress:
+    """Extract, split, embed and index a PDF one page window at a time.
+
+    Each window is upserted to the vector store, appended to the BM25 index and the chunk
+    store before the next is read, so memory use is bounded by the window size and
+    retrieval sees the pages indexed so far. Progress is published via ``indexing_status``.
+    """
+    from core.loader import iter_pdf_windows, page_count, file_sha256
+    from core.vectorstore import build_vectorstore
+    from core.sparse_index import get_sparse_index
+    from core.chunk_store import get_chunk_store
+    from core.answer_cache import get_answer_cache
+
+    source = os.path.basename(file_path)
+    progress = IndexingProgress(source=source, content_hash=file_sha256(file_path), total_pages=page_count(file_path))
+    with _progress_lock:
+        _progress[source] = progress
+    sparse, store, answers = get_sparse_index(), get_chunk_store(), get_answer_cache()
+    sparse.replace_source(source, [])
+    store.discard(source, progress.content_hash)
+    answers.invalidate(source)
+    try:
+        for start, end, chunks in iter_pdf_windows(file_path, window_pages):
+            with span("ingest_window", source=source, pages=end - start, chunks=len(chunks)):
+                if chunks:
+                    build_vectorstore(chunks, collection_name)
+                    sparse.add_documents(chunks, persist=False)
+                    store.append(source, chunks, progress.content_hash)
+            progress.pages_indexed = end
+            progress.chunks_indexed += len(chunks)
+            progress.elapsed_s = time.perf_counter() - progress.started_at
+            if on_window is not None:
+                on_window(progress)
+        store.mark_complete(source, progress.content_hash)
+        progress.done = True
+    except Exception as e:
+        progress.error = str(e)
+        logger.error(f"Progressive indexing of {source} failed: {e}")
+    finally:
+        sparse.persist(source)
+        # Answers given while the paper was partially indexed are not reused afterwards.
+        answers.invalidate(source)
+        progress.elapsed_s = time.perf_counter() - progress.started_at
+    logger.info(f"Indexed {source}: {progress.chunks_indexed} chunks from {progress.pages_indexed} pages in {progress.elapsed_s:.1f}s")
+    return progress
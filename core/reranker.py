@@ -0,0 +1,280 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from core.config import (
+    RERANKER_MODEL,
+    RERANKER_BACKEND,
+    RERANKER_ONNX_FILE,
+    RERANKER_BATCH_SIZE,
+    RERANKER_MAX_WAIT_MS,
+    RERANK_MIN_DEPTH,
+    RERANK_STEP,
+    RERANK_BUDGET_MS,
+    RERANK_CACHE_SIZE,
+)
+from core.tracing import annotate, cache_event, metrics
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+
+class RerankerService:
+    """Process-wide CrossEncoder: loaded once, concurrent requests coalesced into shared batches."""
+
+    def __init__(
+        self,
+        model_name: str = RERANKER_MODEL,
+        backend: str = RERANKER_BACKEND,
+        onnx_file: Optional[str] = RERANKER_ONNX_FILE,
+        batch_size: int = RERANKER_BATCH_SIZE,
+        max_wait_ms: float = RERANKER_MAX_WAIT_MS,
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.batch_size = max(1, batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._pending: Deque[Tuple[List[Pair], Future]] = deque()
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+        self.load_time_s: Optional[float] = None
+        self.batches = 0
+        self.pairs_scored = 0
+        self.batch_latencies_ms: Deque[float] = deque(maxlen=512)
+
+    def _load_model(self):
+        if self._model is not None:
+            return self._model
+        with self._load_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                kwargs: Dict[str, Any] = {"device": "cpu"} if self.backend != "torch" else {}
+                if self.backend in ("onnx", "openvino"):
+                    kwargs["backend"] = self.backend
+                    if self.onnx_file:
+                        kwargs["model_kwargs"] = {"file_name": self.onnx_file}
+                start = time.perf_counter()
+                self._model = CrossEncoder(self.model_name, **kwargs)
+                self.load_time_s = time.perf_counter() - start
+                logger.info(
+                    f"Loaded reranker {self.model_name} (backend={self.backend}"
+                    f"{', file=' + self.onnx_file if self.onnx_file else ''}) in {self.load_time_s:.2f}s"
+                )
+        return self._model
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._cond:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="reranker-worker", daemon=True)
+                self._worker.start()
+
+    def score(self, pairs: Sequence[Pair]) -> List[float]:
+        pairs = list(pairs)
+        if not pairs:
+            return []
+        self._load_model()
+        self._ensure_worker()
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((pairs, future))
+            self._cond.notify()
+        return future.result()
+
+    def _collect(self) -> List[Tuple[List[Pair], Future]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # Give concurrent sessions a short window to join this batch.
+            deadline = time.monotonic() + self.max_wait_s
+            queued = sum(len(p) for p, _ in self._pending)
+            while queued < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                queued = sum(len(p) for p, _ in self._pending)
+
+            requests = []
+            taken = 0
+            while self._pending and (not requests or taken + len(self._pending[0][0]) <= self.batch_size):
+                pairs, future = self._pending.popleft()
+                requests.append((pairs, future))
+                taken += len(pairs)
+            return requests
+
+    def _run(self) -> None:
+        while True:
+            requests = self._collect()
+            flat = [pair for pairs, _ in requests for pair in pairs]
+            start = time.perf_counter()
+            try:
+                scores = self._model.predict(flat, batch_size=self.batch_size, show_progress_bar=False)
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.batches += 1
+            self.pairs_scored += len(flat)
+            self.batch_latencies_ms.append(elapsed_ms)
+            logger.debug(
+                f"Reranker batch: {len(flat)} pairs from {len(requests)} request(s) in {elapsed_ms:.1f}ms"
+            )
+
+            offset = 0
+            for pairs, future in requests:
+                future.set_result([float(s) for s in scores[offset:offset + len(pairs)]])
+                offset += len(pairs)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.batch_latencies_ms)
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "load_time_s": self.load_time_s,
+            "batches": self.batches,
+            "pairs_scored": self.pairs_scored,
+            "batch_latency_ms_p50": latencies[len(latencies) // 2] if latencies else None,
+            "batch_latency_ms_max": latencies[-1] if latencies else None,
+        }
+
+
+_service: Optional[RerankerService] = None
+_service_lock = threading.Lock()
+
+
+def get_reranker() -> RerankerService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = RerankerService()
+    return _service
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class ScoreCache:
+    """LRU of cross-encoder scores keyed by (model, query hash, chunk hash)."""
+
+    def __init__(self, max_entries: int = RERANK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._scores: "OrderedDict[Tuple[str, bytes, bytes], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, model: str, query: str, texts: Sequence[str]) -> List[Optional[float]]:
+        q = _digest(query)
+        with self._lock:
+            out = []
+            for text in texts:
+                key = (model, q, _digest(text))
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                out.append(score)
+        return out
+
+    def put_many(self, model: str, query: str, texts: Sequence[str], scores: Sequence[float]) -> None:
+        q = _digest(query)
+        with self._lock:
+            for text, score in zip(texts, scores):
+                self._scores[(model, q, _digest(text))] = score
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+
+_score_cache = ScoreCache()
+
+
+@dataclass
+class RerankStats:
+    candidates: int = 0
+    depth: int = 0
+    scored: int = 0
+    cached: int = 0
+    elapsed_ms: float = 0.0
+    stop: str = "exhausted"  # exhausted | converged | budget
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _cached_scores(query: str, docs: Sequence[Document], stats: RerankStats) -> List[float]:
+    reranker = get_reranker()
+    model = getattr(reranker, "model_name", type(reranker).__name__)
+    texts = [d.page_content for d in docs]
+    scores = _score_cache.get_many(model, query, texts)
+    missing = [i for i, s in enumerate(scores) if s is None]
+    if missing:
+        fresh = reranker.score([(query, texts[i]) for i in missing])
+        _score_cache.put_many(model, query, [texts[i] for i in missing], fresh)
+        for i, s in zip(missing, fresh):
+            scores[i] = s
+    stats.scored += len(missing)
+    stats.cached += len(docs) - len(missing)
+    cache_event("rerank_scores", True, len(docs) - len(missing))
+    cache_event("rerank_scores", False, len(missing))
+    return scores
+
+
+def rerank_cascade(
+    query: str,
+    docs: Sequence[Document],
+    top_n: int = 5,
+    min_depth: int = RERANK_MIN_DEPTH,
+    step: int = RERANK_STEP,
+    budget_ms: float = RERANK_BUDGET_MS,
+) -> Tuple[List[Tuple[float, Document]], RerankStats]:
+    """Cross-encode ``docs`` (in first-stage order) only as deep as it pays off.
+
+    The first ``min_depth`` candidates are always scored. Further blocks of ``step`` are
+    scored while the previous block still changed the top ``top_n`` and the time budget
+    allows. Unscored candidates follow the scored ones, in first-stage order.
+
+    ``min_depth`` and ``step`` of 0 scale with the candidate count (half of them, then
+    blocks of an eighth), so the cascade can also stop early on the ~9 fused candidates
+    of a single-paper query.
+    """
+    start = time.perf_counter()
+    stats = RerankStats(candidates=len(docs))
+    scored: List[Tuple[float, Document]] = []
+    min_depth = min_depth or -(-len(docs) // 2)
+    step = step or -(-len(docs) // 8)
+    depth = min(len(docs), max(min_depth, top_n))
+    while True:
+        block = docs[stats.depth:depth]
+        before = {id(d) for _, d in scored[:top_n]}
+        scored.extend(zip(_cached_scores(query, block, stats), block))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        stats.depth = depth
+        if depth >= len(docs):
+            break
+        if stats.depth > max(min_depth, top_n) and {id(d) for _, d in scored[:top_n]} == before:
+            stats.stop = "converged"
+            break
+        if (time.perf_counter() - start) * 1000 >= budget_ms:
+            stats.stop = "budget"
+            break
+        depth = min(len(docs), depth + max(1, step))
+    stats.elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    annotate(pairs=stats.scored, cached=stats.cached, depth=stats.depth, stop=stats.stop)
+    metrics.inc("rerank_pairs", stats.scored, result="scored")
+    metrics.inc("rerank_pairs", stats.cached, result="cached")
+    tail = [(float("-inf"), d) for d in docs[stats.depth:]]
+    return scored + tail, stats
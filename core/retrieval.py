@@ -1,21 +1,36 @@
 from core.state import ResearchState
-from core.vectorstore import load_vectorstore
-from langchain.retrievers import BM25Retriever, EnsembleRetriever
-from sentence_transformers import CrossEncoder
-from typing import List
+from core.vectorstore import load_vectorstore, get_embeddings, stored_documents
+from core.sparse_index import get_sparse_index, SourceIndex, SparseIndexRetriever
+from core.chunk_store import get_chunk_store
+from core.progressive_ingest import partially_indexed
+from core.reranker import rerank_cascade
+from core.tracing import span, annotate, in_context
+from core.config import RETRIEVAL_FANOUT_WORKERS, MULTI_SOURCE_TOP_K, MULTI_SOURCE_MAX_PER_SOURCE
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from langchain.schema import Document
 from qdrant_client.http.models import Filter, FieldCondition, MatchValue
-import streamlit as st
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
-db = load_vectorstore()
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _fanout_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=RETRIEVAL_FANOUT_WORKERS, thread_name_prefix="retrieve")
+    return _pool
 
 def dense_retrieve(state: ResearchState, k: int = 5):
-    current_file = state.get("current_file") or st.session_state.get("current_file")
+    current_file = state.get("current_file")
     if not current_file:
         raise ValueError("No active file specified for dense retrieval")
+    db = load_vectorstore()
     if db is None:
         raise ValueError("Embedding DB not available")
 
@@ -31,30 +46,130 @@ def dense_retrieve(state: ResearchState, k: int = 5):
         }
     )
 
+def _sparse_retriever(source: str, k: int = 4) -> SparseIndexRetriever:
+    sparse_index = get_sparse_index()
+    sparse = sparse_index.retriever(source, k=k)
+    # An empty index outside a progressive ingest was persisted before the paper's chunks
+    # existed (older releases did that): rebuild it like a missing one.
+    if sparse is None or (len(sparse.index) == 0 and not partially_indexed([source])):
+        # Sources ingested before the persistent index existed are indexed on first query,
+        # from the chunk store or, in a process that has not loaded the paper, the vector store.
+        annotate(lazy_build=True)
+        docs = get_chunk_store().source_documents([source]) or stored_documents(source)
+        if not docs:
+            # Nothing indexed yet (e.g. still queued). Persisting an empty index here would
+            # hide the paper from BM25 for good once it is ingested.
+            logger.warning(f"No chunks of {source} to build its sparse index from; keyword search skipped")
+            return SparseIndexRetriever(index=SourceIndex(source), k=k)
+        sparse_index.replace_source(source, docs)
+        sparse = sparse_index.retriever(source, k=k)
+    return sparse
+
+def _rerank(state: ResearchState, docs: List[Document], top_n: int = 5) -> Optional[List[Tuple[float, Document]]]:
+    try:
+        with span("rerank", candidates=len(docs)):
+            scored, stats = rerank_cascade(state["query"], docs, top_n=top_n)
+    except Exception as e:
+        logger.warning(f"Reranker failed: {e}")
+        return None
+    state["rerank_stats"] = stats.to_dict()
+    logger.debug(f"Reranked {stats.depth}/{stats.candidates} candidates: {stats.scored} scored, {stats.cached} cached ({stats.stop})")
+    return scored
+
+def _note_partial(state: ResearchState, sources: List[str]) -> None:
+    # Papers still being indexed progressively are searched over the pages indexed so far.
+    partial = partially_indexed(sources)
+    running = [p.describe() for p in partial if not p.failed]
+    failed = [p.describe() for p in partial if p.failed]
+    notes = (["Still indexing " + "; ".join(running)] if running else []) + failed
+    if notes:
+        state["indexing_note"] = ". ".join(notes) + ". Answer uses indexed pages only."
+
 def hybrid_retrieve(state: ResearchState, k: int = 38) -> ResearchState:
-    current_file = state.get("current_file") or st.session_state.get("current_file")
+    if len(state.get("sources") or []) > 1:
+        _note_partial(state, state["sources"])
+        return multi_source_retrieve(state, k=k)
+
+    current_file = state.get("current_file") or (state.get("sources") or [None])[0]
     if not current_file:
         raise ValueError("No active file specified for retrieval")
+    _note_partial(state, [current_file])
 
-    dense = dense_retrieve(state, k=5)
-    file_docs: List[Document] = [d for d in st.session_state.docs if d.metadata.get("source") == current_file]
-    sparse = BM25Retriever.from_documents(file_docs)
-
-    ensemble = EnsembleRetriever(retrievers=[dense, sparse], weights=[0.7, 0.3])
+    # Same weighted reciprocal-rank fusion EnsembleRetriever applies, with each search timed.
+    with span("dense_search", source=current_file):
+        dense_docs = dense_retrieve(state, k=5).invoke(state["query"])
+    with span("bm25_search", source=current_file):
+        sparse_docs = _sparse_retriever(current_file, k=4).invoke(state["query"])
+    initial_docs = _reciprocal_rank_fusion([(dense_docs, 0.7), (sparse_docs, 0.3)])[:k]
 
-    initial_docs = ensemble.get_relevant_documents(state["query"], k=k)
-
-    reranker = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-    pairs = [(state["query"], doc.page_content) for doc in initial_docs]
-    try:
-        scores = reranker.predict(pairs)
-    except Exception as e:
-        logger.warning(f"Reranker failed: {e}")
+    scored = _rerank(state, initial_docs)
+    if scored is None:
         state["docs"] = initial_docs[:5]
         return state
 
-    scored = list(zip(scores, initial_docs))
-    scored.sort(key=lambda x: x[0], reverse=True)
     final_docs = [doc for score, doc in scored[:5]]
     state["docs"] = final_docs
     return state
+
+def _reciprocal_rank_fusion(ranked_lists: List[Tuple[List[Document], float]], c: int = 60) -> List[Document]:
+    scores: Dict[Tuple, float] = {}
+    docs: Dict[Tuple, Document] = {}
+    for ranked, weight in ranked_lists:
+        for rank, doc in enumerate(ranked):
+            key = (doc.metadata.get("source"), doc.page_content)
+            scores[key] = scores.get(key, 0.0) + weight / (c + rank + 1)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+def _diversify(scored: List[Tuple[float, Document]], top_k: int, max_per_source: int) -> List[Document]:
+    picked, counts, overflow = [], {}, []
+    for score, doc in scored:
+        source = doc.metadata.get("source")
+        if counts.get(source, 0) < max_per_source:
+            picked.append(doc)
+            counts[source] = counts.get(source, 0) + 1
+        else:
+            overflow.append(doc)
+        if len(picked) == top_k:
+            return picked
+    return picked + overflow[: top_k - len(picked)]
+
+def multi_source_retrieve(state: ResearchState, k: int = 38) -> ResearchState:
+    """Corpus-wide retrieval over ``state["sources"]``.
+
+    Dense and BM25 searches for every source run concurrently on a shared thread pool,
+    results are fused with reciprocal-rank fusion, the top ``k`` go through the reranker
+    cascade, and the final list is capped per source so one paper cannot crowd out the rest.
+    """
+    query = state["query"]
+    sources = list(dict.fromkeys(state["sources"]))
+    # Embed the query once up front; the per-source dense searches then hit the query cache.
+    get_embeddings().embed_query(query)
+
+    def dense(src: str) -> List[Document]:
+        with span("dense_search", source=src):
+            return dense_retrieve({**state, "current_file": src}, k=5).invoke(query)
+
+    def sparse(src: str) -> List[Document]:
+        with span("bm25_search", source=src):
+            return _sparse_retriever(src, k=4).invoke(query)
+
+    pool = _fanout_pool()
+    dense_jobs = {src: pool.submit(in_context(dense), src) for src in sources}
+    sparse_jobs = {src: pool.submit(in_context(sparse), src) for src in sources}
+
+    ranked_lists = []
+    for src in sources:
+        for jobs, weight in ((dense_jobs, 0.7), (sparse_jobs, 0.3)):
+            try:
+                ranked_lists.append((jobs[src].result(), weight))
+            except Exception as e:
+                logger.warning(f"Retrieval for {src} failed: {e}")
+
+    candidates = _reciprocal_rank_fusion(ranked_lists)[:k]
+    top_k = min(MULTI_SOURCE_TOP_K, max(5, len(sources)))
+    scored = _rerank(state, candidates, top_n=top_k) or [(0.0, d) for d in candidates]
+    state["docs"] = _diversify(scored, top_k, MULTI_SOURCE_MAX_PER_SOURCE)
+    pairs = (state.get("rerank_stats") or {}).get("scored", 0)
+    logger.info(f"Multi-source retrieval over {len(sources)} source(s): {len(candidates)} candidates, {pairs} pairs cross-encoded")
+    return state
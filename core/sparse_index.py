@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+import numpy as np
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from core.config import SPARSE_INDEX_DIR, BM25_K1, BM25_B
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class SourceIndex:
+    """Inverted BM25 index over the chunks of a single source file."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self.doc_lengths: List[int] = []
+        # term -> ([doc ids], [term frequencies]); grown in place on incremental adds
+        self.postings: Dict[str, tuple] = {}
+        self._frozen: Dict[str, tuple] = {}
+        self._lengths_arr: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(self, docs: List[Document]) -> None:
+        analysed = [(doc, Counter(tokenize(doc.page_content))) for doc in docs]
+        with self._lock:
+            for doc, counts in analysed:
+                doc_id = len(self.texts)
+                self.texts.append(doc.page_content)
+                self.metadatas.append(dict(doc.metadata or {}))
+                self.doc_lengths.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    ids, tfs = self.postings.setdefault(term, ([], []))
+                    ids.append(doc_id)
+                    tfs.append(tf)
+            self._frozen.clear()
+            self._lengths_arr = None
+
+    def _term_arrays(self, term: str):
+        arrays = self._frozen.get(term)
+        if arrays is None:
+            ids, tfs = self.postings[term]
+            arrays = (np.asarray(ids, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            self._frozen[term] = arrays
+        return arrays
+
+    def _snapshot(self, terms) -> tuple:
+        # Cached arrays are built under the same lock as ``add``, so they never capture
+        # (and keep serving) a half-applied batch.
+        with self._lock:
+            if self._lengths_arr is None:
+                self._lengths_arr = np.asarray(self.doc_lengths, dtype=np.float32)
+            return self._lengths_arr, {t: self._term_arrays(t) for t in terms if t in self.postings}
+
+    def search(self, query: str, k: int = 10, k1: float = BM25_K1, b: float = BM25_B) -> List[Document]:
+        # Scores against a snapshot of the documents added so far, so searches can run while
+        # a progressively ingested source is still being extended by ``add``.
+        lengths, postings = self._snapshot(set(tokenize(query)))
+        n_docs = len(lengths)
+        if n_docs == 0:
+            return []
+        norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1.0))
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for ids, tfs in postings.values():
+            idf = np.log((n_docs - len(ids) + 0.5) / (len(ids) + 0.5) + 1.0)
+            scores[ids] += idf * tfs * (k1 + 1) / (tfs + norm[ids])
+
+        k = min(k, n_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            Document(page_content=self.texts[i], metadata=dict(self.metadatas[i]))
+            for i in top
+            if scores[i] > 0
+        ]
+
+    def documents(self) -> List[Document]:
+        return [Document(page_content=t, metadata=dict(m)) for t, m in zip(self.texts, self.metadatas)]
+
+    def __getstate__(self):
+        with self._lock:
+            state = self.__dict__.copy()
+        state["_frozen"] = {}
+        state["_lengths_arr"] = None
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class SparseIndexRetriever(BaseRetriever):
+    index: SourceIndex
+    k: int = 10
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.index.search(query, k=self.k)
+
+
+class SparseIndexStore:
+    """Per-source BM25 indexes, built at ingestion and persisted under SPARSE_INDEX_DIR."""
+
+    def __init__(self, index_dir: str = SPARSE_INDEX_DIR):
+        self.index_dir = index_dir
+        self._indexes: Dict[str, SourceIndex] = {}
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _path(self, source: str) -> str:
+        digest = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        return os.path.join(self.index_dir, f"{digest}.pkl")
+
+    def _save(self, index: SourceIndex) -> None:
+        path = self._path(index.source)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def get(self, source: str) -> Optional[SourceIndex]:
+        with self._lock:
+            index = self._indexes.get(source)
+            if index is not None:
+                return index
+            path = self._path(source)
+            if not os.path.exists(path):
+                return None
+            try:
+                with open(path, "rb") as f:
+                    index = pickle.load(f)
+            except Exception as e:
+                logger.warning(f"Could not load sparse index for {source}: {e}")
+                return None
+            self._indexes[source] = index
+            return index
+
+    def add_documents(self, docs: List[Document], persist: bool = True) -> None:
+        grouped: Dict[str, List[Document]] = {}
+        for d in docs:
+            grouped.setdefault(d.metadata.get("source", "unknown"), []).append(d)
+        with self._lock:
+            for source, source_docs in grouped.items():
+                index = self.get(source) or SourceIndex(source)
+                index.add(source_docs)
+                self._indexes[source] = index
+                if persist:
+                    self._save(index)
+                logger.info(f"Sparse index for {source}: +{len(source_docs)} chunks ({len(index)} total)")
+
+    def replace_source(self, source: str, docs: List[Document]) -> SourceIndex:
+        with span("bm25_build", chunks=len(docs)):
+            index = SourceIndex(source)
+            index.add(docs)
+        with self._lock:
+            self._indexes[source] = index
+            self._save(index)
+        logger.info(f"Built sparse index for {source} ({len(index)} chunks)")
+        return index
+
+    def persist(self, source: str) -> None:
+        with self._lock:
+            index = self._indexes.get(source)
+            if index is not None:
+                self._save(index)
+
+    def retriever(self, source: str, k: int = 10) -> Optional[SparseIndexRetriever]:
+        index = self.get(source)
+        if index is None:
+            return None
+        return SparseIndexRetriever(index=index, k=k)
+
+
+_store: Optional[SparseIndexStore] = None
+_store_lock = threading.Lock()
+
+
+def get_sparse_index() -> SparseIndexStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SparseIndexStore()
+    return _store
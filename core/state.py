@@ -1,5 +1,5 @@
 from typing import TypedDict, List, Optional, Dict, Any
-from langchain.schema import Document
+from langchain_core.documents import Document
 
 class ResearchState(TypedDict, total=False):
     query: str
@@ -13,3 +13,8 @@ class ResearchState(TypedDict, total=False):
     research_params: Optional[Dict[str, Any]]
     citation_output: Optional[str]
     current_file: Optional[str]
+    sources: Optional[List[str]]
+    cache_hit: Optional[bool]
+    indexing_note: Optional[str]
+    ttft_s: Optional[float]
+    rerank_stats: Optional[Dict[str, Any]]
@@ -0,0 +1,31 @@
+import logging
+import time
+from typing import Callable
+from core.state import ResearchState
+
+logger = logging.getLogger(__name__)
+
+def stream_invoke(app, state: ResearchState, on_token: Callable[[str], None]) -> ResearchState:
+    """Run a compiled graph, forwarding LLM tokens to ``on_token`` as they arrive.
+
+    Uses LangGraph's "messages" stream mode for tokens and "values" for the final
+    state. Calls tagged ``nostream`` (e.g. map-phase summaries) are not forwarded.
+    Time-to-first-token is recorded in ``ttft_s``.
+    """
+    start = time.perf_counter()
+    first_token_at = None
+    final: ResearchState = state
+    for mode, payload in app.stream(state, stream_mode=["messages", "values"]):
+        if mode == "values":
+            final = payload
+            continue
+        chunk, _ = payload
+        text = chunk.content if isinstance(chunk.content, str) else ""
+        if not text:
+            continue
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+            logger.info(f"Time to first token: {first_token_at - start:.2f}s")
+        on_token(text)
+    final["ttft_s"] = (first_token_at - start) if first_token_at is not None else None
+    return final
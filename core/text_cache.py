@@ -0,0 +1,80 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from core.config import TEXT_CACHE_PATH, TEXT_CACHE_MAX_ENTRIES
+from core.tracing import cache_event
+
+logger = logging.getLogger(__name__)
+
+
+def text_key(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class TextCache:
+    """Disk-backed (SQLite) key -> text store with LRU eviction, partitioned by namespace."""
+
+    def __init__(self, path: str = TEXT_CACHE_PATH, max_entries: int = TEXT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS texts ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_texts_last_used ON texts(last_used)")
+        self._conn.commit()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM texts WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE texts SET last_used = ? WHERE namespace = ? AND key = ?", (time.time(), namespace, key)
+                )
+                self._conn.commit()
+        cache_event(namespace, row is not None)
+        counter = self.hits if row is not None else self.misses
+        counter[namespace] = counter.get(namespace, 0) + 1
+        return row[0] if row is not None else None
+
+    def put(self, namespace: str, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO texts (namespace, key, value, last_used) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, time.time()),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM texts WHERE rowid IN (SELECT rowid FROM texts ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+
+_cache: Optional[TextCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_text_cache() -> TextCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TextCache()
+    return _cache
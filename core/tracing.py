@@ -0,0 +1,339 @@
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from core.config import TRACING_ENABLED, METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+# Prometheus-style cumulative buckets (seconds) plus a window of recent samples for percentiles.
+_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_WINDOW = 1024
+
+
+def _label_value(value: Any) -> str:
+    # Exposition format escaping: label values may come from file names or queries.
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count", "recent")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent: Deque[float] = deque(maxlen=_WINDOW)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Metrics:
+    """In-process span histograms and counters (tokens, cache hits/misses)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, _Histogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = _Histogram()
+            hist.observe(seconds)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = {
+                name: {
+                    "count": h.count,
+                    "sum_s": round(h.total, 6),
+                    "p50_s": h.percentile(0.5),
+                    "p95_s": h.percentile(0.95),
+                    "p99_s": h.percentile(0.99),
+                }
+                for name, h in sorted(self.histograms.items())
+            }
+            counters = [{"name": n, "labels": dict(labels), "value": v} for (n, labels), v in sorted(self.counters.items())]
+        return {"spans": spans, "counters": counters}
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP research_span_duration_seconds Duration of graph nodes and external calls.",
+            "# TYPE research_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(_BUCKETS + (float("inf"),), h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'research_span_duration_seconds_bucket{{span="{_label_value(name)}",le="{le}"}} {cumulative}')
+                lines.append(f'research_span_duration_seconds_sum{{span="{_label_value(name)}"}} {h.total:.6f}')
+                lines.append(f'research_span_duration_seconds_count{{span="{_label_value(name)}"}} {h.count}')
+            seen = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = f"research_{name}_total"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} counter")
+                    seen.add(metric)
+                label_text = ",".join(f'{k}="{_label_value(v)}"' for k, v in labels)
+                lines.append(f"{metric}{{{label_text}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+class Span:
+    __slots__ = ("name", "start", "duration_s", "depth", "attrs")
+
+    def __init__(self, name: str, start: float, depth: int, attrs: Dict[str, Any]):
+        self.name = name
+        self.start = start
+        self.duration_s: Optional[float] = None
+        self.depth = depth
+        self.attrs = attrs
+
+
+class Trace:
+    """Spans recorded for one request, shared with worker threads through the context."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return [
+            {
+                "span": s.name,
+                "depth": s.depth,
+                "start_ms": round((s.start - self.started) * 1000, 1),
+                "ms": round((s.duration_s or 0.0) * 1000, 1),
+                **s.attrs,
+            }
+            for s in spans
+        ]
+
+
+metrics = Metrics()
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("research_trace", default=None)
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("research_span", default=None)
+
+
+@contextmanager
+def request() -> Iterator[Optional[Trace]]:
+    """Collect the spans of everything run inside the block into a ``Trace``."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    trace = Trace()
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def _noop_span() -> Iterator[None]:
+    yield None
+
+
+@contextmanager
+def _span(name: str, attrs: Dict[str, Any]) -> Iterator[Span]:
+    parent = _current.get()
+    s = Span(name, time.perf_counter(), parent.depth + 1 if parent else 0, attrs)
+    token = _current.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        s.duration_s = time.perf_counter() - s.start
+        metrics.observe(name, s.duration_s)
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(s)
+
+
+def span(name: str, **attrs: Any):
+    """Time a block as span ``name``; a no-op when tracing is disabled."""
+    return _span(name, attrs) if TRACING_ENABLED else _noop_span()
+
+
+def annotate(**attrs: Any) -> None:
+    """Attach attributes (token counts, cache flags, sizes) to the innermost open span."""
+    if TRACING_ENABLED:
+        current = _current.get()
+        if current is not None:
+            current.attrs.update(attrs)
+
+
+def cache_event(cache: str, hit: bool, count: int = 1) -> None:
+    if TRACING_ENABLED and count:
+        metrics.inc("cache_events", count, cache=cache, result="hit" if hit else "miss")
+
+
+def traced_node(name: str, fn: Callable) -> Callable:
+    if not TRACING_ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(state, *args, **kwargs):
+        with span(f"node:{name}"):
+            return fn(state, *args, **kwargs)
+
+    return wrapper
+
+
+def in_context(fn: Callable) -> Callable:
+    """Bind ``fn`` to a copy of the caller's context so spans in pool threads join its trace."""
+    if not TRACING_ENABLED:
+        return fn
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, fn)
+
+
+def llm_callbacks() -> List[Any]:
+    return [_LLMCallbackHandler()] if TRACING_ENABLED else []
+
+
+class _LLMCallbackHandler(BaseCallbackHandler):
+    """Records one ``llm`` span per model call, with token usage when the provider reports it."""
+
+    def __init__(self):
+        self._runs: Dict[Any, Tuple[Span, Optional[Trace], Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def _start(self, run_id) -> None:
+        parent = _current.get()
+        s = Span("llm", time.perf_counter(), parent.depth + 1 if parent else 0, {})
+        with self._lock:
+            self._runs[run_id] = (s, _trace.get(), None)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            entry = self._runs.get(run_id)
+            if entry is not None and entry[2] is None:
+                self._runs[run_id] = (entry[0], entry[1], time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, response)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, None, error)
+
+    def _finish(self, run_id, response, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            entry = self._runs.pop(run_id, None)
+        if entry is None:
+            return
+        s, trace, first_token = entry
+        s.duration_s = time.perf_counter() - s.start
+        if first_token is not None:
+            s.attrs["ttft_ms"] = round((first_token - s.start) * 1000, 1)
+        if error is not None:
+            s.attrs["error"] = type(error).__name__
+        usage = _token_usage(response) if response is not None else {}
+        s.attrs.update(usage)
+        for kind in ("input_tokens", "output_tokens"):
+            if usage.get(kind):
+                metrics.inc("llm_tokens", usage[kind], kind=kind.split("_")[0])
+        metrics.observe("llm", s.duration_s)
+        if trace is not None:
+            trace.add(s)
+
+
+def _token_usage(response) -> Dict[str, int]:
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    for generations in response.generations or []:
+        for g in generations:
+            meta = getattr(getattr(g, "message", None), "usage_metadata", None) or {}
+            usage["input_tokens"] += meta.get("input_tokens", 0)
+            usage["output_tokens"] += meta.get("output_tokens", 0)
+    if not any(usage.values()):
+        reported = (response.llm_output or {}).get("token_usage") or {}
+        usage["input_tokens"] = reported.get("prompt_tokens", 0)
+        usage["output_tokens"] = reported.get("completion_tokens", 0)
+    return usage
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> None:
+    """Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` on a daemon thread, once per process.
+
+    Binds to ``METRICS_HOST`` (loopback by default): span names and counter labels can
+    reveal paper names.
+    """
+    global _server
+    if not port or _server is not None:
+        return
+    with _server_lock:
+        if _server is not None:
+            return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body, ctype = json.dumps(metrics.to_dict()).encode(), "application/json"
+                elif self.path.startswith("/metrics"):
+                    body, ctype = metrics.to_prometheus().encode(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            _server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+            return
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Serving metrics on {host}:{port}/metrics")
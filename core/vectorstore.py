@@ -1,20 +1,82 @@
 import logging
-from typing import List, Optional
-from core.config import QDRANT_URL, QDRANT_API_KEY, QDRANT_COLLECTION
-from langchain_openai import OpenAIEmbeddings
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Set
+from core.config import (
+    QDRANT_URL, QDRANT_API_KEY, QDRANT_COLLECTION, QDRANT_PREFER_GRPC, QDRANT_TIMEOUT,
+    QDRANT_QUANTIZATION, VECTOR_BACKEND, LOCAL_VECTOR_DIR,
+)
 from langchain_community.vectorstores import Qdrant
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import PayloadSchemaType
+from qdrant_client.http.models import (
+    Distance, FieldCondition, Filter, MatchValue, PayloadSchemaType, PointStruct, ScalarQuantization, ScalarQuantizationConfig, ScalarType, VectorParams,
+)
 from langchain.schema import Document
+from langchain_core.vectorstores import VectorStore
+from core.embedding_cache import CachedEmbeddings, point_id
+from core.embeddings import create_embeddings
+from core.ingestion import IngestionStats, UpsertFn, run_ingestion
+from core.local_vectorstore import LocalVectorStore
+from core.dedup import DedupReport, NearDuplicateIndex, get_dedup_index
 
 logger = logging.getLogger(__name__)
 
+# Process-wide registry: one client, one embeddings wrapper, one schema check per collection.
+_lock = threading.RLock()
+_client: Optional[QdrantClient] = None
+_embeddings: Optional[CachedEmbeddings] = None
+_vectorstores: Dict[str, VectorStore] = {}
+_verified_collections: Set[str] = set()
+
+def _connect() -> QdrantClient:
+    if QDRANT_PREFER_GRPC:
+        try:
+            client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, prefer_grpc=True, timeout=QDRANT_TIMEOUT)
+            client.get_collections()
+            logger.info("Connected to Qdrant over gRPC.")
+            return client
+        except Exception as e:
+            logger.warning(f"Qdrant gRPC connection failed ({e}); falling back to HTTP.")
+    client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=QDRANT_TIMEOUT)
+    logger.info("Connected to Qdrant over HTTP.")
+    return client
+
+def get_client() -> QdrantClient:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _connect()
+    return _client
+
+def get_embeddings() -> CachedEmbeddings:
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                _embeddings = create_embeddings()
+    return _embeddings
+
+def health_check() -> bool:
+    global _client
+    if VECTOR_BACKEND == "local":
+        return True
+    try:
+        get_client().get_collections()
+        return True
+    except Exception as e:
+        logger.warning(f"Qdrant health check failed: {e}; dropping cached client.")
+        with _lock:
+            _client = None
+            _vectorstores.clear()
+            _verified_collections.clear()
+        return False
+
 def ensure_source_index(collection_name: str = QDRANT_COLLECTION) -> None:
-    client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    client = get_client()
     try:
         collection_info = client.get_collection(collection_name=collection_name)
-        indexed_fields = [index.field_name for index in (collection_info.payload_schema or {}).get("indexes", [])]
-        if "source" not in indexed_fields:
+        if "source" not in (collection_info.payload_schema or {}):
             logger.info("Creating 'source' payload index on Qdrant collection.")
             client.create_payload_index(
                 collection_name=collection_name,
@@ -28,43 +90,155 @@ def ensure_source_index(collection_name: str = QDRANT_COLLECTION) -> None:
     except Exception as e:
         logger.warning(f"Could not ensure source index: {e}")
 
-def build_vectorstore(docs: List[Document], collection_name: str = QDRANT_COLLECTION) -> Qdrant:
-    embeddings = OpenAIEmbeddings()
-    client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+def ensure_collection(collection_name: str = QDRANT_COLLECTION, vector_size: Optional[int] = None) -> None:
+    if collection_name in _verified_collections:
+        return
+    with _lock:
+        if collection_name in _verified_collections:
+            return
+        client = get_client()
+        vector_size = vector_size or get_embeddings().dimension
+        existing = None
+        try:
+            if not client.collection_exists(collection_name):
+                quantization = None
+                if QDRANT_QUANTIZATION == "int8":
+                    # int8 copies stay in RAM for search; full-precision vectors move to disk for rescoring.
+                    quantization = ScalarQuantization(
+                        scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+                    )
+                client.create_collection(
+                    collection_name=collection_name,
+                    vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE, on_disk=quantization is not None),
+                    quantization_config=quantization,
+                )
+                logger.info(f"Created Qdrant collection: {collection_name} ({vector_size} dims, quantization={QDRANT_QUANTIZATION})")
+            else:
+                existing = getattr(client.get_collection(collection_name).config.params.vectors, "size", None)
+        except Exception as e:
+            logger.warning(f"Collection creation check failed: {e}")
+            return
+        if existing and existing != vector_size:
+            raise ValueError(
+                f"Qdrant collection {collection_name} holds {existing}-dim vectors but the embedding model "
+                f"produces {vector_size}; use another QDRANT_COLLECTION after changing the embedding model"
+            )
+        ensure_source_index(collection_name)
+        _verified_collections.add(collection_name)
 
-    try:
-        existing = [c.name for c in client.get_collections().collections]
-        if collection_name not in existing:
-            client.create_collection(
-                collection_name=collection_name,
-                vectors_config={"size": 1536, "distance": "Cosine"}
+def qdrant_upsert_fn(client: QdrantClient, collection_name: str, key_fn: Callable[[str], str]) -> UpsertFn:
+    # Payload layout matches langchain's Qdrant wrapper; "source" is also stored at the
+    # top level so the keyword payload index and source filters apply to it.
+    def upsert(batch: List[Document], vectors: List[List[float]]) -> None:
+        points = [
+            PointStruct(
+                id=point_id(key_fn(d.page_content), d.metadata.get("source")),
+                vector=vector,
+                payload={"page_content": d.page_content, "metadata": d.metadata, "source": d.metadata.get("source")},
             )
-            logger.info(f"Created Qdrant collection: {collection_name}")
-    except Exception as e:
-        logger.warning(f"Collection creation check failed: {e}")
+            for d, vector in zip(batch, vectors)
+        ]
+        client.upsert(collection_name=collection_name, points=points, wait=True)
+
+    return upsert
+
+def local_upsert_fn(store: LocalVectorStore, key_fn: Callable[[str], str]) -> UpsertFn:
+    def upsert(batch: List[Document], vectors: List[List[float]]) -> None:
+        ids = [point_id(key_fn(d.page_content), d.metadata.get("source")) for d in batch]
+        store.upsert_vectors(ids, vectors, batch)
+
+    return upsert
+
+def dedup_index(collection_name: str = QDRANT_COLLECTION) -> Optional[NearDuplicateIndex]:
+    """Near-duplicate index of one store: its point ids are only valid in that store."""
+    location = os.path.join(LOCAL_VECTOR_DIR, collection_name) if VECTOR_BACKEND == "local" else f"{QDRANT_URL}/{collection_name}"
+    return get_dedup_index(f"{VECTOR_BACKEND}:{location}:{get_embeddings().model_name}")
+
+def stored_documents(source: str, collection_name: str = QDRANT_COLLECTION) -> List[Document]:
+    """Chunks of ``source`` as stored in the vector store payloads, in chunk order.
 
-    ensure_source_index(collection_name)
+    Lets indexes derived from the chunks (BM25) be rebuilt in a process whose in-memory
+    chunk store has not seen the paper.
+    """
+    if VECTOR_BACKEND == "local":
+        store = load_vectorstore(collection_name)
+        docs = store.source_documents(source) if store is not None else []
+    else:
+        client, docs, offset = get_client(), [], None
+        condition = Filter(must=[FieldCondition(key="source", match=MatchValue(value=source))])
+        while True:
+            points, offset = client.scroll(collection_name, scroll_filter=condition, limit=256, offset=offset, with_vectors=False)
+            docs.extend(Document(page_content=p.payload["page_content"], metadata=dict(p.payload.get("metadata") or {})) for p in points)
+            if offset is None:
+                break
+    docs.sort(key=lambda d: d.metadata.get("chunk_index", 0))
+    return docs
 
+def _store_is_empty(collection_name: str) -> bool:
+    if VECTOR_BACKEND == "local":
+        store = load_vectorstore(collection_name)
+        return store is not None and len(store) == 0
+    return get_client().count(collection_name=collection_name, exact=False).count == 0
+
+def build_vectorstore(
+    docs: List[Document],
+    collection_name: str = QDRANT_COLLECTION,
+    progress: Optional[Callable[[IngestionStats], None]] = None,
+    on_dedup: Optional[Callable[[DedupReport], None]] = None,
+) -> VectorStore:
+    embeddings = get_embeddings()
+    # Point IDs derive from the same content hash as the embedding cache, so re-ingesting
+    # a known paper overwrites its existing points instead of duplicating them.
+    if VECTOR_BACKEND == "local":
+        store = load_vectorstore(collection_name)
+        if store is None:
+            raise RuntimeError(f"Local vector store for {collection_name} could not be opened")
+        upsert = local_upsert_fn(store, embeddings.key)
+        set_sources = store.set_sources
+    else:
+        ensure_collection(collection_name)
+        client = get_client()
+        upsert = qdrant_upsert_fn(client, collection_name, embeddings.key)
+        set_sources = lambda pid, sources: client.set_payload(collection_name, payload={"source": sources}, points=[pid])
+    new_sources, pending = {}, None
+    dedup = dedup_index(collection_name)
+    if dedup is not None:
+        if len(dedup) and _store_is_empty(collection_name):
+            logger.warning(f"Vector store {collection_name} is empty; clearing its near-duplicate index")
+            dedup.reset()
+        docs, new_sources, report, pending = dedup.filter(docs, lambda d: point_id(embeddings.key(d.page_content), d.metadata.get("source")))
+        if on_dedup is not None:
+            on_dedup(report)
     try:
-        db = Qdrant.from_documents(
-            documents=docs,
-            embedding=embeddings,
-            url=QDRANT_URL,
-            api_key=QDRANT_API_KEY,
-            collection_name=collection_name
-        )
-        logger.info("Built/updated Qdrant vector store from documents.")
-        return db
+        stats = run_ingestion(docs, embeddings.embed_documents, upsert, progress=progress)
+        if stats.failed_batches:
+            raise RuntimeError(f"{stats.failed_batches} batch(es) failed: {stats.errors[0]}")
+        # Collapsed duplicates from other papers stay reachable through source filters.
+        for pid, sources in new_sources.items():
+            set_sources(pid, sources)
+        if pending is not None:
+            dedup.commit(pending)
+        logger.info(f"Built/updated {VECTOR_BACKEND} vector store from documents.")
+        return load_vectorstore(collection_name)
     except Exception as e:
         logger.error(f"Failed to build vectorstore: {e}")
         raise
 
-def load_vectorstore(collection_name: str = QDRANT_COLLECTION) -> Optional[Qdrant]:
-    embeddings = OpenAIEmbeddings()
+def load_vectorstore(collection_name: str = QDRANT_COLLECTION) -> Optional[VectorStore]:
+    db = _vectorstores.get(collection_name)
+    if db is not None:
+        return db
     try:
-        ensure_source_index(collection_name)
-        client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-        return Qdrant(client=client, collection_name=collection_name, embeddings=embeddings)
+        with _lock:
+            db = _vectorstores.get(collection_name)
+            if db is None:
+                if VECTOR_BACKEND == "local":
+                    db = LocalVectorStore(os.path.join(LOCAL_VECTOR_DIR, collection_name), get_embeddings())
+                else:
+                    ensure_collection(collection_name)
+                    db = Qdrant(client=get_client(), collection_name=collection_name, embeddings=get_embeddings())
+                _vectorstores[collection_name] = db
+        return db
     except Exception as e:
         logger.warning(f"Could not load vectorstore: {e}")
         return None
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# core.config reads the environment at import time: point every persistent path at a
+# throwaway directory before any core module is imported.
+_TMP = tempfile.mkdtemp(prefix="tests_")
+os.environ.setdefault("API_KEY", "test")
+os.environ["VECTOR_BACKEND"] = "local"
+for name, file_name in {
+    "LOCAL_VECTOR_DIR": "vectors",
+    "SPARSE_INDEX_DIR": "sparse_index",
+    "EMBEDDING_CACHE_PATH": "embedding_cache.sqlite",
+    "TEXT_CACHE_PATH": "text_cache.sqlite",
+    "DEDUP_INDEX_PATH": "dedup_index.pkl",
+    "INGEST_QUEUE_PATH": "ingest_queue.sqlite",
+    "METADATA_INDEX_PATH": "metadata_index.sqlite",
+    "CHUNK_STORE_DIR": "chunks",
+}.items():
+    os.environ[name] = os.path.join(_TMP, file_name)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Write a small text PDF, one page per string, and return its path."""
+    from reportlab.pdfgen import canvas
+
+    def make(name, pages):
+        path = str(tmp_path / name)
+        pdf = canvas.Canvas(path)
+        for text in pages:
+            pdf.drawString(72, 720, text)
+            pdf.showPage()
+        pdf.save()
+        return path
+
+    return make
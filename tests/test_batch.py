@@ -0,0 +1,43 @@
+import json
+
+import core.batch as batch
+from core.batch import BatchJob, completed_ids, run_batch
+
+
+def _fake_run(failing):
+    def run_job(job):
+        if job.id in failing:
+            return {"id": job.id, "error": "RuntimeError: flaky", "latency_s": 0.0}
+        return {"id": job.id, "answer": f"answer {job.id}", "latency_s": 0.0}
+
+    return run_job
+
+
+def _records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_retry_failed_keeps_one_record_per_id(tmp_path, monkeypatch):
+    out = str(tmp_path / "out.jsonl")
+    jobs = [BatchJob(id=str(i), query=f"q{i}", sources=["a.pdf"]) for i in range(4)]
+    monkeypatch.setattr(batch, "run_job", _fake_run({"1", "3"}))
+    assert run_batch(jobs, out, concurrency=2).failed == 2
+
+    monkeypatch.setattr(batch, "run_job", _fake_run({"3"}))
+    report = run_batch(jobs, out, concurrency=2, retry_failed=True)
+    assert report.skipped == 2 and report.completed == 2 and report.failed == 1
+    records = _records(out)
+    assert sorted(r["id"] for r in records) == ["0", "1", "2", "3"]
+    assert {r["id"]: "error" in r for r in records} == {"0": False, "1": False, "2": False, "3": True}
+
+    # A plain resume leaves the file alone, failures included.
+    assert run_batch(jobs, out).completed == 0
+    assert len(_records(out)) == 4
+
+
+def test_partial_and_duplicate_records_are_compacted(tmp_path):
+    out = tmp_path / "out.jsonl"
+    out.write_text('{"id": "1", "error": "x"}\n{"id": "1", "answer": "a"}\n{"id": "2", "answ')
+    assert completed_ids(str(out)) == {"1"}
+    assert _records(out) == [{"id": "1", "answer": "a"}]
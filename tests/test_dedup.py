@@ -0,0 +1,59 @@
+from langchain_core.documents import Document
+from core.dedup import NearDuplicateIndex, get_dedup_index
+
+TEXT = "the quick brown fox jumps over the lazy dog while the cat watches from the old garden wall"
+
+
+def _docs(source, texts):
+    return [Document(page_content=t, metadata={"source": source, "page": i}) for i, t in enumerate(texts)]
+
+
+def _pid(doc):
+    return f"{doc.metadata['source']}:{hash(doc.page_content)}"
+
+
+def test_nothing_recorded_until_commit(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "d.pkl"))
+    keep, _, report, pending = index.filter(_docs("a.pdf", [TEXT]), _pid)
+    assert report.kept == 1 and len(index) == 0
+    # The first ingestion failed and was never committed: the retry must embed again.
+    keep, _, report, pending = index.filter(_docs("a.pdf", [TEXT]), _pid)
+    assert report.kept == 1
+    index.commit(pending)
+    assert len(index) == 1
+    assert index.filter(_docs("b.pdf", [TEXT]), _pid)[2].cross_source == 1
+
+
+def test_cross_source_duplicates_gain_sources(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "d.pkl"))
+    index.commit(index.filter(_docs("a.pdf", [TEXT]), _pid)[3])
+    keep, new_sources, report, pending = index.filter(_docs("b.pdf", [TEXT + " indeed"]), _pid)
+    assert keep == [] and report.cross_source == 1
+    (pid, sources), = new_sources.items()
+    assert sources == ["a.pdf", "b.pdf"]
+    index.commit(pending)
+    assert ("b.pdf", 0) in index.origins(pid)
+
+
+def test_duplicates_within_one_batch(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "d.pkl"))
+    keep, new_sources, report, _ = index.filter(_docs("a.pdf", [TEXT, TEXT]) + _docs("b.pdf", [TEXT]), _pid)
+    assert len(keep) == 1 and report.within_source == 1 and report.cross_source == 1
+    assert list(new_sources.values()) == [["a.pdf", "b.pdf"]]
+
+
+def test_index_is_scoped_per_store():
+    first = get_dedup_index("local:coll_modelA:model-a")
+    first.commit(first.filter(_docs("a.pdf", [TEXT]), _pid)[3])
+    second = get_dedup_index("local:coll_modelB:model-b")
+    assert second is not first and second.path != first.path
+    assert second.filter(_docs("a.pdf", [TEXT]), _pid)[2].kept == 1
+
+
+def test_persisted_and_reset(tmp_path):
+    path = str(tmp_path / "d.pkl")
+    index = NearDuplicateIndex(path)
+    index.commit(index.filter(_docs("a.pdf", [TEXT]), _pid)[3])
+    assert len(NearDuplicateIndex(path)) == 1
+    index.reset()
+    assert len(NearDuplicateIndex(path)) == 0
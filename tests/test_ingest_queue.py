@@ -0,0 +1,141 @@
+import threading
+import time
+
+from core.ingest_queue import FAILED, INDEXED, PARSING, QUEUED, IngestQueue, read_jobs
+from core.loader import get_pdf_pool, load_and_split_pdfs
+
+
+class _Queue(IngestQueue):
+    """Queue whose jobs only record that they ran; ``fail`` makes a source raise."""
+
+    def __init__(self, *args, fail=(), **kwargs):
+        self.ran = []
+        self.fail = set(fail)
+        super().__init__(*args, **kwargs)
+
+    def _run(self, job):
+        self.ran.append(job.source)
+        if job.source in self.fail:
+            raise RuntimeError("boom")
+        self._update(job.id, status=INDEXED)
+
+
+def _wait(queue, job_id, statuses, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue._row(job_id)
+        if job.status in statuses:
+            return job
+        queue._notify()
+        time.sleep(0.02)
+    raise AssertionError(f"job stuck in {queue._row(job_id).status}")
+
+
+def test_identical_submissions_run_once(tmp_path):
+    queue = _Queue(str(tmp_path / "q.sqlite"), workers=2)
+    first = queue.submit("a.pdf", "/x/a.pdf", "hash")
+    _wait(queue, first.id, {INDEXED})
+    second = queue.submit("a.pdf", "/y/a.pdf", "hash")
+    assert second.id == first.id
+    assert queue.ran == ["a.pdf"]
+
+
+def test_failures_are_retried_then_marked_failed(tmp_path):
+    queue = _Queue(str(tmp_path / "q.sqlite"), workers=1, max_attempts=2, backoff_s=0.05, fail={"bad.pdf"})
+    job = _wait(queue, queue.submit("bad.pdf", "/x/bad.pdf", "hash").id, {FAILED})
+    assert job.attempts == 2 and job.error == "boom"
+    assert queue.ran == ["bad.pdf", "bad.pdf"]
+
+
+def test_failed_jobs_wait_out_their_backoff(tmp_path):
+    queue = _Queue(str(tmp_path / "q.sqlite"), workers=1, max_attempts=3, backoff_s=60, fail={"bad.pdf"})
+    job_id = queue.submit("bad.pdf", "/x/bad.pdf", "hash").id
+    deadline = time.time() + 5
+    while queue._row(job_id).attempts == 0 and time.time() < deadline:
+        time.sleep(0.02)
+    job = queue._row(job_id)
+    assert job.status == QUEUED
+    assert job.not_before - time.time() > 50 and "next attempt in" in job.describe()
+    time.sleep(0.3)
+    assert queue.ran == ["bad.pdf"] and queue._claim() is None
+    queue.retry(job_id, attempts=0)  # a manual retry from the sidebar runs at once
+    deadline = time.time() + 5
+    while len(queue.ran) < 2 and time.time() < deadline:
+        time.sleep(0.02)
+    assert queue.ran == ["bad.pdf", "bad.pdf"]
+
+
+def test_interrupted_jobs_are_requeued_on_start(tmp_path):
+    path = str(tmp_path / "q.sqlite")
+    queue = _Queue(path, workers=1, fail={"a.pdf"}, max_attempts=99)
+    job_id = queue.job_id("a.pdf", "hash")
+    queue._claim = lambda: None  # no worker picks anything up
+    queue.submit("a.pdf", "/x/a.pdf", "hash")
+    queue._update(job_id, status=PARSING)
+    assert queue._row(job_id).status == PARSING
+    restarted = _Queue(path, workers=1)
+    assert _wait(restarted, job_id, {INDEXED}).status == INDEXED
+    assert restarted.ran == ["a.pdf"]
+    assert QUEUED not in {j.status for j in restarted.jobs()}
+
+
+def test_parsing_pool_is_shared(make_pdf):
+    one = make_pdf("one.pdf", ["alpha page one", "alpha page two"])
+    two = make_pdf("two.pdf", ["beta page one"])
+    pool = get_pdf_pool()
+    parsed = load_and_split_pdfs([one, two], pool=pool, pages_per_task=1)
+    assert get_pdf_pool() is pool
+    assert [c.metadata["page"] for c in parsed[one]] == [0, 1]
+    assert "beta" in parsed[two][0].page_content
+    assert [c.metadata["chunk_index"] for c in parsed[one]] == [0, 1]
+
+
+def test_read_jobs_leaves_the_queue_alone(tmp_path):
+    path = str(tmp_path / "q.sqlite")
+    assert read_jobs(path=path) == []
+    queue = _Queue(path, workers=1)
+    queue._claim = lambda: None
+    queue.submit("a.pdf", "/x/a.pdf", "h1")
+    queue._update(queue.job_id("a.pdf", "h1"), status=INDEXED)
+    queue.submit("b.pdf", "/x/b.pdf", "h2")
+    queue._update(queue.job_id("b.pdf", "h2"), status=PARSING)
+    assert [j.source for j in read_jobs([INDEXED], path=path)] == ["a.pdf"]
+    # An in-flight job stays in flight: nothing was re-queued.
+    assert queue._row(queue.job_id("b.pdf", "h2")).status == PARSING
+
+
+def test_broken_parsing_pool_is_replaced(make_pdf):
+    import os
+    import signal
+
+    path = make_pdf("one.pdf", ["alpha page one"])
+    pool = get_pdf_pool()
+    pool.submit(os.getpid).result()  # make sure worker processes exist
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+    time.sleep(0.5)
+    assert isinstance(load_and_split_pdfs([path], pool=pool, return_exceptions=True)[path], Exception)
+    fresh = get_pdf_pool()
+    assert fresh is not pool
+    assert "alpha" in load_and_split_pdfs([path], pool=fresh)[path][0].page_content
+
+
+def test_repeated_paths_are_parsed_once(make_pdf):
+    path = make_pdf("one.pdf", ["alpha page one", "alpha page two"])
+    parsed = load_and_split_pdfs([path, path], max_workers=1)
+    assert list(parsed) == [path]
+    assert [c.metadata["chunk_index"] for c in parsed[path]] == [0, 1]
+
+
+def test_single_task_parse_is_memory_capped(make_pdf, monkeypatch):
+    import core.loader as loader
+
+    path = make_pdf("one.pdf", ["alpha page one"])
+    pools = []
+    new_pool = loader._new_pool
+    monkeypatch.setattr(loader, "_new_pool", lambda max_workers: pools.append(max_workers) or new_pool(max_workers))
+    assert "alpha" in load_and_split_pdfs([path], max_workers=1)[path][0].page_content
+    assert pools == [1]  # parsed in a capped worker process
+    monkeypatch.setattr(loader, "PDF_WORKER_MAX_MEMORY_MB", 0)
+    assert "alpha" in load_and_split_pdfs([path], max_workers=1)[path][0].page_content
+    assert pools == [1]  # no cap: parsed in-process
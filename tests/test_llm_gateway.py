@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+
+from core.llm_gateway import GatewayChatOpenAI, LLMGateway, get_llm_gateway
+
+
+def _result(text):
+    return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+def test_identical_concurrent_calls_are_coalesced():
+    gateway = LLMGateway(max_concurrency=4, rpm=0, tpm=0)
+    calls = []
+    started = threading.Event()
+
+    def fn():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return _result("shared answer")
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(gateway.call("k", 10, fn)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(gateway.call("k", 10, fn))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    for t in [leader, *followers]:
+        t.join()
+
+    assert len(calls) == 1 and gateway.stats()["coalesced"] == 3
+    assert {r.generations[0].message.content for r in results} == {"shared answer"}
+    # Each caller owns its result: tagging one message does not leak into the others.
+    results[0].generations[0].message.id = "run-1"
+    assert len({id(r) for r in results}) == 4
+    assert [r.generations[0].message.id for r in results[1:]] == [None, None, None]
+    gateway.call("k", 10, fn)  # nothing in flight any more: a new upstream call
+    assert len(calls) == 2
+
+
+def test_errors_reach_followers_and_clear_the_key():
+    gateway = LLMGateway(max_concurrency=2, rpm=0, tpm=0, max_retries=0)
+
+    def fn():
+        raise ValueError("bad request")
+
+    try:
+        gateway.call("k", 10, fn)
+    except ValueError:
+        pass
+    assert gateway.stats()["errors"] == 1 and gateway._inflight == {}
+
+
+def _model(monkeypatch, text="hello"):
+    def generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return _result(text)
+
+    def stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in text.split():
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+
+    monkeypatch.setattr(ChatOpenAI, "_generate", generate)
+    monkeypatch.setattr(ChatOpenAI, "_stream", stream)
+    return GatewayChatOpenAI(model="gpt-test", api_key="test", cache=False)
+
+
+def test_async_calls_go_through_the_gateway(monkeypatch):
+    llm = _model(monkeypatch, "async answer")
+    before = get_llm_gateway().stats()["upstream"]
+    assert asyncio.run(llm.ainvoke("question")).content == "async answer"
+
+    async def stream():
+        return [chunk.content async for chunk in llm.astream("another question")]
+
+    assert "".join(asyncio.run(stream())) == "async answer "
+    assert get_llm_gateway().stats()["upstream"] == before + 2
+
+
+def test_abandoned_stream_is_taken_over_by_a_follower(monkeypatch):
+    llm = _model(monkeypatch, "one two three")
+    gateway = get_llm_gateway()
+    errors, coalesced = gateway.stats()["errors"], gateway.stats()["coalesced"]
+    from langchain_core.messages import HumanMessage
+
+    messages = [HumanMessage(content="same prompt")]
+    leader = llm._stream(messages)
+    next(leader)  # the leader is mid-stream when a follower arrives
+    results = []
+    follower = threading.Thread(target=lambda: results.append(llm.invoke(messages).content))
+    follower.start()
+    time.sleep(0.1)
+    leader.close()  # e.g. a Streamlit rerun drops the first session's stream
+    follower.join(timeout=5)
+    assert results == ["one two three"] and gateway.stats()["coalesced"] == coalesced + 1
+    assert gateway.stats()["errors"] == errors and gateway._inflight == {}
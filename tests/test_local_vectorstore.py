@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+import core.local_vectorstore as local_vectorstore
+from core.local_vectorstore import LocalVectorStore
+
+
+@pytest.fixture
+def ann(monkeypatch):
+    monkeypatch.setattr(local_vectorstore, "LOCAL_ANN_MIN_VECTORS", 100)
+    monkeypatch.setattr(local_vectorstore, "LOCAL_IVF_NLIST", 8)
+    monkeypatch.setattr(local_vectorstore, "LOCAL_IVF_NPROBE", 1)
+
+
+def _add(store, vectors, start=0, source="a.pdf"):
+    ids = [f"p{start + i}" for i in range(len(vectors))]
+    docs = [Document(page_content=f"chunk {start + i}", metadata={"source": source}) for i in range(len(vectors))]
+    store.upsert_vectors(ids, vectors, docs)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_rows_added_after_training_are_searchable(tmp_path, ann, dtype):
+    rng = np.random.default_rng(0)
+    store = LocalVectorStore(str(tmp_path / "store"), embeddings=None, dtype=dtype)
+    _add(store, rng.normal(size=(200, 16)))
+    store.similarity_search_by_vector(rng.normal(size=16).tolist(), k=1)
+    assert store._ivf is not None and store._ivf.size == 200
+
+    late = rng.normal(size=(5, 16))
+    _add(store, late, start=200, source="b.pdf")
+    assert store._ivf is not None  # below the retraining threshold
+    for i, vector in enumerate(late):
+        (doc, score), = store.similarity_search_by_vector_with_score(vector.tolist(), k=1)
+        assert doc.page_content == f"chunk {200 + i}" and score == pytest.approx(1.0, abs=0.02)
+    docs = store.similarity_search_by_vector(late[0].tolist(), k=1, filter={"source": "b.pdf"})
+    assert [d.page_content for d in docs] == ["chunk 200"]
+
+
+def test_store_reopens_from_disk(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(10, 8))
+    _add(LocalVectorStore(str(tmp_path / "store"), embeddings=None), vectors)
+    reopened = LocalVectorStore(str(tmp_path / "store"), embeddings=None)
+    assert len(reopened) == 10
+    assert reopened.similarity_search_by_vector(vectors[3].tolist(), k=1)[0].page_content == "chunk 3"
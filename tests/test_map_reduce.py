@@ -0,0 +1,31 @@
+import core.processing as processing
+
+
+class _VerboseLLM:
+    """Answers every prompt with ``size`` characters, however short the input."""
+
+    model_name = "fake-verbose"
+
+    def __init__(self, size):
+        self.size = size
+        self.calls = 0
+
+    def batch(self, prompts, config=None):
+        self.calls += len(prompts)
+        return [type("Res", (), {"content": f"{self.calls}:" + "x" * self.size})() for _ in prompts]
+
+
+def test_reduce_terminates_when_summaries_do_not_shrink(monkeypatch):
+    monkeypatch.setattr(processing, "SUMMARY_GROUP_CHARS", 1000)
+    llm = _VerboseLLM(size=800)  # every summary is over half the budget
+    result = processing._map_reduce_text(llm, [f"section {i} " * 50 for i in range(12)], focus="")
+    assert result.startswith(f"{llm.calls}:")
+    # 12 sections map to ~12 summaries, then 6, 3, 2, 1.
+    assert llm.calls <= 12 + 6 + 3 + 2 + 1
+
+
+def test_no_reduce_when_summaries_fit(monkeypatch):
+    monkeypatch.setattr(processing, "SUMMARY_GROUP_CHARS", 1000)
+    llm = _VerboseLLM(size=50)
+    result = processing._map_reduce_text(llm, [f"{i}" + "y" * 600 for i in range(6)], focus="fit")
+    assert llm.calls == 6 and len(result.split("\n\n")) == 6
@@ -0,0 +1,23 @@
+import core.vectorstore as vectorstore
+from core.progressive_ingest import indexing_status, ingest_pdf_progressively, partially_indexed
+from core.retrieval import _note_partial
+
+
+def test_failed_window_is_reported_as_failed(make_pdf, monkeypatch):
+    path = make_pdf("long.pdf", [f"page {i} text" for i in range(4)])
+    calls = []
+
+    def build(chunks, collection_name=None, **kwargs):
+        calls.append(len(chunks))
+        if len(calls) == 2:
+            raise RuntimeError("embedding service down")
+
+    monkeypatch.setattr(vectorstore, "build_vectorstore", build)
+    progress = ingest_pdf_progressively(path, window_pages=2)
+    assert progress.failed and not progress.done and progress.pages_indexed == 2
+    assert indexing_status("long.pdf") is progress
+    assert partially_indexed(["long.pdf"]) == [progress]
+    state = {}
+    _note_partial(state, ["long.pdf"])
+    assert "failed after 2/4 pages (embedding service down)" in state["indexing_note"]
+    assert "Still indexing" not in state["indexing_note"]
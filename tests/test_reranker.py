@@ -0,0 +1,30 @@
+from langchain_core.documents import Document
+
+import core.reranker as reranker
+
+
+def _fake_scores(monkeypatch):
+    def scores(query, docs, stats):
+        stats.scored += len(docs)
+        return [d.metadata["score"] for d in docs]
+
+    monkeypatch.setattr(reranker, "_cached_scores", scores)
+
+
+def _docs(scores):
+    return [Document(page_content=str(i), metadata={"score": s}) for i, s in enumerate(scores)]
+
+
+def test_cascade_stops_early_on_single_source_candidates(monkeypatch):
+    _fake_scores(monkeypatch)
+    # Dense k=5 plus BM25 k=4: the best candidates are already first.
+    ranked, stats = reranker.rerank_cascade("q", _docs([9, 8, 7, 6, 5, 1, 1, 1, 1]), top_n=5, min_depth=0, step=0)
+    assert stats.stop == "converged" and stats.depth < 9
+    assert [d.page_content for _, d in ranked[:5]] == ["0", "1", "2", "3", "4"]
+
+
+def test_cascade_goes_deeper_while_the_top_changes(monkeypatch):
+    _fake_scores(monkeypatch)
+    ranked, stats = reranker.rerank_cascade("q", _docs([1, 1, 1, 1, 1, 9, 9, 9, 9]), top_n=5, min_depth=0, step=0)
+    assert stats.depth == 9 and stats.stop == "exhausted"
+    assert {d.page_content for _, d in ranked[:4]} == {"5", "6", "7", "8"}
@@ -0,0 +1,36 @@
+import numpy as np
+from langchain_core.documents import Document
+
+import core.retrieval as retrieval
+from core import vectorstore
+from core.local_vectorstore import LocalVectorStore
+from core.sparse_index import SparseIndexStore
+
+
+def _setup(tmp_path, monkeypatch, docs):
+    store = LocalVectorStore(str(tmp_path / "vectors"), embeddings=None)
+    if docs:
+        store.upsert_vectors([f"p{i}" for i in range(len(docs))], np.eye(len(docs), 8), docs)
+    sparse = SparseIndexStore(str(tmp_path / "sparse"))
+    monkeypatch.setattr(vectorstore, "load_vectorstore", lambda collection_name=None: store)
+    monkeypatch.setattr(vectorstore, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(retrieval, "get_sparse_index", lambda: sparse)
+    return sparse
+
+
+def test_missing_sparse_index_is_not_persisted_empty(tmp_path, monkeypatch):
+    sparse = _setup(tmp_path, monkeypatch, [])
+    assert retrieval._sparse_retriever("queued.pdf").invoke("anything") == []
+    assert sparse.get("queued.pdf") is None
+
+
+def test_sparse_index_rebuilt_from_vector_store_payloads(tmp_path, monkeypatch):
+    docs = [
+        Document(page_content=text, metadata={"source": "a.pdf", "chunk_index": i})
+        for i, text in enumerate(["graph neural networks", "protein folding"])
+    ]
+    sparse = _setup(tmp_path, monkeypatch, docs)
+    sparse.replace_source("a.pdf", [])  # left behind by an earlier release
+    found = retrieval._sparse_retriever("a.pdf").invoke("protein")
+    assert [d.page_content for d in found] == ["protein folding"]
+    assert len(sparse.get("a.pdf")) == 2
@@ -0,0 +1,50 @@
+import pickle
+import threading
+
+from langchain_core.documents import Document
+
+from core.sparse_index import SourceIndex, SparseIndexStore
+
+
+def _docs(texts, source="a.pdf"):
+    return [Document(page_content=t, metadata={"source": source, "chunk_index": i}) for i, t in enumerate(texts)]
+
+
+def test_search_sees_documents_added_after_a_cached_search():
+    index = SourceIndex("a.pdf")
+    index.add(_docs(["alpha beta", "gamma delta"]))
+    assert [d.page_content for d in index.search("alpha")] == ["alpha beta"]
+    index.add(_docs(["alpha alpha alpha"]))
+    assert [d.page_content for d in index.search("alpha")] == ["alpha alpha alpha", "alpha beta"]
+
+
+def test_concurrent_adds_never_leave_a_stale_snapshot():
+    index = SourceIndex("a.pdf")
+    stop = threading.Event()
+
+    def search():
+        while not stop.is_set():
+            index.search("needle", k=5)
+
+    searchers = [threading.Thread(target=search) for _ in range(4)]
+    for t in searchers:
+        t.start()
+    for i in range(200):
+        index.add(_docs([f"needle {i} haystack"]))
+    stop.set()
+    for t in searchers:
+        t.join()
+    # Whatever the interleaving, the cached arrays describe every added document.
+    assert len(index.search("needle", k=500)) == 200
+    assert len(index._snapshot({"needle"})[0]) == 200
+
+
+def test_snapshot_survives_persistence(tmp_path):
+    store = SparseIndexStore(str(tmp_path))
+    store.add_documents(_docs(["retrieval augmented generation", "graph neural network"]))
+    store.get("a.pdf").search("graph")
+    reopened = SparseIndexStore(str(tmp_path)).get("a.pdf")
+    assert reopened._lengths_arr is None and reopened._frozen == {}
+    assert [d.page_content for d in reopened.search("graph")] == ["graph neural network"]
+    reopened.add(_docs(["graph theory"]))
+    assert len(pickle.loads(pickle.dumps(reopened)).search("graph")) == 2
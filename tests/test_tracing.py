@@ -0,0 +1,11 @@
+from core.tracing import Metrics
+
+
+def test_prometheus_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.observe('node "a"', 0.01)
+    metrics.inc("cache", source='paper "x"\\n.pdf\nline2')
+    text = metrics.to_prometheus()
+    assert 'span="node \\"a\\""' in text
+    assert 'source="paper \\"x\\"\\\\n.pdf\\nline2"' in text
+    assert all(line.count('"') % 2 == 0 for line in text.splitlines())
@@ -1,24 +1,40 @@
 import streamlit as st
-from core.processing import generate_bibliographic_citation
-from core.state import ResearchState
+from core.bibliography import STYLES, format_bibliography, get_metadata_index
+
+def _library_entries():
+    # Every indexed paper, from all sessions; papers ingested before the metadata index
+    # existed are parsed once here.
+    from core.ingest_queue import INDEXED, read_jobs
+
+    index = get_metadata_index()
+    index.backfill((job.source, job.path, job.content_hash) for job in read_jobs([INDEXED]))
+    return index.entries()
+
+def _session_entries():
+    index = get_metadata_index()
+    return [index.add_pdf(f["path"], f["name"], f["content_hash"]) for f in st.session_state.uploaded_files]
 
 def citation_section():
-    st.subheader("📚 Generate Bibliographic Citation")
-    selected_style = st.selectbox("Citation Style", ["APA", "IEEE", "MLA", "Chicago"], index=0)
+    st.subheader("📚 Generate Bibliography")
+    selected_style = st.selectbox("Citation Style", list(STYLES), index=0)
+    whole_library = st.checkbox("Whole library (every indexed paper, from all sessions)")
 
     if st.button("🧾 Generate Citations"):
-        if not st.session_state.docs:
+        if not whole_library and not st.session_state.uploaded_files:
             st.warning("⚠️ Please upload and process a PDF first.")
             return
-        state: ResearchState = {
-            "docs": st.session_state.docs,
-            "research_params": {"citation_style": selected_style}
-        }
         with st.spinner("Generating bibliographic citations..."):
-            result = generate_bibliographic_citation(state)
-        citation_output = result.get("citation_output", "")
+            entries = _library_entries() if whole_library else _session_entries()
+            citation_output = format_bibliography(entries, selected_style)
         if citation_output:
-            st.success("✅ Citations Generated Successfully!")
-            st.code(citation_output)
+            st.success(f"✅ {len(entries)} citation(s) generated!")
+            bibtex = selected_style == "BibTeX"
+            st.code(citation_output, language="latex" if bibtex else None)
+            st.download_button(
+                "⬇️ Download",
+                citation_output,
+                file_name="references.bib" if bibtex else f"references_{selected_style.lower()}.txt",
+                mime="text/plain",
+            )
         else:
             st.warning("No citation could be generated. Check PDF metadata.")
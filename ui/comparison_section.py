@@ -1,42 +1,69 @@
 import streamlit as st
-from core.loader import load_and_split_pdf
 from core.processing import compare_papers
 from core.state import ResearchState
+import hashlib
+from itertools import chain
 import os
 
 DATA_DIR = "data"
 
+def _comparison_docs(uploaded_file):
+    # Temporary uploads are parsed once per distinct file content, shared through the chunk store.
+    from core.chunk_store import get_chunk_store
+
+    store = get_chunk_store()
+    digest = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+    ids = store.lookup(uploaded_file.name, digest)
+    if ids is None:
+        from core.loader import load_and_split_pdf
+
+        file_path = os.path.join(DATA_DIR, uploaded_file.name)
+        with open(file_path, "wb") as f:
+            f.write(uploaded_file.getbuffer())
+        ids = store.add_paper(uploaded_file.name, load_and_split_pdf(file_path), digest)
+    return store.documents(chain.from_iterable(ids))
+
 def comparison_section():
-    st.subheader("📊 Compare Two Research Papers")
+    st.subheader("📊 Compare Research Papers")
     if not st.session_state.uploaded_files:
         st.info("Upload at least one main paper first to enable comparison.")
         return
 
     papers = [f["name"] for f in st.session_state.uploaded_files]
-    paper1 = st.selectbox("Select Paper 1 (from main uploads)", papers)
+    selected = st.multiselect("Select papers (from main uploads)", papers, default=papers[:1])
 
-    st.markdown("### Upload Paper 2 (for comparison only)")
-    uploaded_file_2 = st.file_uploader("Upload a second PDF (temporary)", type=["pdf"], key="comparison_upload")
+    st.markdown("### Upload Additional Papers (for comparison only)")
+    extra_files = st.file_uploader(
+        "Upload more PDFs (temporary)", type=["pdf"], key="comparison_upload", accept_multiple_files=True
+    ) or []
 
     comparison_focus = st.text_input("Optional Focus Area", placeholder="e.g., Transformer efficiency")
 
     if st.button("🔍 Run Comparative Analysis"):
-        if not uploaded_file_2:
-            st.warning("⚠️ Please upload a second paper.")
+        if len(selected) + len(extra_files) < 2:
+            st.warning("⚠️ Select or upload at least two papers.")
             return
-        docs_paper1 = [d for d in st.session_state.docs if d.metadata.get("source") == paper1]
-        file_path_2 = os.path.join(DATA_DIR, uploaded_file_2.name)
-        with open(file_path_2, "wb") as f:
-            f.write(uploaded_file_2.getbuffer())
-        docs_paper2 = load_and_split_pdf(file_path_2)
+
+        from ui.upload_section import session_documents
+
+        docs = session_documents(selected)
+        with st.spinner("Parsing uploaded papers..."):
+            for uploaded_file in extra_files:
+                docs.extend(_comparison_docs(uploaded_file))
 
         state: ResearchState = {
             "query": comparison_focus or "General comparison",
-            "docs": docs_paper1[:10] + docs_paper2[:10],
+            "docs": docs,
             "research_params": {"mode": "comparative_analysis", "focus_area": comparison_focus}
         }
-        with st.spinner("Running comparative analysis..."):
-            result = compare_papers(state)
+        with st.spinner("Profiling and comparing papers..."):
+            if st.session_state.get("use_streaming"):
+                from core.graph import get_task_app
+                from ui.streaming import render_stream
+
+                result = render_stream(get_task_app("compare"), state)
+            else:
+                result = compare_papers(state)
 
         st.success("✅ Comparison Complete!")
         meta = result.get("comparison_metadata", {})
@@ -46,6 +73,13 @@ def comparison_section():
                 st.markdown(f"**{i}. {info.get('title')} ({info.get('year')})**")
             if meta.get("focus_area"):
                 st.markdown(f"**Focus Area:** {meta['focus_area']}")
+            if meta.get("profiles"):
+                from core.profiles import format_profile
+
+                with st.expander("🗂️ Paper Profiles"):
+                    for src, profile in meta["profiles"].items():
+                        st.markdown(f"**{src}**")
+                        st.markdown(format_profile(profile))
         st.markdown("---")
         st.subheader("📋 Comparison Report")
         st.markdown(result.get("comparison", "⚠️ No comparison output."))
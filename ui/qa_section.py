@@ -1,42 +1,92 @@
 import streamlit as st
-from core.graph import app as langgraph_app
 from core.state import ResearchState
 import logging
 
 logger = logging.getLogger(__name__)
 
+@st.cache_resource(show_spinner="Loading retrieval pipeline...")
+def get_langgraph_app():
+    # Cached across reruns and sessions; the first question pays the build cost, not page load.
+    from core.graph import get_app
+
+    return get_app()
+
+def _not_searchable(names):
+    # Papers whose ingestion job has indexed nothing yet. Progressive jobs become searchable
+    # after their first window; the answer then carries the "still indexing" note.
+    from core.ingest_queue import INDEXED, get_ingest_queue
+
+    queue = get_ingest_queue()
+    hashes = {f["name"]: f.get("content_hash") for f in st.session_state.uploaded_files}
+    waiting = []
+    for name in names:
+        job = queue.status(name, hashes.get(name))
+        if job is not None and job.status != INDEXED and not (job.active and job.pages_done):
+            waiting.append(f"{name} ({job.describe()})")
+    return waiting
+
 def qa_section():
     st.subheader("Standard Q&A")
     citation_style = st.selectbox("Citation Format", ["APA", "IEEE", "MLA", "Chicago"])
     query = st.text_input("Enter your question about the uploaded papers:")
+    papers = [f["name"] for f in st.session_state.uploaded_files]
+    current = st.session_state.get("current_file")
+    sources = st.multiselect(
+        "Papers to search",
+        papers,
+        default=[current] if current in papers else [],
+        help="Select several papers to answer from all of them at once.",
+    )
 
-    if st.button("Ask"):
+    waiting = _not_searchable(sources or ([current] if current in papers else []))
+    if waiting:
+        st.info("⏳ Waiting for indexing: " + "; ".join(waiting) + ". Questions can be asked once it finishes.")
+
+    if st.button("Ask", disabled=bool(waiting)):
         if not st.session_state.uploaded_files:
             st.warning("⚠️ Please upload PDFs first.")
             return
         state: ResearchState = {
             "query": query,
             "research_params": {"mode": "standard_qa", "citation_style": citation_style},
-            "current_file": st.session_state.get("current_file"),
-            "docs": st.session_state.get("docs", [])
+            "current_file": sources[0] if len(sources) == 1 else current,
+            "sources": sources,
         }
-        with st.spinner("Analyzing and answering..."):
+        from core import tracing
+
+        with st.spinner("Analyzing and answering..."), tracing.request() as trace:
             try:
-                result = langgraph_app.invoke(state)
+                if st.session_state.get("use_streaming"):
+                    from ui.streaming import render_stream
+
+                    result = render_stream(get_langgraph_app(), state)
+                else:
+                    result = get_langgraph_app().invoke(state)
             except Exception as e:
                 st.error(f"Processing failed: {e}")
                 logger.error(e)
                 return
 
+        if result.get("indexing_note"):
+            st.info(f"⏳ {result['indexing_note']}")
         if result.get("answer"):
             st.subheader("📘 Generated Answer")
             st.write(result["answer"])
+            if result.get("cache_hit"):
+                st.caption("⚡ Served from the answer cache.")
         elif result.get("error"):
             st.error(result["error"])
         else:
             st.info("No answer produced.")
 
         with st.expander("📄 Source Documents"):
-            for i, doc in enumerate(result.get("docs", st.session_state.docs[:5])):
+            for i, doc in enumerate(result.get("docs", [])):
                 preview = getattr(doc, "page_content", str(doc))[:200]
                 st.write(f"**Document {i+1}:** {preview}...")
+
+        if trace is not None:
+            with st.expander("⏱️ Timing Breakdown"):
+                rows = trace.breakdown()
+                for row in rows:
+                    row["span"] = " " * row.pop("depth") + row["span"]
+                st.dataframe(rows, use_container_width=True, hide_index=True)
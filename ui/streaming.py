@@ -0,0 +1,21 @@
+import streamlit as st
+from core.state import ResearchState
+
+def render_stream(app, state: ResearchState) -> ResearchState:
+    # Renders tokens into a placeholder as they arrive; the caller replaces it with the final text.
+    from core.streaming import stream_invoke
+
+    placeholder = st.empty()
+    buffer = []
+
+    def on_token(token: str) -> None:
+        buffer.append(token)
+        placeholder.markdown("".join(buffer) + "▌")
+
+    try:
+        result = stream_invoke(app, state, on_token)
+    finally:
+        placeholder.empty()
+    if result.get("ttft_s") is not None:
+        st.caption(f"⏱️ First token after {result['ttft_s']:.2f}s")
+    return result
@@ -1,6 +1,7 @@
 import streamlit as st
 from core.processing import summarize_docs
 from core.state import ResearchState
+from ui.upload_section import session_documents
 
 def summarization_section():
     st.subheader("Summarization")
@@ -9,7 +10,11 @@ def summarization_section():
         return
 
     selected_sum_mode = st.selectbox("Summary Style", ["abstract", "bullet_points", "critical_analysis"])
-    st.session_state.use_streaming = st.checkbox("Enable Streaming Mode", value=st.session_state.get("use_streaming", False))
+    st.session_state.use_streaming = st.checkbox(
+        "Enable Streaming Mode",
+        value=st.session_state.get("use_streaming", False),
+        help="Stream answers, summaries and comparison reports token by token.",
+    )
 
     if st.button("Generate Summary"):
         research_params = {"mode": "literature_review", "summarization_mode": selected_sum_mode}
@@ -17,10 +22,16 @@ def summarization_section():
             "query": "Provide a summary of the uploaded documents.",
             "research_params": research_params,
             "current_file": st.session_state.get("current_file"),
-            "docs": st.session_state.get("docs", [])
+            "docs": session_documents(),
         }
         with st.spinner("Generating summary..."):
-            result = summarize_docs(state)
+            if st.session_state.get("use_streaming"):
+                from core.graph import get_task_app
+                from ui.streaming import render_stream
+
+                result = render_stream(get_task_app("summarize"), state)
+            else:
+                result = summarize_docs(state)
             if result.get("summary"):
                 st.subheader("Generated Summary")
                 st.write(result["summary"])
@@ -30,7 +41,8 @@ def summarization_section():
             st.info(result["truncation_note"])
 
     with st.expander("📄 Source Documents for Summary"):
-        if st.session_state.docs:
-            for i, doc in enumerate(st.session_state.docs[:5]):
+        docs = session_documents(limit=5)
+        if docs:
+            for i, doc in enumerate(docs):
                 preview = getattr(doc, "page_content", str(doc))[:200]
                 st.write(f"**Document {i+1}:** {preview}...")
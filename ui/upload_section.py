@@ -1,14 +1,29 @@
 import streamlit as st
 import os
-from core.loader import load_and_split_pdf
-from core.vectorstore import build_vectorstore
+import hashlib
 import logging
+from itertools import chain
+from typing import Iterable, Optional
 
 logger = logging.getLogger(__name__)
 
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
+def session_documents(sources: Optional[Iterable[str]] = None, limit: Optional[int] = None):
+    # Sessions keep only chunk id ranges; text and metadata live in the shared chunk store.
+    from core.chunk_store import get_chunk_store
+
+    store = get_chunk_store()
+    wanted = None if sources is None else set(sources)
+    ranges = [
+        r
+        for f in st.session_state.uploaded_files
+        if wanted is None or f["name"] in wanted
+        for r in store.paper_ids(f["name"], f.get("content_hash"))
+    ]
+    return store.documents(chain.from_iterable(ranges), limit)
+
 def upload_section():
     col = st.sidebar
     col.header("📤 Upload Research Papers")
@@ -18,35 +33,63 @@ def upload_section():
         if not isinstance(uploaded_files, list):
             uploaded_files = [uploaded_files]
 
-        new_docs = []
-        for uploaded_file in uploaded_files:
-            if uploaded_file.name in st.session_state.processed_files_names:
-                continue
-            file_path = os.path.join(DATA_DIR, uploaded_file.name)
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            try:
-                chunks = load_and_split_pdf(file_path)
-                new_docs.extend(chunks)
+        pending = [f for f in uploaded_files if f.name not in st.session_state.processed_files_names]
+        if pending:
+            from core.ingest_queue import get_ingest_queue
+
+            # Parsing and indexing run on the shared background queue; this run only saves
+            # the file and enqueues it, so the page never blocks. The same file uploaded by
+            # several sessions maps to one job.
+            queue = get_ingest_queue()
+            for uploaded_file in pending:
+                data = uploaded_file.getbuffer()
+                content_hash = hashlib.sha256(data).hexdigest()
+                file_dir = os.path.join(DATA_DIR, "uploads", content_hash[:16])
+                os.makedirs(file_dir, exist_ok=True)
+                file_path = os.path.join(file_dir, uploaded_file.name)
+                if not os.path.exists(file_path):
+                    with open(file_path, "wb") as f:
+                        f.write(data)
+                queue.submit(uploaded_file.name, file_path, content_hash)
                 st.session_state.processed_files_names.append(uploaded_file.name)
-                st.session_state.uploaded_files.append({"name": uploaded_file.name, "path": file_path})
+                st.session_state.uploaded_files.append(
+                    {"name": uploaded_file.name, "path": file_path, "content_hash": content_hash}
+                )
                 st.session_state.current_file = uploaded_file.name
-            except Exception as e:
-                st.error(f"Failed to process {uploaded_file.name}: {e}")
-                logger.error(e)
-
-        if new_docs:
-            try:
-                st.session_state.docs.extend(new_docs)
-                build_vectorstore(new_docs)
-                st.success(f"✅ {len(new_docs)} chunks processed and vector store updated.")
-            except Exception as e:
-                st.error(f"Vectorstore build failed: {e}")
-                logger.error(e)
-
-    if st.session_state.uploaded_files:
-        col.markdown("**Uploaded files:**")
-        for f in st.session_state.uploaded_files:
-            col.write(f"- {f['name']}")
-    else:
-        col.info("No files uploaded yet.")
+
+    with col:
+        if st.session_state.uploaded_files:
+            _ingestion_status()
+        else:
+            st.info("No files uploaded yet.")
+
+def _any_active(queue, files) -> bool:
+    return any(job is not None and job.active for job in (queue.status(f["name"], f.get("content_hash")) for f in files))
+
+def _ingestion_status():
+    from core.config import INGEST_STATUS_POLL_S
+    from core.ingest_queue import get_ingest_queue
+
+    queue = get_ingest_queue()
+    files = list(st.session_state.uploaded_files)
+    active = _any_active(queue, files)
+
+    # Re-renders only this panel, on a timer, while any job is still running.
+    @st.fragment(run_every=INGEST_STATUS_POLL_S if active else None)
+    def panel():
+        st.markdown("**Uploaded files:**")
+        for f in files:
+            job = queue.status(f["name"], f.get("content_hash"))
+            if job is None:
+                st.write(f"- {f['name']}")
+                continue
+            icon = {"indexed": "✅", "failed": "❌"}.get(job.status, "⏳")
+            st.write(f"- {icon} {f['name']} ({job.describe()})")
+            if job.status == "failed" and st.button("Retry", key=f"retry-{job.id}"):
+                queue.retry(job.id, attempts=0)
+                st.rerun()
+        if active and not _any_active(queue, files):
+            # Everything finished since the page rendered: refresh once so the other tabs see it.
+            st.rerun()
+
+    panel()
@@ -0,0 +1,52 @@
+"""Run JSONL query files through the research graph without the Streamlit UI.
+
+Each input line is ``{"query": ..., "sources": [...], "mode": "qa" | "summary" | "compare" |
+"citations", "id"?: ...}``; other keys (e.g. ``citation_style``, ``focus_area``) become
+research params. Papers must already be indexed (vector store and BM25 index on disk).
+"""
+import argparse
+import json
+import sys
+import time
+from utils.logging_utils import configure_logging
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless batch queries over indexed papers.")
+    parser.add_argument("input", help="JSONL file of jobs.")
+    parser.add_argument("--output", required=True, help="Results JSONL; also the checkpoint for resuming.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--backend", choices=["thread", "asyncio"], default="thread")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run jobs whose previous result was an error.")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between progress lines on stderr.")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    from core.batch import load_jobs, run_batch
+
+    last = [0.0]
+
+    def progress(report) -> None:
+        now = time.monotonic()
+        if now - last[0] >= args.report_every or report.skipped + report.completed == report.total:
+            last[0] = now
+            print(
+                f"[batch] {report.skipped + report.completed}/{report.total} done "
+                f"({report.failed} failed), {report.throughput_qps:.2f} queries/s",
+                file=sys.stderr,
+            )
+
+    report = run_batch(
+        load_jobs(args.input),
+        args.output,
+        concurrency=args.concurrency,
+        backend=args.backend,
+        retry_failed=args.retry_failed,
+        progress=progress,
+    )
+    print(json.dumps(report.to_dict(), indent=2))
+    return 0 if not report.failed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
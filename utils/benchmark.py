@@ -0,0 +1,418 @@
+"""Offline benchmark of ingestion and retrieval on a synthetic corpus.
+
+Runs without network access: PDFs are generated locally, embeddings are a deterministic
+hashing model, the reranker scores token overlap and the LLM is a canned fake. Storage
+goes through the embedded vector backend in a temporary directory, so the real
+loader, ingestion pipeline, BM25 index, hybrid retrieval and graph code paths are timed.
+
+    python -m utils.benchmark run --papers 20 --pages 8 --queries 200 --output bench.json
+    python -m utils.benchmark compare old.json new.json --tolerance 0.15
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vi", "so", "pe", "du", "qua", "zen", "bor", "fi", "gal", "tre"]
+
+
+def _words(rng: random.Random, n: int, syllables: int = 3) -> List[str]:
+    seen, words = set(), []
+    while len(words) < n:
+        w = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, syllables)))
+        if w not in seen:
+            seen.add(w)
+            words.append(w)
+    return words
+
+
+def synthetic_corpus(n_papers: int, pages: int, facts_per_page: int = 2, seed: int = 0) -> Tuple[Dict[str, List[str]], List[Dict[str, str]]]:
+    """Return ({paper name: page texts}, labeled queries).
+
+    Pages mix filler sentences over a shared vocabulary with "fact" sentences built from
+    words unique to that fact; each fact yields one query whose answer is that sentence.
+    """
+    rng = random.Random(seed)
+    filler = _words(rng, 800)
+    fact_words = iter(_words(rng, n_papers * pages * facts_per_page * 3 + 10, syllables=4))
+    papers: Dict[str, List[str]] = {}
+    queries: List[Dict[str, str]] = []
+    for p in range(n_papers):
+        name = f"paper_{p:04d}.pdf"
+        page_texts = []
+        for _ in range(pages):
+            sentences = [" ".join(rng.choices(filler, k=rng.randint(8, 16))).capitalize() + "." for _ in range(14)]
+            for _ in range(facts_per_page):
+                a, b, c = next(fact_words), next(fact_words), next(fact_words)
+                value = rng.randint(50, 99)
+                sentences.insert(rng.randrange(len(sentences)), f"The {a} {b} method reached {value} percent accuracy on {c}.")
+                queries.append({"query": f"What accuracy did the {a} {b} method reach on {c}?", "source": name, "marker": f"{a} {b} method"})
+            page_texts.append(" ".join(sentences))
+        papers[name] = page_texts
+    rng.shuffle(queries)
+    return papers, queries
+
+
+def write_pdf(path: str, pages: Sequence[str]) -> None:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(path, pagesize=letter)
+    for text in pages:
+        y = 740
+        for line in textwrap.wrap(text, 95):
+            c.drawString(40, y, line)
+            y -= 12
+            if y < 40:
+                c.showPage()
+                y = 740
+        c.showPage()
+    c.save()
+
+
+def _hash_embeddings(dim: int):
+    from langchain_core.embeddings import Embeddings
+    from core.sparse_index import tokenize
+
+    class HashEmbeddings(Embeddings):
+        """Deterministic hashing-trick bag of words; similar texts get similar vectors."""
+
+        def _embed(self, text: str) -> List[float]:
+            vec = np.zeros(dim, dtype=np.float32)
+            for token in tokenize(text):
+                h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+                vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+            norm = float(np.linalg.norm(vec))
+            return (vec / norm if norm else vec).tolist()
+
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            return [self._embed(t) for t in texts]
+
+        def embed_query(self, text: str) -> List[float]:
+            return self._embed(text)
+
+    return HashEmbeddings()
+
+
+class OverlapReranker:
+    """Stand-in for the cross-encoder: fraction of query tokens present in the passage."""
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        from core.sparse_index import tokenize
+
+        scores = []
+        for query, text in pairs:
+            q = set(tokenize(query))
+            scores.append(len(q & set(tokenize(text))) / max(len(q), 1))
+        return scores
+
+
+def _percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"n": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    arr = np.asarray(samples) * 1000
+    return {
+        "n": len(samples),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+    }
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _isolate(workdir: str, dtype: str = "float32") -> None:
+    # Must run before any core module is imported: config is read at import time.
+    os.environ.setdefault("API_KEY", "benchmark-offline")
+    os.environ["VECTOR_BACKEND"] = "local"
+    os.environ["LOCAL_VECTOR_DTYPE"] = dtype
+    os.environ["LOCAL_VECTOR_DIR"] = os.path.join(workdir, "vectors")
+    os.environ["SPARSE_INDEX_DIR"] = os.path.join(workdir, "sparse_index")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embedding_cache.sqlite")
+    os.environ["TEXT_CACHE_PATH"] = os.path.join(workdir, "text_cache.sqlite")
+    os.environ["DEDUP_INDEX_PATH"] = os.path.join(workdir, "dedup_index.pkl")
+    os.environ["INGEST_QUEUE_PATH"] = os.path.join(workdir, "ingest_queue.sqlite")
+    os.environ["METADATA_INDEX_PATH"] = os.path.join(workdir, "metadata_index.sqlite")
+    os.environ["CHUNK_STORE_DIR"] = os.path.join(workdir, "chunks")
+
+
+def _dir_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def _score(docs, marker: str, k: int) -> Tuple[float, float]:
+    for rank, doc in enumerate(docs[:k], start=1):
+        if marker in " ".join(doc.page_content.split()):
+            return 1.0, 1.0 / rank
+    return 0.0, 0.0
+
+
+def run_benchmark(
+    papers: int = 10,
+    pages: int = 8,
+    queries: int = 100,
+    k: int = 5,
+    dim: int = 256,
+    e2e_queries: int = 20,
+    multi_sources: int = 3,
+    llm_latency_ms: float = 0.0,
+    seed: int = 0,
+    workdir: Optional[str] = None,
+    embeddings: str = "hash",
+    dtype: str = "float32",
+) -> Dict[str, Any]:
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_")
+    _isolate(workdir, dtype)
+
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from core import processing, reranker, vectorstore
+    from core.embedding_cache import CachedEmbeddings, EmbeddingCache
+    from core.config import EMBEDDING_CACHE_PATH, LOCAL_VECTOR_DIR
+    from core.embeddings import LocalEmbeddings
+    from core.loader import load_and_split_pdfs
+    from core.sparse_index import get_sparse_index
+    from core.retrieval import hybrid_retrieve
+    from core.graph import get_app
+    from core.tracing import llm_callbacks
+
+    if embeddings == "local":
+        # The configured sentence-transformers model; `dim` truncates it (Matryoshka) when smaller.
+        model = LocalEmbeddings(dim=dim)
+        vectorstore._embeddings = CachedEmbeddings(model, cache=EmbeddingCache(EMBEDDING_CACHE_PATH), model_name=model.model)
+    else:
+        vectorstore._embeddings = CachedEmbeddings(_hash_embeddings(dim), cache=EmbeddingCache(EMBEDDING_CACHE_PATH), model_name=f"hash-{dim}")
+    reranker._service = OverlapReranker()
+    processing._get_llm = lambda: FakeListChatModel(
+        responses=["Benchmark answer [1]."], sleep=llm_latency_ms / 1000 or None, callbacks=llm_callbacks()
+    )
+
+    corpus, labeled = synthetic_corpus(papers, pages, seed=seed)
+    # Retrieval and pipeline runs use disjoint labelled queries; a small corpus has too few for both.
+    warnings = []
+    if queries + e2e_queries > len(labeled):
+        warnings.append(
+            f"Only {len(labeled)} labelled queries for {queries} retrieval + {e2e_queries} pipeline queries: "
+            f"ran {min(queries, len(labeled))} + {max(0, min(e2e_queries, len(labeled) - queries))}. "
+            "Use more --papers/--pages for the full counts."
+        )
+        logger.warning(warnings[-1])
+    pdf_dir = os.path.join(workdir, "pdfs")
+    os.makedirs(pdf_dir, exist_ok=True)
+    paths = []
+    for name, page_texts in corpus.items():
+        path = os.path.join(pdf_dir, name)
+        write_pdf(path, page_texts)
+        paths.append(path)
+
+    t = time.perf_counter()
+    parsed = load_and_split_pdfs(paths)
+    parse_s = time.perf_counter() - t
+    chunks = [c for path in paths for c in parsed[path]]
+
+    t = time.perf_counter()
+    for path in paths:
+        get_sparse_index().replace_source(os.path.basename(path), parsed[path])
+    sparse_s = time.perf_counter() - t
+
+    stats = []
+    t = time.perf_counter()
+    vectorstore.build_vectorstore(chunks, progress=stats.append)
+    index_s = time.perf_counter() - t
+    rss_after_ingest = _peak_rss_mb()
+
+    query_embed_latency = []
+    for q in labeled[:queries]:
+        t = time.perf_counter()
+        vectorstore._embeddings.embeddings.embed_query(q["query"])
+        query_embed_latency.append(time.perf_counter() - t)
+
+    names = list(corpus)
+    single_latency, multi_latency, recalls, rrs, multi_recalls, rerank_pairs = [], [], [], [], [], []
+    for i, q in enumerate(labeled[:queries]):
+        state = {"query": q["query"], "current_file": q["source"], "research_params": {"mode": "standard_qa"}}
+        t = time.perf_counter()
+        state = hybrid_retrieve(state)
+        docs = state["docs"]
+        single_latency.append(time.perf_counter() - t)
+        rerank_pairs.append((state.get("rerank_stats") or {}).get("scored", 0))
+        hit, rr = _score(docs, q["marker"], k)
+        recalls.append(hit)
+        rrs.append(rr)
+
+        if multi_sources > 1 and len(names) > 1:
+            others = [n for n in names if n != q["source"]]
+            sources = [q["source"]] + random.Random(i).sample(others, min(multi_sources - 1, len(others)))
+            state = {"query": q["query"], "sources": sources, "current_file": q["source"], "research_params": {"mode": "standard_qa"}}
+            t = time.perf_counter()
+            state = hybrid_retrieve(state)
+            docs = state["docs"]
+            multi_latency.append(time.perf_counter() - t)
+            rerank_pairs.append((state.get("rerank_stats") or {}).get("scored", 0))
+            multi_recalls.append(_score(docs, q["marker"], len(docs))[0])
+
+    app = get_app()
+    e2e_latency = []
+    for q in labeled[queries:queries + e2e_queries]:
+        state = {"query": q["query"], "current_file": q["source"], "research_params": {"mode": "standard_qa"}}
+        t = time.perf_counter()
+        app.invoke(state)
+        e2e_latency.append(time.perf_counter() - t)
+
+    last = stats[-1] if stats else None
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "papers": papers, "pages": pages, "queries": min(queries, len(labeled)), "k": k, "dim": dim,
+            "embeddings": embeddings, "dtype": dtype,
+            "e2e_queries": len(e2e_latency), "e2e_queries_requested": e2e_queries, "multi_sources": multi_sources, "llm_latency_ms": llm_latency_ms, "seed": seed,
+        },
+        "ingestion": {
+            "pdf_pages": papers * pages,
+            "chunks": len(chunks),
+            "parse_s": round(parse_s, 3),
+            "parse_pages_per_s": round(papers * pages / parse_s, 1) if parse_s else None,
+            "sparse_index_s": round(sparse_s, 3),
+            "index_s": round(index_s, 3),
+            "index_chunks_per_s": round(len(chunks) / index_s, 1) if index_s else None,
+            "batches": last.batches if last else 0,
+            "retries": last.retries if last else 0,
+            "index_bytes": _dir_bytes(LOCAL_VECTOR_DIR),
+        },
+        "retrieval": {
+            "recall_at_k": round(float(np.mean(recalls)), 4) if recalls else None,
+            "mrr": round(float(np.mean(rrs)), 4) if rrs else None,
+            "query_embedding_latency": _percentiles(query_embed_latency),
+            "latency": _percentiles(single_latency),
+            "multi_source_recall": round(float(np.mean(multi_recalls)), 4) if multi_recalls else None,
+            "multi_source_latency": _percentiles(multi_latency),
+            "rerank_pairs_per_query": round(float(np.mean(rerank_pairs)), 2) if rerank_pairs else None,
+        },
+        "pipeline": {"latency": _percentiles(e2e_latency)},
+        "memory": {"peak_rss_after_ingest_mb": rss_after_ingest, "peak_rss_mb": _peak_rss_mb()},
+        "warnings": warnings,
+    }
+
+
+# Metrics compared by `compare`; True means higher is better.
+_TRACKED = {
+    ("ingestion", "parse_pages_per_s"): True,
+    ("ingestion", "index_chunks_per_s"): True,
+    ("retrieval", "recall_at_k"): True,
+    ("retrieval", "mrr"): True,
+    ("ingestion", "index_bytes"): False,
+    ("retrieval", "query_embedding_latency", "p50_ms"): False,
+    ("retrieval", "latency", "p50_ms"): False,
+    ("retrieval", "latency", "p95_ms"): False,
+    ("retrieval", "latency", "p99_ms"): False,
+    ("retrieval", "multi_source_latency", "p95_ms"): False,
+    ("pipeline", "latency", "p95_ms"): False,
+    ("memory", "peak_rss_mb"): False,
+}
+
+
+def _lookup(report: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    for part in path:
+        if not isinstance(report, dict):
+            return None
+        report = report.get(part)
+    return report if isinstance(report, (int, float)) else None
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> List[Dict[str, Any]]:
+    rows = []
+    for path, higher_is_better in _TRACKED.items():
+        old, new = _lookup(baseline, path), _lookup(current, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        rows.append({"metric": ".".join(path), "baseline": old, "current": new, "change": round(change, 4), "regression": worse > tolerance})
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline ingestion/retrieval benchmark for the research assistant.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="Run the benchmark and print (or write) a JSON report.")
+    p_run.add_argument("--papers", type=int, default=10)
+    p_run.add_argument("--pages", type=int, default=8)
+    p_run.add_argument("--queries", type=int, default=100)
+    p_run.add_argument("--e2e-queries", type=int, default=20, help="Queries run through the full graph with a fake LLM.")
+    p_run.add_argument("--multi-sources", type=int, default=3, help="Papers searched per multi-paper query (0 to skip).")
+    p_run.add_argument("--dim", type=int, default=256)
+    p_run.add_argument("--embeddings", choices=["hash", "local"], default="hash",
+                       help="hash: fake model; local: LOCAL_EMBEDDING_MODEL on CPU (--dim truncates it).")
+    p_run.add_argument("--dtype", choices=["float32", "float16", "int8"], default="float32", help="Stored vector type.")
+    p_run.add_argument("--llm-latency-ms", type=float, default=0.0)
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--workdir", help="Directory for generated PDFs and indexes (default: a new temp dir).")
+    p_run.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    p_cmp = sub.add_parser("compare", help="Compare two JSON reports; exit 1 on regressions beyond the tolerance.")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run_benchmark(
+            papers=args.papers, pages=args.pages, queries=args.queries, dim=args.dim, e2e_queries=args.e2e_queries,
+            multi_sources=args.multi_sources, llm_latency_ms=args.llm_latency_ms, seed=args.seed, workdir=args.workdir,
+            embeddings=args.embeddings, dtype=args.dtype,
+        )
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare_reports(baseline, current, args.tolerance)
+    print(f"{'metric':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['metric']:<40} {r['baseline']:>12.3f} {r['current']:>12.3f} {r['change']:>+9.1%}{flag}")
+    return 1 if any(r["regression"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""Export the bibliography of every indexed paper (or of selected ones) without the UI.
+
+    python -m utils.bibliography --style BibTeX --output references.bib
+    python -m utils.bibliography --style APA --sources a.pdf b.pdf
+"""
+import argparse
+import sys
+import time
+from utils.logging_utils import configure_logging
+
+
+def main(argv=None) -> int:
+    from core.bibliography import STYLES
+
+    parser = argparse.ArgumentParser(description="Bibliography of indexed papers from the metadata index.")
+    parser.add_argument("--style", choices=STYLES, default="APA")
+    parser.add_argument("--sources", nargs="*", help="Paper file names (default: the whole library).")
+    parser.add_argument("--output", help="Write here instead of stdout.")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    from core.bibliography import format_bibliography, get_metadata_index
+    from core.ingest_queue import INDEXED, read_jobs
+
+    index = get_metadata_index()
+    index.backfill((job.source, job.path, job.content_hash) for job in read_jobs([INDEXED]))
+    entries = index.entries(args.sources)
+    start = time.perf_counter()
+    text = format_bibliography(entries, args.style)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    print(f"[bibliography] {len(entries)} entries formatted in {elapsed_ms:.1f} ms", file=sys.stderr)
+    return 0 if entries else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
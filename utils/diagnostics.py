@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+STARTUP_BUDGET_S: float = float(os.getenv("STARTUP_BUDGET_S", "3.0"))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_profile(module: str = "app", top: int = 25) -> List[Dict]:
+    # Equivalent of `python -X importtime -c "import <module>"`, aggregated and sorted.
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+def time_to_import(module: str = "app") -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+def vector_store_health() -> Dict:
+    # Imported here: the import-time commands must not pay for the vector store client.
+    from core.config import VECTOR_BACKEND, QDRANT_URL, LOCAL_VECTOR_DIR
+    from core.vectorstore import health_check
+
+    location = LOCAL_VECTOR_DIR if VECTOR_BACKEND == "local" else QDRANT_URL or "QDRANT_URL unset"
+    return {"backend": VECTOR_BACKEND, "location": location, "ok": health_check()}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Startup diagnostics for the research assistant.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_imp = sub.add_parser("importtime", help="Show the slowest imports (-X importtime breakdown).")
+    p_imp.add_argument("module", nargs="?", default="app")
+    p_imp.add_argument("--top", type=int, default=25)
+    p_imp.add_argument("--json", action="store_true")
+    p_start = sub.add_parser("startup", help="Time a cold import of the app and check it against the budget.")
+    p_start.add_argument("module", nargs="?", default="app")
+    p_start.add_argument("--budget", type=float, default=STARTUP_BUDGET_S)
+    sub.add_parser("health", help="Check that the configured vector store is reachable.")
+    args = parser.parse_args(argv)
+
+    if args.command == "health":
+        health = vector_store_health()
+        print(f"Vector store ({health['backend']} at {health['location']}): {'OK' if health['ok'] else 'UNREACHABLE'}")
+        return 0 if health["ok"] else 1
+
+    if args.command == "importtime":
+        rows = import_profile(args.module, args.top)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            print(f"{'cumulative ms':>14} {'self ms':>10}  module")
+            for r in rows:
+                print(f"{r['cumulative_ms']:>14.1f} {r['self_ms']:>10.1f}  {r['module']}")
+        return 0
+
+    elapsed = time_to_import(args.module)
+    status = "OK" if elapsed <= args.budget else "OVER BUDGET"
+    print(f"Cold import of {args.module}: {elapsed:.2f}s (budget {args.budget:.2f}s) {status}")
+    return 0 if elapsed <= args.budget else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""OpenAI-compatible chat completions stub and a load test for the LLM gateway.
+
+The stub answers ``POST /v1/chat/completions`` (plain and ``stream: true``) after a fixed
+latency, and can reject a fraction of requests with 429 or 503 to exercise backoff. The
+load test points the gateway at it, fires concurrent requests with repeated prompts and
+reports gateway and stub counters, so no network or API key is needed.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+
+class StubState:
+    def __init__(self, latency_ms: float = 200.0, error_rate: float = 0.0, retry_after_s: float = 0.2, seed: int = 0):
+        self.latency_s = latency_ms / 1000.0
+        self.error_rate = error_rate
+        self.retry_after_s = retry_after_s
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rejected = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"requests": self.requests, "rejected": self.rejected, "max_concurrent": self.max_concurrent}
+
+
+def _handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with state.lock:
+                state.requests += 1
+                reject = state.rng.random() < state.error_rate
+                state.rejected += reject
+                state.concurrent += 1
+                state.max_concurrent = max(state.max_concurrent, state.concurrent)
+            try:
+                if reject:
+                    status = 429 if state.rng.random() < 0.5 else 503
+                    self._json(status, {"error": {"message": "stub overload", "type": "rate_limit_error"}},
+                               {"Retry-After": str(state.retry_after_s)})
+                    return
+                time.sleep(state.latency_s)
+                prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+                text = f"Stub answer ({len(prompt.split())} prompt words) [1]."
+                usage = {"prompt_tokens": len(prompt.split()), "completion_tokens": len(text.split())}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                if body.get("stream"):
+                    self._stream(body.get("model", "stub"), text, usage)
+                else:
+                    self._json(200, {
+                        "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+                        "model": body.get("model", "stub"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+            finally:
+                with state.lock:
+                    state.concurrent -= 1
+
+        def _json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, model: str, text: str, usage: Dict[str, int]) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+            for word in text.split(" "):
+                delta = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                         "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(delta)}\n\n".encode())
+            final = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+            self.wfile.flush()
+            self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8089, **kwargs) -> Tuple[ThreadingHTTPServer, StubState]:
+    """Start the stub on a daemon thread; returns the server and its counters."""
+    state = StubState(**kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, state
+
+
+def load_test(
+    requests: int = 200,
+    concurrency: int = 32,
+    distinct: int = 20,
+    latency_ms: float = 200.0,
+    error_rate: float = 0.05,
+    port: int = 0,
+) -> Dict[str, Any]:
+    """Run ``requests`` gateway calls drawn from ``distinct`` prompts against an in-process stub."""
+    server, stub = serve(port, latency_ms=latency_ms, error_rate=error_rate)
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("API_KEY", "stub")
+    os.environ.setdefault("LLM_BACKOFF_BASE_S", "0.05")
+    # A fresh response cache, so repeats are served by coalescing or this run's cache only.
+    os.environ["TEXT_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="llm_load_"), "text_cache.sqlite")
+
+    from core.llm_gateway import get_llm, get_llm_gateway
+
+    llm = get_llm()
+    latencies, failures = [], 0
+
+    def one(i: int) -> None:
+        nonlocal failures
+        t = time.perf_counter()
+        try:
+            llm.invoke(f"Load test question {i % distinct}: summarize the findings.")
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    latencies.sort()
+    return {
+        "requests": requests,
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else None,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000, 1) if latencies else None,
+        "gateway": get_llm_gateway().stats(),
+        "stub": stub.stats(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible stub and LLM gateway load test.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_serve = sub.add_parser("serve", help="Serve the stub until interrupted (set LLM_BASE_URL=http://127.0.0.1:<port>/v1).")
+    p_serve.add_argument("--port", type=int, default=8089)
+    p_serve.add_argument("--latency-ms", type=float, default=200.0)
+    p_serve.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests rejected with 429/503.")
+    p_load = sub.add_parser("loadtest", help="Load-test the gateway against an in-process stub.")
+    p_load.add_argument("--requests", type=int, default=200)
+    p_load.add_argument("--concurrency", type=int, default=32)
+    p_load.add_argument("--distinct", type=int, default=20, help="Distinct prompts (repeats are coalesced or cached).")
+    p_load.add_argument("--latency-ms", type=float, default=200.0)
+    p_load.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server, _ = serve(args.port, latency_ms=args.latency_ms, error_rate=args.error_rate)
+        print(f"LLM stub listening on http://127.0.0.1:{server.server_address[1]}/v1")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+
+    report = load_test(args.requests, args.concurrency, args.distinct, args.latency_ms, args.error_rate)
+    print(json.dumps(report, indent=2))
+    return 0 if not report["failures"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())